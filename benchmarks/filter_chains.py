@@ -0,0 +1,59 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details
+# http://www.gnu.org/licenses/gpl-3.0.txt
+
+"""
+Measure matching torrents against filter chains
+
+Torrents are plain dictionaries so results are not cached in the torrents
+themselves.
+
+Usage: PYTHONPATH=. python3 benchmarks/filter_chains.py [NUMBER OF TORRENTS ...]
+"""
+
+import sys
+import time
+
+from benchmarks.torrent_memory import raw_torrent
+from stig.client.aiotransmission.api_torrent import _TorrentCache
+from stig.client.filters.torrent import TorrentFilter
+
+FILTERS = ('downloading&name~number 1|private&size>100M',
+           'complete|%downloaded>50&!private')
+REPEAT = 5
+
+
+def make_torrents(count, keys):
+    raw_tlist = []
+    for rt in map(raw_torrent, range(1, count + 1)):
+        rt['status'] = (0, 4, 6)[rt['id'] % 3]
+        rt['percentDone'] = (rt['id'] % 101) / 100
+        raw_tlist.append(rt)
+    tcache = _TorrentCache()
+    tcache.update(raw_tlist)
+    return tuple({key: t[key] for key in keys} for t in tcache.get())
+
+
+def measure(count, filter_str):
+    tfilter = TorrentFilter(filter_str)
+    tlist = make_torrents(count, tfilter.needed_keys)
+    durations = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        matches = len(tuple(tfilter.apply(tlist)))
+        durations.append(time.perf_counter() - start)
+    print('%6d torrents, %d matches: %.3fs  %s'
+          % (count, matches, min(durations), filter_str))
+
+
+if __name__ == '__main__':
+    for count in map(int, sys.argv[1:] or (10000, 100000)):
+        for filter_str in FILTERS:
+            measure(count, filter_str)
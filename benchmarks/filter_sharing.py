@@ -0,0 +1,70 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details
+# http://www.gnu.org/licenses/gpl-3.0.txt
+
+"""
+Measure filtering torrents for several subscribers with and without sharing
+results of individual filters between them
+
+This is what TorrentRequestPool does after each poll.  Torrents are plain
+dictionaries so results are not cached in the torrents themselves (Torrent
+objects have their own `filter_cache`, which is used instead of a shared one).
+
+Usage: PYTHONPATH=. python3 benchmarks/filter_sharing.py [NUMBER OF TORRENTS ...]
+"""
+
+import sys
+import time
+
+from benchmarks.torrent_memory import raw_torrent
+from stig.client.aiotransmission.api_torrent import _TorrentCache
+from stig.client.filters.torrent import TorrentFilter
+
+# Filters of typical tabs; most of them share individual filters
+SUBSCRIBERS = {
+    'cheap': ('downloading', 'downloading&private', 'uploading',
+              'uploading|downloading', 'private&size>1G', 'downloading&size>1G'),
+    'substring': ('name~number 1', 'name~number 1&private', 'path~category1',
+                  'path~category1|name~number 1', 'path~category1&name~number 1',
+                  'name~number 1&size>1G'),
+}
+
+
+def make_torrents(count, keys):
+    raw_tlist = []
+    for rt in map(raw_torrent, range(1, count + 1)):
+        rt['status'] = (0, 4, 6)[rt['id'] % 3]
+        rt['percentDone'] = (rt['id'] % 101) / 100
+        raw_tlist.append(rt)
+    tcache = _TorrentCache()
+    tcache.update(raw_tlist)
+    return tuple({key: t[key] for key in keys} for t in tcache.get())
+
+
+def measure(count, name, subscribers):
+    tfilters = tuple(map(TorrentFilter, subscribers))
+    tlist = make_torrents(count, {key for f in tfilters for key in f.needed_keys})
+    for tfilter in tfilters:
+        tuple(tfilter.apply(tlist))  # Compile filter chains
+
+    for shared in (False, True):
+        start = time.perf_counter()
+        cache = {} if shared else None
+        for tfilter in tfilters:
+            tuple(tfilter.apply(tlist, cache=cache))
+        duration = time.perf_counter() - start
+        print('%6d torrents, %9s filters, shared=%-5s: %.3fs'
+              % (count, name, shared, duration))
+
+
+if __name__ == '__main__':
+    for count in map(int, sys.argv[1:] or (10000, 100000)):
+        for name, subscribers in SUBSCRIBERS.items():
+            measure(count, name, subscribers)
@@ -0,0 +1,123 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details
+# http://www.gnu.org/licenses/gpl-3.0.txt
+
+"""
+Measure torrent list requests with and without compressed responses
+
+A local stand-in for the Transmission daemon serves torrent lists through a
+link with limited bandwidth.  Responses are gzip-compressed for each request
+if the client accepts it, like Transmission does.
+
+Usage: PYTHONPATH=. python3 benchmarks/rpc_compression.py [MBIT/S ...]
+
+Bandwidth defaults to 10, 100 and 0 MBit/s (0 means unlimited).
+"""
+
+import asyncio
+import gzip
+import json
+import sys
+import time
+
+from aiohttp import web
+
+from benchmarks.torrent_memory import raw_torrent
+from stig.client.aiotransmission.rpc import TransmissionRPC
+from stig.client.aiotransmission.torrent import TorrentFields
+
+TORRENTS = 10000
+REQUESTS = 10
+FIELDS = tuple(TorrentFields('name', 'status', 'size-final', 'peers-seeding', 'rate-up',
+                             'rate-down', 'timespan-eta', '%downloaded', 'ratio'))
+SESSION_GET = json.dumps({'result': 'success', 'arguments': {
+    'version': '3.00', 'rpc-version': 16, 'rpc-version-minimum': 1}}).encode()
+
+
+def torrent_list(variant):
+    # Alternate between two lists so no response is identical to the previous one
+    tlist = []
+    for rt in map(raw_torrent, range(1, TORRENTS + 1)):
+        rt['rateDownload'] += variant
+        tlist.append({field: rt[field] for field in FIELDS if field in rt})
+    return json.dumps({'result': 'success', 'arguments': {'torrents': tlist}}).encode()
+
+
+class StandInDaemon():
+    def __init__(self, bandwidth):
+        self.bandwidth = bandwidth * 1e6 / 8  # Bytes per second
+        self.bodies = (torrent_list(0), torrent_list(1))
+        self.requests = 0
+        self.bytes_sent = 0
+
+    async def handle(self, request):
+        rpc_request = await request.json()
+        if rpc_request['method'] == 'session-get':
+            return web.Response(body=SESSION_GET, content_type='application/json')
+
+        body = self.bodies[self.requests % 2]
+        self.requests += 1
+        headers = {'Content-Type': 'application/json'}
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=6)
+            headers['Content-Encoding'] = 'gzip'
+        self.bytes_sent += len(body)
+
+        # Throttle like a slow link
+        response = web.StreamResponse(headers=headers)
+        response.content_length = len(body)
+        await response.prepare(request)
+        chunksize = 64 * 1024
+        for i in range(0, len(body), chunksize):
+            chunk = body[i:i + chunksize]
+            if self.bandwidth:
+                await asyncio.sleep(len(chunk) / self.bandwidth)
+            await response.write(chunk)
+        await response.write_eof()
+        return response
+
+
+async def measure(bandwidth, compression):
+    daemon = StandInDaemon(bandwidth)
+    app = web.Application()
+    app.router.add_post('/transmission/rpc', daemon.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, 'localhost', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    rpc = TransmissionRPC('localhost', port, compression=compression)
+    await rpc.connect()
+    try:
+        durations = []
+        for _ in range(REQUESTS):
+            start = time.perf_counter()
+            await rpc.torrent_get(fields=FIELDS)
+            durations.append(time.perf_counter() - start)
+    finally:
+        await rpc.disconnect()
+        await runner.cleanup()
+
+    print('%11s, compression=%-5s: %7.1f ms per request, %5.2f MB per response'
+          % ('%g MBit/s' % bandwidth if bandwidth else 'unlimited', compression,
+             sum(durations) / len(durations) * 1e3, daemon.bytes_sent / REQUESTS / 1e6))
+
+
+async def main(bandwidths):
+    for bandwidth in bandwidths:
+        for compression in (False, True):
+            await measure(bandwidth, compression)
+
+
+if __name__ == '__main__':
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(main(tuple(map(float, sys.argv[1:])) or (10, 100, 0)))
+    loop.close()
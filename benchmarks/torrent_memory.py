@@ -0,0 +1,79 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details
+# http://www.gnu.org/licenses/gpl-3.0.txt
+
+"""
+Measure memory usage of cached Torrent objects
+
+Usage: PYTHONPATH=. python3 benchmarks/torrent_memory.py [NUMBER OF TORRENTS ...]
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+
+from stig.client.aiotransmission.api_torrent import _TorrentCache
+from stig.client.aiotransmission.torrent import TorrentFields
+
+# Keys that are displayed in the default torrent list
+LIST_KEYS = ('name', 'status', 'size-final', 'peers-seeding', 'rate-up', 'rate-down',
+             'timespan-eta', '%downloaded', 'ratio', 'marked')
+
+
+def raw_torrent(tid):
+    return {
+        'id': tid, 'name': 'Torrent number %d' % tid, 'hashString': '%040x' % tid,
+        'downloadDir': '/downloads/category%d' % (tid % 10), 'status': 4,
+        'activityDate': 1600000000 + tid, 'addedDate': 1500000000 + tid,
+        'dateCreated': 1400000000 + tid, 'doneDate': 0, 'startDate': 1550000000 + tid,
+        'manualAnnounceTime': -1, 'comment': '', 'creator': 'mktorrent 1.1',
+        'magnetLink': 'magnet:?xt=urn:btih:%040x' % tid,
+        'corruptEver': 0, 'desiredAvailable': 1000 * tid, 'downloadedEver': 2000 * tid,
+        'uploadedEver': 3000 * tid, 'haveUnchecked': 0, 'haveValid': 2000 * tid,
+        'leftUntilDone': 1000 * tid, 'sizeWhenDone': 3000 * tid, 'totalSize': 3000 * tid,
+        'pieceCount': 1000 + tid % 1000, 'pieceSize': 262144,
+        'downloadLimit': 100, 'downloadLimited': False, 'uploadLimit': 100, 'uploadLimited': False,
+        'error': 0, 'errorString': '', 'eta': 3600 + tid, 'isPrivate': bool(tid % 2),
+        'metadataPercentComplete': 1, 'percentDone': 0.5, 'recheckProgress': 0,
+        'peersConnected': tid % 50, 'peersGettingFromUs': tid % 7, 'peersSendingToUs': tid % 5,
+        'rateDownload': 1000 * (tid % 100), 'rateUpload': 100 * (tid % 100),
+        'secondsDownloading': 10 * tid, 'secondsSeeding': 20 * tid, 'uploadRatio': 1.5,
+        'trackerStats': [{'announce': 'http://tracker%d.example.org/announce' % (tid % 20),
+                          'lastAnnounceSucceeded': True, 'hasAnnounced': True,
+                          'seederCount': tid % 100, 'leecherCount': tid % 10}],
+        'peers': [], 'fileStats': [], 'files': [],
+    }
+
+
+def measure(count):
+    fields = tuple(field for field in TorrentFields('all')
+                   if field not in ('peers', 'fileStats', 'files'))
+    # Decode JSON like responses from Transmission to get realistic string objects
+    response = json.dumps([{field: rt[field] for field in fields}
+                           for rt in map(raw_torrent, range(1, count + 1))])
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    tcache = _TorrentCache()
+    tcache.update(json.loads(response))
+    for t in tcache.get():
+        for key in LIST_KEYS:
+            t.get(key)
+    duration = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('%6d torrents: %7.1f MB, %5d bytes per torrent, %.2fs'
+          % (count, size / 1e6, size / count, duration))
+
+
+if __name__ == '__main__':
+    for count in map(int, sys.argv[1:] or (10000, 50000)):
+        measure(count)
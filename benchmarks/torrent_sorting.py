@@ -0,0 +1,55 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details
+# http://www.gnu.org/licenses/gpl-3.0.txt
+
+"""
+Measure sorting cached torrents by multiple sort orders
+
+Values of all torrents are computed before sorting so only sorting is
+measured.
+
+Usage: PYTHONPATH=. python3 benchmarks/torrent_sorting.py [NUMBER OF TORRENTS ...]
+"""
+
+import sys
+import time
+
+from benchmarks.torrent_memory import raw_torrent
+from stig.client.aiotransmission.api_torrent import _TorrentCache
+from stig.client.sorters.torrent import TorrentSorter
+
+SORT_ORDERS = (('size', '!rate-down'),
+               ('!size', 'rate-down', 'name'),
+               ('path',))
+REPEAT = 5
+
+
+def make_torrents(count):
+    tcache = _TorrentCache()
+    tcache.update(map(raw_torrent, range(1, count + 1)))
+    return tcache.get()
+
+
+def measure(count, sortstrings):
+    tlist = make_torrents(count)
+    sorter = TorrentSorter(sortstrings)
+    sorter.apply(tlist)  # Compute values
+    durations = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        sorter.apply(tlist)
+        durations.append(time.perf_counter() - start)
+    print('%6d torrents: %.3fs  %s' % (count, min(durations), ','.join(sortstrings)))
+
+
+if __name__ == '__main__':
+    for count in map(int, sys.argv[1:] or (10000, 100000)):
+        for sortstrings in SORT_ORDERS:
+            measure(count, sortstrings)
@@ -52,6 +52,7 @@ setup(
     ],
     extras_require = {
         'setproctitle': ['setproctitle'],
+        'orjson': ['orjson'],
     },
     tests_require = [
         'pytest>=5,<6',
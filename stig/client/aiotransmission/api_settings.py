@@ -105,6 +105,7 @@ class SettingsAPI(abc.Mapping, RequestPoller):
 
         super().__init__(self._srvapi.rpc.session_get, interval=interval)
         self.on_response(self._handle_session_get)
+        self.on_unchanged(self._handle_session_get_unchanged)
         self.on_error(self._handle_error)
 
     def description(self, name):
@@ -153,6 +154,12 @@ class SettingsAPI(abc.Mapping, RequestPoller):
         self._raw = response
         self._on_update.send(self)
 
+    def _handle_session_get_unchanged(self, response):
+        # Settings must be converted again after `clearcache`, e.g. because
+        # the bandwidth unit changed
+        if self._raw is None:
+            self._handle_session_get(response)
+
     def _handle_error(self, error):
         self.clearcache(run_callbacks=True)
 
@@ -57,6 +57,7 @@ class StatusAPI():
     def __init__(self, srvapi, interval=1):
         self._session_stats_updated = False
         self._tcounts_updated = False
+        self._changed = False
         self._reset_session_stats()
         self._reset_tcounts()
         self._on_update = blinker.Signal()
@@ -64,6 +65,7 @@ class StatusAPI():
         self._poller_stats = RequestPoller(srvapi.rpc.session_stats,
                                            interval=interval)
         self._poller_stats.on_response(self._handle_session_stats)
+        self._poller_stats.on_unchanged(self._handle_session_stats_unchanged)
         self._poller_stats.on_error(lambda e: log.debug('Ignoring exception: %r', e),
                                     autoremove=False)
 
@@ -73,6 +75,7 @@ class StatusAPI():
                                             keys=('rate-down', 'rate-up', 'status'),
                                             interval=interval)
         self._poller_tcount.on_response(self._handle_torrent_list)
+        self._poller_tcount.on_unchanged(self._handle_torrent_list_unchanged)
 
     def _reset_session_stats(self):
         self._session_stats = None
@@ -86,6 +89,11 @@ class StatusAPI():
         else:
             self._session_stats = stats
         self._session_stats_updated = True
+        self._changed = True
+        self._maybe_run_callbacks()
+
+    def _handle_session_stats_unchanged(self, stats):
+        self._session_stats_updated = True
         self._maybe_run_callbacks()
 
     def _handle_torrent_list(self, response):
@@ -94,15 +102,31 @@ class StatusAPI():
         else:
             self._torrent_list = response.torrents
         self._tcounts_updated = True
+        self._changed = True
+        self._maybe_run_callbacks()
+
+    def _handle_torrent_list_unchanged(self, response):
+        self._tcounts_updated = True
         self._maybe_run_callbacks()
 
     def _maybe_run_callbacks(self):
         # We have two pollers, but we want to call callbacks once when both
-        # have an update to report.
+        # have an update to report.  If neither poller got a different
+        # response, there is nothing to report.
         if self._tcounts_updated and self._session_stats_updated:
-            self._on_update.send(self)
+            if self._changed:
+                self._on_update.send(self)
             self._tcounts_updated = False
             self._session_stats_updated = False
+            self._changed = False
+
+    def clearcache(self):
+        """
+        Run `on_update` callbacks after the next update even if nothing changed
+
+        This is needed to display values in a different unit.
+        """
+        self._changed = True
 
     def on_update(self, callback, autoremove=True):
         """
@@ -10,7 +10,9 @@
 # http://www.gnu.org/licenses/gpl-3.0.txt
 
 import base64
+import bisect
 import os
+import re
 import time
 from collections import abc
 from string import hexdigits as HEXDIGITS
@@ -22,30 +24,93 @@ from ..base import TorrentAPIBase
 from ..constants import MAX_TORRENT_FILE_SIZE
 from ..filters import FileFilter, TorrentFilter
 from ..utils import (URL, Bandwidth, Bool, BoolOrBandwidth, Response, SizeInBytes,
-                     SmartCmpPath)
-from .torrent import Torrent, TorrentFields
+                     SmartCmpPath, Status)
+from .torrent import STATIC_FIELDS, Torrent, TorrentFields
 
 from ...logging import make_logger  # isort:skip
 log = make_logger(__name__)
 
 
+# Transmission reports torrents as "recently-active" if they were active in the
+# last 60 seconds (RECENTLY_ACTIVE_SECONDS in libtransmission/rpcimpl.c).
+RECENTLY_ACTIVE_SECONDS = 60
+
+# Some values (e.g. tracker scrape results) change without activity, so we
+# periodically request every torrent anyway.  This must happen well within
+# RECENTLY_ACTIVE_SECONDS because torrents that were active before that can't
+# be updated incrementally.
+FULL_SYNC_INTERVAL = RECENTLY_ACTIVE_SECONDS / 2
+
+# Map Torrent keys to callables that return the values a torrent is indexed by;
+# strings are casefolded so lookups find a superset of exactly matching torrents
+_INDEXES = {
+    'hash'     : lambda t: (t['hash'].casefold(),),
+    'status'   : lambda t: t['status'],
+    'trackers' : lambda t: {tracker['url-announce'].domain.casefold() for tracker in t['trackers']},
+    'path'     : lambda t: (t['path'].casefold(),),
+}
+
+# Map boolean filters to status flags; matching torrents have any of the flags
+_STATUS_FILTERS = {
+    'stopped'   : (Status.STOPPED,),
+    'verifying' : (Status.VERIFY,),
+    'isolated'  : (Status.ISOLATED,),
+    'idle'      : (Status.IDLE,),
+    'active'    : (Status.CONNECTED, Status.VERIFY),
+}
+
+# Regular expression special characters
+_REGEX_SPECIAL = frozenset('.^$*+?{}[]\\|()')
+
+
 class _TorrentCache():
     def __init__(self, raw_torrents=()):
         self._tdict = {}  # Map torrent IDs to Torrent objects
+        self._synced = {}  # Map RPC fields to time of last request of all torrents
+        self._static = {}  # Map torrent IDs to static RPC fields we don't need to request
+        # Scoped syncs (see mark_synced) use (scope, field) keys in _synced
+
+        # Map indexed keys to dictionaries that map values to sets of torrent IDs
+        self._indexes = {key: {} for key in _INDEXES}
+        # Map torrent IDs to dictionaries that map indexed keys to indexed values
+        self._indexed = {}
+        # Map indexed keys to IDs of torrents that must be re-indexed before lookup
+        self._unindexed = {key: set() for key in _INDEXES}
+        # Sorted download directories for prefix lookups or None if outdated
+        self._sorted_paths = None
+        # Incremented every time a torrent is added, changed or removed
+        self._revision = 0
+
+    @property
+    def revision(self):
+        """Number that changes every time any cached torrent changes"""
+        return self._revision
 
     def update(self, raw_torrents):
         # import time ; start = time.time()
         tdict = self._tdict
+        unindexed = self._unindexed
+        changed = False
         for rt in raw_torrents:
             tid = rt['id']
             if tid in tdict:
                 # Update existing torrent
                 # log.debug('Updating torrent #%d, %d keys: %s', tid, len(rt), tuple(rt))
-                tdict[tid].update(rt)
+                t = tdict[tid]
+                t.update(rt)
             else:
                 # Add new torrent
                 # log.debug('Adding torrent #%d, %d keys: %s', tid, len(rt), tuple(rt))
-                tdict[tid] = Torrent(rt)
+                t = tdict[tid] = Torrent(rt)
+
+            # Indexes are updated lazily when they are needed
+            changed_keys = t.changed_keys
+            if changed_keys:
+                changed = True
+                for key in changed_keys.intersection(unindexed):
+                    unindexed[key].add(tid)
+        if changed:
+            self._revision += 1
         # log.debug('Updated %d cached with %d new torrents in %.3fms',
         #           len(tdict), len(raw_torrents), (time.time()-start)*1000)
 
@@ -56,15 +121,191 @@ class _TorrentCache():
         removed_tids = known_tids.difference(existing_tids)
         if removed_tids:
             log.debug('Clearing cached torrents: %r', removed_tids)
+            self._revision += 1
         for tid in removed_tids:
             del tdict[tid]
+            self._static.pop(tid, None)
+            self._unindex(tid)
+        if not tdict:
+            self._synced.clear()
+
+    def remove(self, removed_tids):
+        """Remove torrents with IDs in `removed_tids`"""
+        tdict = self._tdict
+        for tid in removed_tids:
+            if tid in tdict:
+                log.debug('Removing cached torrent: %r', tid)
+                del tdict[tid]
+                self._revision += 1
+            self._static.pop(tid, None)
+            self._unindex(tid)
+
+    def forget_filter_results(self, keep=()):
+        """Remove results of filters that are not in `keep` from all torrents"""
+        keep = frozenset(keep)
+        for t in self._tdict.values():
+            filter_cache = t.filter_cache
+            if filter_cache:
+                for f in filter_cache.keys() - keep:
+                    del filter_cache[f]
+
+    def _unindex(self, tid):
+        indexed = self._indexed.pop(tid, {})
+        for key,values in indexed.items():
+            self._remove_from_index(key, tid, values)
+        for tids in self._unindexed.values():
+            tids.discard(tid)
+
+    def _remove_from_index(self, key, tid, values):
+        index = self._indexes[key]
+        for value in values:
+            tids = index[value]
+            tids.discard(tid)
+            if not tids:
+                del index[value]
+                if key == 'path':
+                    self._sorted_paths = None
+
+    def _get_index(self, key):
+        """Return dictionary that maps indexed values of `key` to sets of torrent IDs"""
+        index = self._indexes[key]
+        unindexed = self._unindexed[key]
+        if unindexed:
+            tdict = self._tdict
+            get_values = _INDEXES[key]
+            for tid in unindexed:
+                indexed = self._indexed.setdefault(tid, {})
+                old_values = indexed.pop(key, ())
+                self._remove_from_index(key, tid, old_values)
+                t = tdict[tid]
+                if key in t:
+                    new_values = indexed[key] = tuple(get_values(t))
+                    for value in new_values:
+                        tids = index.get(value)
+                        if tids is None:
+                            tids = index[value] = set()
+                            if key == 'path':
+                                self._sorted_paths = None
+                        tids.add(tid)
+            log.debug('Indexed %r of %d torrents', key, len(unindexed))
+            unindexed.clear()
+        return index
+
+    def lookup(self, tfilter):
+        """
+        Return set of IDs of torrents that may match `tfilter` or `None`
+
+        tfilter: Non-inverted filter from a TorrentFilter chain
+
+        Return `None` if the indexes can't narrow down the candidates.
+        Otherwise, the returned IDs include all matching torrents, which must
+        still be filtered.
+        """
+        name, op, value = tfilter.name, tfilter.operator, tfilter.value
+        if name in _STATUS_FILTERS and op is None:
+            index = self._get_index('status')
+            return set().union(*(index.get(flag, ()) for flag in _STATUS_FILTERS[name]))
+        elif op == '=':
+            if name == 'id':
+                return {value} if value in self._tdict else set()
+            elif name in ('hash', 'path'):
+                return set(self._get_index(name).get(value.casefold(), ()))
+            elif name == 'tracker':
+                return set(self._get_index('trackers').get(value.casefold(), ()))
+        elif op == '=~' and name == 'path':
+            prefix = self._regex_prefix(value)
+            if prefix is not None:
+                return self._find_path_prefix(prefix.casefold())
+
+    @staticmethod
+    def _regex_prefix(regex):
+        """Return literal string any match of `regex` must start with or `None`"""
+        pattern = regex.pattern
+        if (not isinstance(pattern, str) or not pattern.startswith('^') or
+            '|' in pattern or regex.flags & (re.IGNORECASE | re.MULTILINE)):
+            return None
+        prefix = []
+        for char in pattern[1:]:
+            if char in _REGEX_SPECIAL:
+                if char in '*?{' and prefix:
+                    # Previous character is optional
+                    prefix.pop()
+                break
+            prefix.append(char)
+        return ''.join(prefix)
+
+    def _find_path_prefix(self, prefix):
+        index = self._get_index('path')
+        paths = self._sorted_paths
+        if paths is None:
+            paths = self._sorted_paths = sorted(index)
+        tids = set()
+        for i in range(bisect.bisect_left(paths, prefix), len(paths)):
+            path = paths[i]
+            if not path.startswith(prefix):
+                break
+            tids.update(index[path])
+        return tids
+
+    def missing_static(self, raw_torrents, static_fields):
+        """Return IDs from `raw_torrents` that need any of `static_fields` requested"""
+        static = self._static
+        return tuple(rt['id'] for rt in raw_torrents
+                     if not static_fields.issubset(static.get(rt['id'], ())))
+
+    def mark_static(self, raw_torrents, static_fields):
+        """
+        Remember that `static_fields` of `raw_torrents` don't need to be requested again
+
+        Torrents without complete metadata are ignored.
+        """
+        static = self._static
+        for rt in raw_torrents:
+            if rt.get('metadataPercentComplete', 0) >= 1:
+                tid = rt['id']
+                static[tid] = static.get(tid, frozenset()).union(static_fields)
+
+    def forget_static(self, tid):
+        """Request static fields of torrent with ID `tid` again (e.g. after renaming)"""
+        self._static.pop(tid, None)
+
+    def mark_synced(self, fields, scope=None):
+        """
+        Remember that `fields` of all torrents were requested
+
+        scope: None or any hashable (e.g. a filter string) if `fields` are only
+               up to date for a subset of torrents
+        """
+        now = time.monotonic()
+        for field in fields:
+            key = field if scope is None else (scope, field)
+            self._synced[key] = now
+
+    def is_synced(self, fields, scope=None):
+        """
+        Whether `fields` of all torrents can be updated by requesting only
+        "recently-active" torrents
+
+        scope: See `mark_synced`; fields that are synced for all torrents are
+               also synced for any scope
+        """
+        now = time.monotonic()
+        synced = self._synced
+        for field in fields:
+            last_synced = synced.get(field, 0)
+            if scope is not None:
+                last_synced = max(last_synced, synced.get((scope, field), 0))
+            if now - last_synced >= FULL_SYNC_INTERVAL:
+                return False
+        return True
 
     def get(self, *ids):
         """Return tuple of Torrent objects"""
+        tdict = self._tdict
         if ids:
-            return tuple(t for tid,t in self._tdict.items() if tid in ids)
+            return tuple(tdict[tid] for tid in dict.fromkeys(ids) if tid in tdict)
         else:
-            return tuple(self._tdict.values())
+            return tuple(tdict.values())
 
     def __len__(self):
         return len(self._tdict)
@@ -81,11 +322,29 @@ class TorrentAPI(TorrentAPIBase):
     def __init__(self, rpc):
         self.rpc = rpc
         self._tcache = _TorrentCache()
+        # Map torrent-get requests to the previous raw torrent list and the
+        # cache revision after it was processed
+        self._raw_results = {}
+        # Map `torrents` arguments to previous Response objects; only valid
+        # for the cache revision in `_responses_revision`
+        self._responses = {}
+        self._responses_revision = None
 
     def clearcache(self):
         """Remove all torrents from cache"""
         self._tcache.purge(existing_tids=())
 
+    def forget_filter_results(self, keep=()):
+        """
+        Remove results of filters that are not in `keep` from all cached torrents
+
+        Torrents remember the result of every filter they were matched against
+        until any of the filter's needed keys changes.  This should be called
+        when the filters that are used regularly change so that results of
+        other filters (e.g. from a single command) don't accumulate.
+        """
+        self._tcache.forget_filter_results(keep)
+
     @staticmethod
     async def _request(method, *args, **kwargs):
         try:
@@ -217,10 +476,14 @@ class TorrentAPI(TorrentAPIBase):
             return Response(success=success, torrent=torrent, msgs=msgs, errors=errors)
 
 
-    async def _request_torrents(self, fields, ids=None):
+    async def _request_torrents(self, fields, ids=None, incremental=False, scope=None):
         """
         Make 'torrent-get' RPC request
 
+        If `ids` is None and `incremental` is True, only "recently-active"
+        torrents are requested if the cache allows it.  `scope` is passed to
+        `_TorrentCache.is_synced`.
+
         Return a Response object with 'raw_torrents' set to a tuple of torrents
         according to the RPC spec.
         """
@@ -231,29 +494,111 @@ class TorrentAPI(TorrentAPIBase):
             fields = ('id',) + tuple(fields)
         try:
             if ids is None:
-                # Request all IDs
-                raw_tlist = await self.rpc.torrent_get(fields=fields)
+                if incremental and self._tcache.is_synced(fields, scope=scope):
+                    # Request only torrents that have changed recently
+                    request_ids = 'recently-active'
+                    raw_tlist, removed_tids = await self._torrent_get(fields, request_ids)
+                else:
+                    # Request all IDs
+                    request_ids = None
+                    raw_tlist, removed_tids = await self._torrent_get(fields)
+                    removed_tids = None
             else:
+                request_ids = tuple(ids)
                 if len(ids) > 0:
                     # Request given IDs
-                    raw_tlist = await self.rpc.torrent_get(fields=fields, ids=ids)
+                    raw_tlist, _ = await self._torrent_get(fields, ids)
                 else:
                     # No IDs (i.e. empty torrent list) requested
                     raw_tlist = []
         except ClientError as e:
             return Response(success=False, raw_torrents=(), errors=(str(e),))
         else:
-            self._tcache.update(raw_tlist)
+            # The RPC returns the same object if the response didn't change.
+            # If the cache didn't change since we processed that object, there
+            # is nothing to update.
+            tcache = self._tcache
+            revision = tcache.revision
+            request_key = (frozenset(fields), request_ids)
+            previous = self._raw_results.get(request_key)
+            if previous is not None and previous[0] is raw_tlist and previous[1] == revision:
+                if ids is None and removed_tids is None:
+                    tcache.mark_synced(fields)
+                log.debug('Requested %d unchanged torrents in %.3fms',
+                          len(raw_tlist), (time() - start) * 1e3)
+                return Response(success=True, raw_torrents=raw_tlist)
+
+            tcache.update(raw_tlist)
 
-            # If we just got a list of all torrents, we can check for torrents
-            # that we still have cached but don't exist anymore and purge them.
             if ids is None:
-                tids = tuple(t['id'] for t in raw_tlist)
-                self._tcache.purge(existing_tids=tids)
+                if removed_tids is None:
+                    # If we just got a list of all torrents, we can check for
+                    # torrents that we still have cached but don't exist anymore
+                    # and purge them.
+                    tids = tuple(t['id'] for t in raw_tlist)
+                    tcache.purge(existing_tids=tids)
+                    tcache.mark_synced(fields)
+                    log.debug('Requested all %d torrents in %.3fms',
+                              len(raw_tlist), (time() - start) * 1e3)
+                else:
+                    tcache.remove(removed_tids)
+                    log.debug('Requested %d recently active torrents in %.3fms (%d removed)',
+                              len(raw_tlist), (time() - start) * 1e3, len(removed_tids))
+            else:
+                log.debug('Requested %d torrents in %.3fms', len(raw_tlist), (time() - start) * 1e3)
 
-            log.debug('Requested %d torrents in %.3fms', len(raw_tlist), (time() - start) * 1e3)
+            if tcache.revision != revision:
+                # Results of other requests were processed before this change
+                self._raw_results.clear()
+            self._raw_results[request_key] = (raw_tlist, tcache.revision)
             return Response(success=True, raw_torrents=raw_tlist)
 
+    async def _torrent_get(self, fields, ids=None):
+        """
+        Request volatile `fields` of torrents and static `fields` only if needed
+
+        ids: None for all torrents, 'recently-active' or sequence of IDs
+
+        Static fields (see STATIC_FIELDS) are only requested for torrents that
+        we haven't seen before or that didn't have complete metadata when we saw
+        them last.
+
+        Return list of raw torrents and list of removed IDs (which is always
+        empty unless `ids` is 'recently-active').
+
+        Raise ClientError.
+        """
+        static_fields = frozenset(fields).intersection(STATIC_FIELDS)
+        if static_fields:
+            # We need to know when metadata is complete so we can stop
+            # requesting static fields
+            fields = tuple(frozenset(fields).difference(STATIC_FIELDS)
+                           .union(('id', 'metadataPercentComplete')))
+
+        args = {'fields': fields}
+        if ids is not None:
+            args['ids'] = ids
+        result = await self.rpc.torrent_get(**args)
+        if ids == 'recently-active':
+            raw_tlist, removed_tids = result['torrents'], result['removed']
+        else:
+            raw_tlist, removed_tids = result, ()
+
+        if static_fields:
+            missing_tids = self._tcache.missing_static(raw_tlist, static_fields)
+            if missing_tids:
+                log.debug('Requesting static fields of %d torrents: %s',
+                          len(missing_tids), ', '.join(sorted(static_fields)))
+                static_tlist = await self.rpc.torrent_get(
+                    fields=tuple(static_fields.union(('id', 'metadataPercentComplete'))),
+                    ids=missing_tids)
+                # Don't modify the RPC response, it may be returned again
+                static_tdict = {rt['id']:rt for rt in static_tlist}
+                raw_tlist = [{**rt, **static_tdict[rt['id']]} if rt['id'] in static_tdict else rt
+                             for rt in raw_tlist]
+                self._tcache.mark_static(static_tlist, static_fields)
+        return raw_tlist, removed_tids
+
     def _get_torrents_from_cache(self, ids):
         """
         Get torrents from internal cache without making a request
@@ -283,14 +628,16 @@ class TorrentAPI(TorrentAPIBase):
         log.debug('Got %d cached torrents in %.3fms', len(tlist), (time() - start) * 1e3)
         return Response(success=success, torrents=tlist, errors=errors)
 
-    async def _get_torrents_by_ids(self, keys, ids=None, from_cache=False):
+    async def _get_torrents_by_ids(self, keys, ids=None, from_cache=False, incremental=False):
         """
         Return a Response object with 'torrents' set to a tuple of Torrents
 
-        keys:       'ALL' for all supported Torrent keys or a sequence of key
-                    strings (see TorrentBase.TYPES for available keys)
-        ids:        None for all torrents or a sequence of wanted IDs
-        from_cache: Whether to try to get the torrents from a previous request
+        keys:        'ALL' for all supported Torrent keys or a sequence of key
+                     strings (see TorrentBase.TYPES for available keys)
+        ids:         None for all torrents or a sequence of wanted IDs
+        from_cache:  Whether to try to get the torrents from a previous request
+        incremental: Whether to request only recently active torrents if
+                     possible (ignored if `ids` is not None)
         """
         if keys == 'ALL':
             fields = TorrentFields(keys)
@@ -313,24 +660,27 @@ class TorrentAPI(TorrentAPIBase):
             else:
                 log.debug('Some fields are missing from torrent - enforcing request')
 
-        response = await self._request_torrents(fields, ids)
+        response = await self._request_torrents(fields, ids, incremental=incremental)
         if not response.success:
             return Response(success=False, torrents=(), errors=response.errors)
         else:
             return self._get_torrents_from_cache(ids)
 
-    async def _get_torrents_by_filter(self, keys, tfilter=None, from_cache=False):
+    async def _get_torrents_by_filter(self, keys, tfilter=None, from_cache=False,
+                                      incremental=False):
         """
         Return a Response object with 'torrents' set to a tuple of Torrents
 
-        keys:       See _get_torrents_by_ids
-        tfilter:    A TorrentFilter instance or None to get all torrents
-        from_cache: Whether to try to get the torrents from a previous request
+        keys:        See _get_torrents_by_ids
+        tfilter:     A TorrentFilter instance or None to get all torrents
+        from_cache:  Whether to try to get the torrents from a previous request
+        incremental: See _get_torrents_by_ids
         """
         if tfilter is None:
             log.debug('Looking for all torrents with keys: %s', keys)
             # No filter specified - just return all torrents with the specified keys
-            return await self._get_torrents_by_ids(keys=keys, from_cache=from_cache)
+            return await self._get_torrents_by_ids(keys=keys, from_cache=from_cache,
+                                                   incremental=incremental)
         else:
             log.debug('Looking for %s torrents with keys: %s', tfilter, keys)
             if isinstance(tfilter, str):
@@ -338,6 +688,49 @@ class TorrentAPI(TorrentAPIBase):
 
             tlist = ()
 
+            if not from_cache:
+                # Filters that select specific IDs or hashes can be passed to
+                # Transmission so we don't have to request all torrents
+                ids = self._filter_ids(tfilter)
+                if ids is not None:
+                    if keys == 'ALL':
+                        fields = TorrentFields(keys)
+                    else:
+                        fields = TorrentFields(*set(tfilter.needed_keys).union(keys))
+                    log.debug('Requesting only torrents with IDs/hashes: %s', ids)
+                    response = await self._request_torrents(fields, ids)
+                    if not response.success:
+                        return Response(success=False, torrents=(), errors=response.errors)
+                    else:
+                        tids = tuple(rt['id'] for rt in response.raw_torrents)
+                        tlist = tuple(tfilter.apply(self._tcache.get(*tids)))
+                        return self._filtered_response(tfilter, tlist)
+
+            # Wanted keys of torrents that matched during the last full sync
+            # are up to date for `scope`
+            scope = str(tfilter)
+            if incremental and not from_cache and keys != 'ALL':
+                fields = TorrentFields(*set(tfilter.needed_keys).union(keys))
+                if self._tcache.is_synced(fields, scope=scope):
+                    # Requesting recently active torrents with all wanted keys
+                    # is cheaper than requesting all matching torrents again.
+                    log.debug('Requesting incremental list with fields: %s', fields)
+                    response = await self._request_torrents(fields, incremental=True, scope=scope)
+                    if not response.success:
+                        return Response(success=False, torrents=(), errors=response.errors)
+                    tlist = tuple(tfilter.apply(self._filter_candidates(tfilter, self._tcache.get())))
+
+                    # Torrents can start matching without being active (e.g.
+                    # "activity>1h"), so they may lack wanted keys
+                    missing_ids = tuple(t['id'] for t in tlist
+                                        if not all(key in t for key in keys))
+                    if missing_ids:
+                        log.debug('Requesting missing keys of %d torrents', len(missing_ids))
+                        response = await self._get_torrents_by_ids(keys, missing_ids)
+                        if not response.success:
+                            return Response(success=False, torrents=(), errors=response.errors)
+                    return self._filtered_response(tfilter, tlist)
+
             # Request all torrents with the keys needed to filter them
             log.debug('Requesting full list with filter keys: %s', tfilter.needed_keys)
             response = await self._get_torrents_by_ids(keys=tfilter.needed_keys,
@@ -346,7 +739,8 @@ class TorrentAPI(TorrentAPIBase):
                 return Response(success=False, torrents=(), errors=response.errors)
             else:
                 # Find IDs of torrents that match tfilter
-                wanted_ids = tuple(t['id'] for t in tfilter.apply(response.torrents))
+                candidates = self._filter_candidates(tfilter, response.torrents)
+                wanted_ids = tuple(t['id'] for t in tfilter.apply(candidates))
                 log.debug('Wanted IDs: %s', wanted_ids)
                 if len(wanted_ids) > 0:
                     # Get only wanted torrents with all wanted keys
@@ -356,43 +750,107 @@ class TorrentAPI(TorrentAPIBase):
                         return Response(success=False, torrents=(), errors=response.errors)
                     else:
                         tlist = tuple(response.torrents)
+                if incremental and not from_cache and keys != 'ALL':
+                    # Matching torrents can now be updated incrementally
+                    self._tcache.mark_synced(TorrentFields(*keys), scope=scope)
+            return self._filtered_response(tfilter, tlist)
 
-            success = len(tlist) > 0
-            msgs = errors = ()
-            if not success:
-                errors = ('No matching torrents: %s' % (tfilter,),)
-            else:
-                msgs = ('Found %d %s torrent%s' %
-                        (len(tlist), tfilter, '' if len(tlist) == 1 else 's'),)
-            return Response(success=success, torrents=tlist, msgs=msgs, errors=errors)
+    @staticmethod
+    def _filter_ids(tfilter):
+        """
+        Return sorted tuple of IDs or hashes of all torrents that may match
+        `tfilter` or `None`
 
-    async def torrents(self, torrents=None, keys='ALL', from_cache=False):
+        Only filters that match every AND chain against one or more 'id=...'
+        (or 'hash=...') filters can be translated.
+        """
+        for name in ('id', 'hash'):
+            def lookup(f, name=name):
+                if f.name == name and f.operator == '=':
+                    return {f.value if name == 'id' else str(f.value)}
+            ids = tfilter.candidates(lookup)
+            if ids is not None:
+                return tuple(sorted(ids))
+
+    def _filter_candidates(self, tfilter, tlist):
+        """
+        Return torrents from `tlist` that may match `tfilter`
+
+        The torrent cache's indexes are used to avoid filtering every torrent
+        if possible.  `tlist` must be up to date in the cache.
+        """
+        tids = tfilter.candidates(self._tcache.lookup)
+        if tids is None:
+            return tlist
+        else:
+            log.debug('Found %d candidates for %s in index', len(tids), tfilter)
+            return self._tcache.get(*tids)
+
+    @staticmethod
+    def _filtered_response(tfilter, tlist):
+        success = len(tlist) > 0
+        msgs = errors = ()
+        if not success:
+            errors = ('No matching torrents: %s' % (tfilter,),)
+        else:
+            msgs = ('Found %d %s torrent%s' %
+                    (len(tlist), tfilter, '' if len(tlist) == 1 else 's'),)
+        return Response(success=success, torrents=tlist, msgs=msgs, errors=errors)
+
+    async def torrents(self, torrents=None, keys='ALL', from_cache=False, incremental=False):
         """
         Get torrents
 
-        torrents:   Sequence of torrent IDs, TorrentFilter object (or its string
-                    representation) or None for all torrents
-        keys:       tuple of Torrent keys to fetch or 'ALL' for all torrents
-        from_cache: Whether to try to get the torrents from a previous request
+        torrents:    Sequence of torrent IDs, TorrentFilter object (or its string
+                     representation) or None for all torrents
+        keys:        tuple of Torrent keys to fetch or 'ALL' for all torrents
+        from_cache:  Whether to try to get the torrents from a previous request
+        incremental: Whether to request only torrents that were recently active
+                     after all torrents were requested once; this is only
+                     useful for repeated requests of the same keys
 
         Return Response with the following properties:
             torrents: Tuple of Torrent objects with requested torrents
             success:  False if no torrents were found, True otherwise
             msgs:     List of info messages
             errors:   List of error messages
+
+        If no cached torrents changed since the previous call with the same
+        arguments, the previous Response object is returned.
         """
         if torrents is None:
-            return await self._get_torrents_by_ids(keys, from_cache=from_cache)
+            response = await self._get_torrents_by_ids(keys, from_cache=from_cache,
+                                                       incremental=incremental)
+            torrents_key = None
         elif isinstance(torrents, (str, TorrentFilter)):
-            return await self._get_torrents_by_filter(keys, tfilter=torrents,
-                                                      from_cache=from_cache)
+            if isinstance(torrents, str):
+                torrents = TorrentFilter(torrents)
+            response = await self._get_torrents_by_filter(keys, tfilter=torrents,
+                                                          from_cache=from_cache,
+                                                          incremental=incremental)
+            # Results of filters that depend on the current time can change
+            # without any changes in the torrent cache
+            torrents_key = str(torrents) if torrents.cacheable else False
         elif (isinstance(torrents, abc.Sequence) and
               all(isinstance(id, int) for id in torrents)):
-            return await self._get_torrents_by_ids(keys, ids=torrents,
-                                                   from_cache=from_cache)
+            response = await self._get_torrents_by_ids(keys, ids=torrents,
+                                                       from_cache=from_cache)
+            torrents_key = tuple(torrents)
         else:
             raise ValueError("Invalid 'torrents' argument: %r" % (torrents,))
 
+        # Return the previous Response if no torrents changed since so callers
+        # (e.g. RequestPoller) can easily detect that nothing changed
+        if response.success and torrents_key is not False:
+            revision = self._tcache.revision
+            if self._responses_revision != revision:
+                self._responses.clear()
+                self._responses_revision = revision
+            key = (torrents_key, keys if keys == 'ALL' else frozenset(keys),
+                   from_cache, incremental)
+            response = self._responses.setdefault(key, response)
+        return response
+
 
     async def _torrent_action(self, method, torrents=None, method_args={},
                               check=None, check_keys=()):
@@ -718,6 +1176,7 @@ class TorrentAPI(TorrentAPIBase):
             msgs = response.msgs
 
         # Fetch new torrent data and return final response
+        self._tcache.forget_static(tid)
         response = await self._get_torrents_by_ids(ids=(tid,),
                                                    keys=('name', 'id', 'files'))
         if not response.success:
@@ -12,8 +12,10 @@
 """Low-level communication with the Transmission daemon"""
 
 import asyncio
+import hashlib
 import json
 import warnings
+from collections import OrderedDict
 
 import async_timeout
 from blinker import Signal
@@ -29,6 +31,83 @@ AUTH_ERROR_CODE = 401
 CSRF_ERROR_CODE = 409
 CSRF_HEADER = 'X-Transmission-Session-Id'
 TIMEOUT = 10
+MAX_CONCURRENT_REQUESTS = 4
+
+# Idle connections are closed after this many seconds; this must be shorter
+# than the daemon's (or reverse proxy's) keep-alive timeout, otherwise we may
+# send requests through connections that were already closed
+KEEPALIVE_TIMEOUT = 15
+
+# Number of seconds host name lookups are cached
+DNS_CACHE_TTL = 300
+
+# Values of the Accept-Encoding header depending on the `compression` property
+ACCEPT_ENCODING = {True: 'gzip, deflate', False: 'identity'}
+
+# Read-only methods; identical requests that are sent while one of them is
+# pending get the same response
+COALESCIBLE_METHODS = ('torrent-get', 'session-get', 'session-stats', 'free-space')
+
+# Number of response bodies (or rather their hashes) that are remembered to
+# detect unchanged responses to read-only requests
+MAX_REMEMBERED_RESPONSES = 32
+
+
+class JSONCodec():
+    """
+    Encode requests and decode responses
+
+    The fastest available JSON implementation is used unless `module` is
+    given.  Supported modules are "orjson", "ujson" (only for decoding) and
+    "json" from the standard library.
+    """
+
+    def __init__(self, module=None):
+        if module is None:
+            module = self._find_module()
+        self._module = module
+        if module.__name__ == 'orjson':
+            self._dumps = self._orjson_dumps
+        else:
+            self._dumps = json.dumps
+
+    @staticmethod
+    def _find_module():
+        for name in ('orjson', 'ujson'):
+            try:
+                return __import__(name)
+            except ImportError:
+                pass
+        return json
+
+    @property
+    def name(self):
+        """Name of the module that decodes responses"""
+        return self._module.__name__
+
+    def _orjson_dumps(self, obj):
+        return self._module.dumps(obj, default=self._orjson_default)
+
+    @staticmethod
+    def _orjson_default(obj):
+        # orjson doesn't serialize subclasses of float (e.g. usertypes.Float)
+        if isinstance(obj, float):
+            return float(obj)
+        elif isinstance(obj, int):
+            return int(obj)
+        raise TypeError('Type is not JSON serializable: %s' % type(obj).__name__)
+
+    def encode(self, obj):
+        """Return `obj` as JSON string or bytes"""
+        return self._dumps(obj)
+
+    def decode(self, data):
+        """
+        Return object from JSON string or bytes
+
+        Raise ValueError if `data` is not valid JSON.
+        """
+        return self._module.loads(data)
 
 
 class TransmissionRPC():
@@ -42,18 +121,23 @@ class TransmissionRPC():
     """
 
     def __init__(self, host='localhost', port=9091, *, tls=False, user='',
-                 password='', path='/transmission/rpc', enabled=True):
+                 password='', path='/transmission/rpc', enabled=True,
+                 max_concurrent_requests=MAX_CONCURRENT_REQUESTS, codec=None,
+                 compression=True, socket_path=None):
         self.host = host
         self.port = port
+        self.socket_path = socket_path
         self.path = path
         self.tls = tls
         self.user = user
         self.password = password
         self._headers = {'content-type': 'application/json'}
+        self.compression = compression
+        self._codec = codec if codec is not None else JSONCodec()
         self._session = None
         self._enabled_event = asyncio.Event()
         self.enabled = enabled
-        self._request_lock = asyncio.Lock()
+        self.max_concurrent_requests = max_concurrent_requests
         self._connecting_lock = asyncio.Lock()
         self._connection_tested = False
         self._connection_exception = None
@@ -65,6 +149,9 @@ class TransmissionRPC():
         self._on_connected = Signal()
         self._on_disconnected = Signal()
         self._on_error = Signal()
+        self._pending_requests = {}  # Map (method, arguments) to futures
+        self._responses = OrderedDict()  # Map (method, arguments) to (body hash, answer)
+        self._stats = {'requests': 0, 'coalesced': 0, 'unchanged': 0}
 
     def __del__(self, _warnings=warnings):
         if self._session is not None and not self._session.closed:
@@ -121,6 +208,7 @@ class TransmissionRPC():
     @host.setter
     def host(self, host):
         self._host = str(host) if host is not None else 'localhost'
+        self._socket_path = None
         asyncio.ensure_future(self.disconnect('Changing host: %r' % self._host))
 
     @property
@@ -153,8 +241,26 @@ class TransmissionRPC():
     @port.setter
     def port(self, port):
         self._port = int(port) if port is not None else 9091
+        self._socket_path = None
         asyncio.ensure_future(self.disconnect('Changing port: %r' % self._port))
 
+    @property
+    def socket_path(self):
+        """
+        Path of the unix domain socket of the Transmission RPC interface or None
+
+        If this is not None, `host` and `port` are ignored.  Setting `host` or
+        `port` sets this property to None.
+
+        Setting this property calls disconnect().
+        """
+        return self._socket_path
+
+    @socket_path.setter
+    def socket_path(self, socket_path):
+        self._socket_path = str(socket_path) if socket_path else None
+        asyncio.ensure_future(self.disconnect('Changing socket path: %r' % self._socket_path))
+
     @property
     def user(self):
         """
@@ -208,10 +314,17 @@ class TransmissionRPC():
         Missing parts are filled in with defaults, e.g. "example.org:1234" results in
         "http://example.org:1234/transmission/rpc".
 
+        "unix:///path/to/socket" connects to a unix domain socket (see
+        `socket_path`).  The path of the RPC interface is set to its default and
+        can be changed with the `path` property.  "unix:/path/to/socket" raises
+        ValueError.
+
         While user and password are supported when setting ("user:password@localhost"),
         they are not included in the return value for security reasons.  See the
         url_unsafe property.
         """
+        if self.socket_path is not None:
+            return 'unix://%s' % (self.socket_path,)
         return '%s://%s:%d%s' % ('https' if self.tls else 'http',
                                  self.host, self.port, self.path)
 
@@ -219,29 +332,66 @@ class TransmissionRPC():
     def url(self, url):
         if url is None:
             url = URL('http://localhost:9091/transmission/rpc')
+        elif str(url).startswith('unix:') and not str(url).startswith('unix://'):
+            # URL() would default to http and parse "unix" as the host
+            raise ValueError('Invalid socket URL: %r (use "unix:///path/to/socket")' % (str(url),))
         else:
             url = URL(url)
-        self._user = url.user or ''
-        self._password = url.password or ''
-        if url.scheme == 'https':
-            self._tls = True
-        elif url.scheme == 'http':
-            self._tls = False
+        if url.scheme == 'unix':
+            if url.path is None:
+                raise ValueError('Missing socket path: %r' % (str(url),))
+            tls, host, port = False, 'localhost', 9091
+            socket_path, path = url.path, '/transmission/rpc'
+        elif url.scheme in ('http', 'https'):
+            tls, host = url.scheme == 'https', url.host
+            port = int(url.port) if url.port is not None else 9091
+            socket_path, path = None, url.path if url.path is not None else '/transmission/rpc'
         else:
             raise ValueError('Invalid scheme: %r' % (url.scheme,))
-        self._host = url.host
-        self._port = int(url.port) if url.port is not None else 9091
-        self._path = url.path if url.path is not None else '/transmission/rpc'
-        asyncio.ensure_future(self.disconnect('Changing url: %r' % self._url))
+        self._user = url.user or ''
+        self._password = url.password or ''
+        self._tls = tls
+        self._host = host
+        self._port = port
+        self._socket_path = socket_path
+        self._path = path
+        asyncio.ensure_future(self.disconnect('Changing url: %r' % self.url))
 
     @property
     def url_unsafe(self):
         """URL of the Transmission RPC interface with user and password if given"""
-        if self.user or self.password:
+        if not self.user and not self.password:
+            return self.url
+        elif self.socket_path is not None:
+            return 'unix://%s:%s@%s' % (self.user, self.password, self.socket_path)
+        else:
             return '%s://%s:%s@%s:%d%s' % ('https' if self.tls else 'http', self.user,
                                            self.password, self.host, self.port, self.path)
-        else:
-            return self.url
+
+    @property
+    def _http_url(self):
+        # The host is only used for the Host header when connecting to a socket
+        if self.socket_path is not None:
+            return '%s://localhost%s' % ('https' if self.tls else 'http', self.path)
+        return self.url
+
+    @property
+    def stats(self):
+        """
+        Dictionary with request counters for debugging
+
+        requests: Number of requests sent to the daemon
+        coalesced: Number of requests that got the response of an identical,
+                   pending request
+        unchanged: Number of responses that were identical to the previous
+                   response to the same request and were not decoded again
+        """
+        return dict(self._stats)
+
+    @property
+    def codec(self):
+        """JSONCodec instance that encodes requests and decodes responses"""
+        return self._codec
 
     @property
     def timeout(self):
@@ -252,6 +402,42 @@ class TransmissionRPC():
     def timeout(self, timeout):
         self._timeout = float(timeout)
 
+    @property
+    def max_concurrent_requests(self):
+        """
+        Maximum number of requests that are sent to the daemon at the same time
+
+        Any further requests wait until one of the pending requests has
+        finished.  Changing this value only affects requests that are not
+        waiting yet.
+        """
+        return self._max_concurrent_requests
+
+    @max_concurrent_requests.setter
+    def max_concurrent_requests(self, max_concurrent_requests):
+        max_concurrent_requests = int(max_concurrent_requests)
+        if max_concurrent_requests < 1:
+            raise ValueError('Maximum number of concurrent requests must be 1 or larger: %r'
+                             % (max_concurrent_requests,))
+        self._max_concurrent_requests = max_concurrent_requests
+        # Requests that already acquired or wait for the previous semaphore keep
+        # using it; new requests use the new one.
+        self._request_semaphore = asyncio.Semaphore(max_concurrent_requests)
+
+    @property
+    def compression(self):
+        """
+        Whether the daemon may send compressed responses
+
+        Compression saves a lot of bandwidth, but it costs CPU time on both
+        ends, which may not be worth it for local daemons.
+        """
+        return self._headers['Accept-Encoding'] == ACCEPT_ENCODING[True]
+
+    @compression.setter
+    def compression(self, compression):
+        self._headers['Accept-Encoding'] = ACCEPT_ENCODING[bool(compression)]
+
     @property
     def enabled(self):
         """
@@ -325,12 +511,23 @@ class TransmissionRPC():
             if self.user or self.password:
                 session_args['auth'] = aiohttp.BasicAuth(self.user, self.password,
                                                          encoding='utf-8')
-            self._session = aiohttp.ClientSession(**session_args)
+            if self.socket_path is not None:
+                connector = aiohttp.UnixConnector(path=self.socket_path,
+                                                  keepalive_timeout=KEEPALIVE_TIMEOUT)
+            else:
+                # Polling sends small requests through the same connections
+                # over and over again.  aiohttp enables TCP_NODELAY for all
+                # connections so that requests aren't delayed by Nagle's
+                # algorithm.
+                connector = aiohttp.TCPConnector(keepalive_timeout=KEEPALIVE_TIMEOUT,
+                                                 use_dns_cache=True,
+                                                 ttl_dns_cache=DNS_CACHE_TTL)
+            self._session = aiohttp.ClientSession(connector=connector, **session_args)
 
             # Check if connection works
             log.debug('Testing connection to %s', self.url)
             try:
-                test_request = json.dumps({'method':'session-get'})
+                test_request = self.codec.encode({'method':'session-get'})
                 info = await self._send_request(test_request)
             except ClientError as e:
                 self._connection_exception = e
@@ -361,6 +558,22 @@ class TransmissionRPC():
                       reason if reason is not None else 'for no reason')
             self._on_disconnected.send(self)
 
+    async def _autoconnect(self, method):
+        # Several requests may be pending when the connection is down.  Only
+        # one of them connects while the others wait for the result instead
+        # of tearing down the new connection and reconnecting again.
+        if self._connecting_lock.locked():
+            log.debug('Waiting for pending connection attempt for %r', method)
+            async with self._connecting_lock:
+                pass
+            if self.connected:
+                return
+            elif self._connection_exception is not None:
+                raise self._connection_exception
+
+        log.debug('Autoconnecting for %r', method)
+        await self.connect()
+
     async def _reset(self):
         if self._session is not None:
             await self._session.close()
@@ -369,10 +582,11 @@ class TransmissionRPC():
         self._rpcversion = None
         self._rpcversionmin = None
         self._connection_tested = False
+        self._responses.clear()
 
-    async def _post(self, data):
+    async def _post(self, data, key=None):
         async with async_timeout.timeout(self.timeout):
-            response = await self._session.post(self.url, data=data, headers=self._headers)
+            response = await self._session.post(self._http_url, data=data, headers=self._headers)
 
             if response.status == CSRF_ERROR_CODE:
                 # Send request again with CSRF header
@@ -380,7 +594,7 @@ class TransmissionRPC():
                 log.debug('Setting CSRF header: %s = %s',
                           CSRF_HEADER, response.headers[CSRF_HEADER])
                 await response.release()
-                return await self._post(data)
+                return await self._post(data, key)
 
             elif response.status == AUTH_ERROR_CODE:
                 await response.release()
@@ -389,28 +603,50 @@ class TransmissionRPC():
                 raise AuthError(self.url)
 
             else:
-                import aiohttp
+                body = await response.read()
+                if key is not None:
+                    digest = hashlib.sha1(body).digest()
+                    previous = self._responses.get(key)
+                    if previous is not None and previous[0] == digest:
+                        self._responses.move_to_end(key)
+                        self._stats['unchanged'] += 1
+                        log.debug('Response to %r is unchanged', key[0])
+                        return previous[1]
                 try:
-                    answer = await response.json()
-                except aiohttp.ClientResponseError:
+                    answer = self.codec.decode(body)
+                except ValueError:
                     raise RPCError('Server sent malformed JSON: %s' % await response.text())
-                else:
-                    return answer
+                if key is not None:
+                    self._remember_response(key, digest, answer)
+                return answer
+
+    def _remember_response(self, key, digest, answer):
+        responses = self._responses
+        responses[key] = (digest, answer)
+        responses.move_to_end(key)
+        while len(responses) > MAX_REMEMBERED_RESPONSES:
+            responses.popitem(last=False)
 
-    async def _send_request(self, post_data):
+    async def _send_request(self, post_data, key=None):
         """
         Send RPC POST request to daemon
 
         post_data: Any valid RPC request as JSON string
+        key: Hashable that identifies a read-only request or None; if the
+             response body is identical to the previous response for the same
+             `key`, the previous return value is returned again without
+             decoding the body
 
         If applicable, returns response['arguments']['torrents'] or
-        response['arguments'], otherwise response.
+        response['arguments'], otherwise response.  Responses to requests for
+        "recently-active" torrents also contain the IDs of removed torrents, so
+        response['arguments'] is returned for them.
 
         Raises ClientError.
         """
         import aiohttp
         try:
-            answer = await self._post(post_data)
+            answer = await self._post(post_data, key)
 
         # NOTE #163: Letting asyncio.CancelledError bubble up seems to fix the issue that
         #            causes empty torrent lists in new tabs until the next poll iteration.
@@ -429,12 +665,49 @@ class TransmissionRPC():
                 raise RPCError(answer['result'].capitalize())
             else:
                 if 'arguments' in answer:
-                    if 'torrents' in answer['arguments']:
+                    if 'torrents' in answer['arguments'] and 'removed' not in answer['arguments']:
                         return answer['arguments']['torrents']
                     else:
                         return answer['arguments']
                 return answer
 
+    async def _request(self, method, arguments, key=None):
+        async with self._request_semaphore:
+            if not self.connected:
+                await self._autoconnect(method)
+
+            data = {'method'    : method,
+                    'arguments' : arguments}
+            try:
+                rpc_request = self.codec.encode(data)
+            except Exception as e:
+                raise RuntimeError('Invalid JSON data: %s: %r' % (e, data)) from None
+
+            # Remember the session this request is sent through so that a
+            # failing request doesn't kill a connection that was
+            # re-established by a concurrent request in the meantime.
+            session = self._session
+            self._stats['requests'] += 1
+            try:
+                return await self._send_request(rpc_request, key)
+            except ClientError as e:
+                log.debug('Caught ClientError in %r request: %r', method, e)
+
+                # RPCError does not mean host is unreachable, there was just a
+                # misunderstanding, so we're still connected.
+                if not isinstance(e, RPCError) and self.connected and self._session is session:
+                    await self.disconnect(str(e))
+
+                self._on_error.send(self, error=e)
+                raise
+
+    def _forget_request(self, key, future):
+        if self._pending_requests.get(key) is future:
+            del self._pending_requests[key]
+        # Don't complain about unretrieved exceptions if all callers were cancelled
+        if not future.cancelled():
+            future.exception()
+
     def __getattr__(self, method):
         """
         Return asyncio coroutine that sends RPC request and returns response
@@ -446,36 +719,34 @@ class TransmissionRPC():
         >>> stats = await client.session_stats()
         >>> torrents = await client.torrent_get(ids=(1,2,3), fields=('status','name'))
 
+        Read-only requests (see COALESCIBLE_METHODS) return the identical
+        object as the previous call with the same arguments if the response
+        didn't change.  Callers must not modify it.
+
         Raises RPCError, ConnectionError, AuthError
         """
         async def request(arguments=None, **kwargs):
             arguments = arguments or {}
+            arguments.update(**kwargs)
+            rpc_method = method.replace('_', '-')
+            if rpc_method not in COALESCIBLE_METHODS:
+                return await self._request(rpc_method, arguments)
 
-            async with self._request_lock:
-                if not self.connected:
-                    log.debug('Autoconnecting for %r', method)
-                    await self.connect()
-
-                arguments.update(**kwargs)
-                data = {'method'    : method.replace('_', '-'),
-                        'arguments' : arguments}
-                try:
-                    rpc_request = json.dumps(data)
-                except Exception as e:
-                    raise RuntimeError('Invalid JSON data: %s: %r' % (e, data)) from None
-
-                try:
-                    return await self._send_request(rpc_request)
-                except ClientError as e:
-                    log.debug('Caught ClientError in %r request: %r', method, e)
-
-                    # RPCError does not mean host is unreachable, there was just a
-                    # misunderstanding, so we're still connected.
-                    if not isinstance(e, RPCError) and self.connected:
-                        await self.disconnect(str(e))
-
-                    self._on_error.send(self, error=e)
-                    raise
+            try:
+                key = (rpc_method, json.dumps(arguments, sort_keys=True))
+            except Exception as e:
+                raise RuntimeError('Invalid JSON data: %s: %r' % (e, arguments)) from None
+            future = self._pending_requests.get(key)
+            if future is None:
+                future = asyncio.ensure_future(self._request(rpc_method, arguments, key))
+                self._pending_requests[key] = future
+                future.add_done_callback(lambda f: self._forget_request(key, f))
+            else:
+                self._stats['coalesced'] += 1
+                log.debug('Coalescing %r request with identical pending request (%d coalesced)',
+                          rpc_method, self._stats['coalesced'])
+            # Cancelling one caller must not cancel the request for the others
+            return await asyncio.shield(future)
 
         request.__name__ = method
         request.__qualname__ = method
@@ -11,8 +11,13 @@
 
 """Torrent class and value modifiers for compatibility with ttypes"""
 
+import itertools
+import operator
 import os
+import sys
 import time
+from array import array
+from collections import abc
 
 from .. import base, ttypes, utils
 from ..utils import LazyDict
@@ -195,76 +200,261 @@ class TorrentFileID(tuple):
     def __repr__(self):
         return 'TorrentFileID(torrent_id=%d, file_id=%d)' % self
 
+def _effective_priority(wanted, priority):
+    return 'off' if not wanted else priority
+
+
+def _changed_indexes(old, new, chunksize=1024):
+    """Yield indexes of different items in arrays `old` and `new` of equal length"""
+    if old != new:
+        for start in range(0, len(old), chunksize):
+            stop = start + chunksize
+            if old[start:stop] != new[start:stop]:
+                yield from itertools.compress(itertools.count(start),
+                                              map(operator.ne, old[start:stop], new[start:stop]))
+
+
+class _FileColumns():
+    """
+    Values of all files of a torrent in parallel arrays
+
+    Files are identified by their index in the file list provided by
+    Transmission.  `names` are the interned file names without directories and
+    `parents` are indexes in `directories`, which is filled in by
+    TorrentFileTree.
+    """
+
+    def __init__(self, raw_torrent):
+        self.location = raw_torrent['downloadDir']
+        fileStats = raw_torrent['fileStats']
+        if len(fileStats) < 1:
+            # File list is empty if torrent was added by hash and metadata
+            # isn't downloaded yet.
+            self.has_metadata = False
+            self.torrent_id = -1
+            files = ({'name': raw_torrent['name'], 'length': 0},)
+            fileStats = ({'bytesCompleted': 0, 'priority': 0, 'wanted': True},)
+        else:
+            self.has_metadata = True
+            self.torrent_id = raw_torrent['id']
+            files = raw_torrent['files']
+        self.raw_files = files
+
+        self.size_total = array('q', [f['length'] for f in files])
+        self.size_downloaded, self.wanted, self.priority = self.get_stats(fileStats)
+        self.names = []
+        self.parents = array('l')
+        self.directories = []
+
+    @staticmethod
+    def get_stats(fileStats):
+        """Return arrays of bytesCompleted, wanted and priority values"""
+        return (array('q', list(map(operator.itemgetter('bytesCompleted'), fileStats))),
+                array('b', list(map(operator.itemgetter('wanted'), fileStats))),
+                array('b', list(map(operator.itemgetter('priority'), fileStats))))
+
+    def is_outdated(self, raw_torrent):
+        """Whether files were added, renamed or moved"""
+        if not self.has_metadata or raw_torrent['downloadDir'] != self.location:
+            return True
+        elif len(raw_torrent['fileStats']) != len(self.size_total):
+            return True
+        files = raw_torrent.get('files')
+        if files is not None and files is not self.raw_files:
+            if any(map(operator.ne,
+                       (f['name'] for f in files),
+                       (f['name'] for f in self.raw_files))):
+                return True
+            self.raw_files = files
+        return False
+
+
 class TorrentFileTree(base.TorrentFileTreeBase):
+    """
+    Nested mapping of a Torrent's files
+
+    File values are stored in columns that are shared by all subtrees.
+    TorrentFiles are created on demand and are not updated.
+
+    Each subtree keeps running totals of its files' sizes, wanted states and
+    priorities.  `update` only touches files with new values and the
+    directories they are in.
+    """
+
     @classmethod
     def create(cls, raw_torrent):
-        fileStats = raw_torrent['fileStats']
-        if len(fileStats) < 1:
-            # filelist is empty if torrent was added by hash and metadata isn't
-            # downloaded yet.
-            filelist = [{'tid': -1, 'id': TorrentFileID(-1, -1), 'name': raw_torrent['name'],
-                         'priority': 0, 'length': 0, 'wanted': True, 'bytesCompleted': 0}]
+        return cls(_FileColumns(raw_torrent), path=())
+
+    def __init__(self, columns, path, parent=None):
+        super().__init__(columns.location, os.sep.join(path))
+        self._columns = columns
+        self._parent = parent
+        self._index = len(columns.directories)
+        columns.directories.append(self)
+        self._items = {}  # Map names to file indexes or subtrees
+        self._ids = None
+
+        # Running totals of all files in this subtree
+        self._size_total = 0
+        self._size_downloaded = 0
+        self._wanted_count = 0
+        self._priorities = {}  # Maps effective priorities to number of files
+
+        if parent is None:
+            log.debug('Creating new TorrentFileTree for torrent %r', columns.torrent_id)
+            self._add_files()
+
+    def _add_files(self):
+        columns = self._columns
+        names = columns.names
+        parents = columns.parents
+        subtrees = {(): self}
+        for index,path in enumerate(f['name'] for f in columns.raw_files):
+            *dirpath, filename = path.split(os.sep)
+            dirpath = tuple(dirpath)
+            tree = subtrees.get(dirpath)
+            if tree is None:
+                tree = self._get_subtree(subtrees, dirpath)
+            filename = sys.intern(filename)
+            tree._items[filename] = index
+            names.append(filename)
+            parents.append(tree._index)
+
+            size_total = columns.size_total[index]
+            size_downloaded = columns.size_downloaded[index]
+            wanted = columns.wanted[index]
+            priority = columns.priority[index]
+            while tree is not None:
+                tree._add_stats(size_total, size_downloaded, 1, wanted, priority)
+                tree = tree._parent
+
+    def _get_subtree(self, subtrees, dirpath):
+        parent = subtrees.get(dirpath[:-1])
+        if parent is None:
+            parent = self._get_subtree(subtrees, dirpath[:-1])
+        tree = subtrees[dirpath] = TorrentFileTree(self._columns, dirpath, parent=parent)
+        parent._items[sys.intern(dirpath[-1])] = tree
+        return tree
+
+    def _add_stats(self, size_total, size_downloaded, count, wanted, priority):
+        # Add `count` files with `wanted` and `priority` to the running totals
+        self._size_total += size_total
+        self._size_downloaded += size_downloaded
+        if wanted:
+            self._wanted_count += count
+        priorities = self._priorities
+        prio = _effective_priority(wanted, priority)
+        count = priorities.get(prio, 0) + count
+        if count > 0:
+            priorities[prio] = count
         else:
-            # Combine 'files' and 'fileStats' fields and add the 'id' key to each
-            # file, which is a (torrent ID, file list index) tuple
-            tid = raw_torrent['id']
-            filelist = ({'id': TorrentFileID(tid, i), **f, **fS}
-                        for i,(f,fS) in enumerate(zip(raw_torrent['files'], fileStats)))
-        return cls(raw_torrent['id'], raw_torrent['downloadDir'], filelist, path=())
-
-    def __init__(self, torrent_id, torrent_location, filelist, path):
-        log.debug('Creating new TorrentFileTree for torrent %r: %r', torrent_id, path)
-        path_str = os.sep.join(path)
-        super().__init__(torrent_location, path_str)
-
-        items = {}
-        subdirs = {}
-        for entry in filelist:
-            parts = entry['name'].split(os.sep, 1)
-            if len(parts) == 1:
-                filename = parts[0]
-                items[filename] = ttypes.TorrentFile(
-                    tid=torrent_id, id=entry['id'],
-                    name=entry['name'], path=path_str, location=torrent_location,
-                    size_total=entry['length'],
-                    size_downloaded=entry['bytesCompleted'],
-                    is_wanted=entry['wanted'],
-                    priority=entry['priority'])
-
-            elif len(parts) == 2:
-                subdir, subpath = parts
-                if subdir not in subdirs:
-                    subdirs[subdir] = []
-                entry['name'] = subpath
-                subdirs[subdir].append(entry)
+            del priorities[prio]
+
+    def _file(self, index):
+        columns = self._columns
+        tid = columns.torrent_id
+        return ttypes.TorrentFile(
+            tid=tid, id=TorrentFileID(tid, index if columns.has_metadata else -1),
+            name=columns.names[index], path=self._path, location=self._location,
+            size_total=columns.size_total[index],
+            size_downloaded=columns.size_downloaded[index],
+            is_wanted=bool(columns.wanted[index]),
+            priority=columns.priority[index])
+
+    def update(self, raw_torrent):
+        fileStats = raw_torrent['fileStats']
+        if not fileStats:
+            # We don't have any metadata yet, so there is nothing to update
+            return
+
+        columns = self._columns
+        if columns.is_outdated(raw_torrent):
+            # Start over with the new file list
+            self.__init__(_FileColumns(raw_torrent), path=())
+            return
+
+        old_columns = (columns.size_downloaded, columns.wanted, columns.priority)
+        new_columns = columns.get_stats(fileStats)
+        changed = set()
+        for old,new in zip(old_columns, new_columns):
+            changed.update(_changed_indexes(old, new))
+        if not changed:
+            return
+        columns.size_downloaded, columns.wanted, columns.priority = new_columns
+
+        # Move changed files from old to new values in all parent directories
+        old_dl, old_wanted, old_prio = old_columns
+        new_dl, new_wanted, new_prio = new_columns
+        directories = columns.directories
+        parents = columns.parents
+        for index in changed:
+            tree = directories[parents[index]]
+            while tree is not None:
+                tree._add_stats(0, -old_dl[index], -1, old_wanted[index], old_prio[index])
+                tree._add_stats(0, new_dl[index], 1, new_wanted[index], new_prio[index])
+                tree = tree._parent
+
+    @property
+    def files(self):
+        for entry in self._items.values():
+            if isinstance(entry, int):
+                yield self._file(entry)
             else:
-                raise RuntimeError(parts)
+                yield from entry.files
+
+    @property
+    def directories(self):
+        for name,entry in self._items.items():
+            if not isinstance(entry, int):
+                yield (name, entry)
+                yield from entry.directories
 
-        for subdir,filelist in subdirs.items():
-            items[subdir] = TorrentFileTree(torrent_id, torrent_location,
-                                            filelist, path=path + (subdir,))
-        self._items = items
+    def __getitem__(self, key):
+        entry = self._items[key]
+        if isinstance(entry, int):
+            return self._file(entry)
+        return entry
 
-    def update(self, raw_torrent):
-        def update_files(ftree, fileStats):
-            if not fileStats:
-                # We don't have any metadata yet, so there is nothing to update
-                return
-
-            for entry in ftree.values():
-                if isinstance(entry, ttypes.TorrentFile):
-                    # File ID is its index in the list provided by
-                    # Transmission (see _create_TorrentFileTree)
-                    index = entry['id'].file_id
-                    fstats = fileStats[index]
-                    entry.update({'size-downloaded': fstats['bytesCompleted'],
-                                  'is-wanted': fstats['wanted'],
-                                  'priority': fstats['priority'],
-                                  'location': raw_torrent['downloadDir']})
-                else:
-                    update_files(entry, fileStats)
-
-        update_files(self._items, raw_torrent['fileStats'])
+    @property
+    def id(self):
+        if self._ids is None:
+            self._ids = super().id
+        return self._ids
+
+    @property
+    def layout(self):
+        # Columns are replaced when the file list is outdated
+        return self._columns
+
+    @property
+    def torrent_id(self):
+        return self._columns.torrent_id
+
+    @property
+    def size_total(self):
+        return utils.SizeInBytes(self._size_total)
+
+    @property
+    def size_downloaded(self):
+        return utils.SizeInBytes(self._size_downloaded)
+
+    @property
+    def percent_downloaded(self):
+        if self._size_total == 0:
+            return utils.Percent(0)
+        return utils.Percent(self._size_downloaded / self._size_total * 100)
+
+    @property
+    def priority(self):
+        priorities = self._priorities
+        if len(priorities) == 1:
+            for prio in priorities:
+                return ttypes.TorrentFilePriority(prio)
+        return ''
+
+    @property
+    def is_wanted(self):
+        return self._wanted_count > 0
 
 
 class PeerList(tuple):
@@ -431,6 +621,101 @@ DEPENDENCIES = {
     'files'                        : ('files', 'fileStats', 'downloadDir'),
 }
 
+# Map RPC field names to tuples of abstracted keys that depend on them
+_DEPENDENT_KEYS = {}
+for _key,_fields in DEPENDENCIES.items():
+    for _field in _fields:
+        _DEPENDENT_KEYS[_field] = _DEPENDENT_KEYS.get(_field, ()) + (_key,)
+del _key, _fields, _field
+
+# Map RPC fields to indexes in _RawTorrent's list of values
+_FIELD_INDEXES = {field: index for index, field in enumerate(sorted(_DEPENDENT_KEYS))}
+
+_MISSING = object()
+
+
+class _RawTorrent(abc.Mapping):
+    """
+    Mapping of RPC field names to values as provided by Transmission
+
+    Values of the fields in _FIELD_INDEXES are stored in a list at the same
+    index, so all torrents share one key table.  Values of any other fields are
+    stored in a dictionary.
+    """
+
+    __slots__ = ('_values', '_other')
+
+    def __init__(self, raw_torrent):
+        self._values = [_MISSING] * len(_FIELD_INDEXES)
+        self._other = None
+        self.update(raw_torrent)
+
+    def update(self, raw_torrent):
+        """
+        Set fields from `raw_torrent` mapping
+
+        Return list of fields with new values that are not None.
+        """
+        values = self._values
+        changed_fields = []
+        for field,new_value in raw_torrent.items():
+            index = _FIELD_INDEXES.get(field)
+            if index is not None:
+                old_value = values[index]
+                values[index] = new_value
+            else:
+                if self._other is None:
+                    self._other = {}
+                old_value = self._other.get(field, _MISSING)
+                self._other[field] = new_value
+            if new_value is not None and new_value != old_value:
+                changed_fields.append(field)
+        return changed_fields
+
+    def get(self, field, default=None):
+        index = _FIELD_INDEXES.get(field)
+        if index is not None:
+            value = self._values[index]
+            return default if value is _MISSING else value
+        elif self._other is not None:
+            return self._other.get(field, default)
+        else:
+            return default
+
+    def __getitem__(self, field):
+        value = self.get(field, _MISSING)
+        if value is _MISSING:
+            raise KeyError(field)
+        return value
+
+    def __contains__(self, field):
+        index = _FIELD_INDEXES.get(field)
+        if index is not None:
+            return self._values[index] is not _MISSING
+        else:
+            return self._other is not None and field in self._other
+
+    def __iter__(self):
+        for field,index in _FIELD_INDEXES.items():
+            if self._values[index] is not _MISSING:
+                yield field
+        if self._other is not None:
+            yield from self._other
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return '<%s %r>' % (type(self).__name__, dict(self))
+
+
+# RPC fields that don't change once a torrent's metadata is complete, except for
+# renaming, which affects the torrent's name and files.  All other fields are
+# volatile and must be requested every time.
+STATIC_FIELDS = frozenset(('name', 'hashString', 'dateCreated', 'pieceSize', 'pieceCount',
+                           'comment', 'creator', 'magnetLink', 'totalSize', 'files',
+                           'isPrivate', 'addedDate'))
+
 
 class Torrent(base.TorrentBase):
     """
@@ -476,35 +761,84 @@ class Torrent(base.TorrentBase):
         'files'              : TorrentFileTree.create,
     }
 
+    __slots__ = ('_raw', '_cache', '_filter_cache', '_changed_keys', '_revision', '_revision_keys')
+
     def __init__(self, raw_torrent):
-        self._raw = raw_torrent
+        self._raw = _RawTorrent(raw_torrent)
         self._cache = {}
+        self._filter_cache = {}
+        fields = set(raw_torrent)
+        self._changed_keys = frozenset(key for key,deps in DEPENDENCIES.items()
+                                       if fields.issuperset(deps))
+        self._revision = 0
+        self._revision_keys = self._changed_keys  # Keys that changed in the current revision
 
     def update(self, raw_torrent):
         cache = self._cache
         raw_old = self._raw
 
+        # Replace old values and find keys that depend on any RPC field with a
+        # new value
+        changed_keys = set()
+        for field in raw_old.update(raw_torrent):
+            changed_keys.update(_DEPENDENT_KEYS.get(field, ()))
+        self._changed_keys = changed_keys = frozenset(changed_keys)
+
         # Remove cached values if their original/raw value(s) differ
-        for k in tuple(cache):
-            # Each key depends on one or more RPC field
-            fields = DEPENDENCIES[k]
-            for field in fields:
-                new_value = raw_torrent.get(field)
-                old_value = raw_old.get(field)
-                if new_value is not None and new_value != old_value:
-                    # log.debug('Invalidating cached %s/%s: %r -> %r', k, field, old_value, new_value)
-                    # New and previous value differ - if we are dealing with
-                    # more complex data structures (e.g. a file tree), use the
-                    # update() method to update the object in cache instead of
-                    # removing it from the cache.
-                    value = cache[k]
-                    if hasattr(value, 'update') and all(field in raw_torrent for field in fields):
-                        value.update(raw_torrent)
-                    del cache[k]
-                    break
-
-        # Now we can forget the old values
-        raw_old.update(raw_torrent)
+        for k in changed_keys.intersection(cache):
+            # log.debug('Invalidating cached %s', k)
+            # New and previous value differ - if we are dealing with more
+            # complex data structures (e.g. a file tree), use the update()
+            # method to update the object in cache instead of removing it from
+            # the cache.  `raw_torrent` may only contain some of the fields the
+            # object depends on (e.g. "fileStats" but not the static "files"),
+            # so we pass all known fields.
+            value = cache[k]
+            if hasattr(value, 'update'):
+                value.update(raw_old)
+            else:
+                del cache[k]
+
+        # Remove filter results that depend on any changed key
+        if changed_keys:
+            self._revision += 1
+            self._revision_keys = changed_keys
+            filter_cache = self._filter_cache
+            for f in tuple(filter_cache):
+                if not changed_keys.isdisjoint(f.needed_keys):
+                    del filter_cache[f]
+
+    @property
+    def changed_keys(self):
+        """Keys with new values since the previous call to `update`"""
+        return self._changed_keys
+
+    @property
+    def revision(self):
+        """Number of calls to `update` that changed any values"""
+        return self._revision
+
+    def changed_keys_since(self, revision):
+        """
+        Keys with new values since `revision` or None if they are not known
+
+        Only changes since the previous revision are remembered.
+        """
+        if revision == self._revision:
+            return frozenset()
+        elif revision == self._revision - 1:
+            return self._revision_keys
+        else:
+            return None
+
+    @property
+    def filter_cache(self):
+        """
+        Dictionary that maps filters to their result for this torrent
+
+        Results are removed when any of the filter's `needed_keys` changes.
+        """
+        return self._filter_cache
 
     def __getitem__(self, key):
         cache = self._cache
@@ -562,6 +896,7 @@ class Torrent(base.TorrentBase):
 
     def clearcache(self):
         self._cache = {}
+        self._filter_cache = {}
 
 
 class TorrentFields(tuple):
@@ -31,6 +31,8 @@ class TorrentBase(abc.Mapping):
     '__getitem__' and '__iter__'.
     """
 
+    __slots__ = ()
+
     TYPES = {
         'id'                           : int,
         'hash'                         : utils.SHA1,
@@ -189,6 +191,60 @@ class TorrentFileTreeBase(abc.Mapping):
     def id(self):
         return tuple(f['id'] for f in self.files)
 
+    @property
+    def layout(self):
+        """
+        Object that is replaced when files are added, renamed or moved
+
+        Paths in trees with the same `layout` are identical.
+        """
+        return self
+
+    @property
+    def torrent_id(self):
+        """ID of the torrent the files belong to"""
+        for f in self.files:
+            return f['tid']
+
+    def _sum_size(self, key):
+        sizes = tuple(f[key] for f in self.files)
+        # Preserve the original type (Float)
+        first_size = sizes[0]
+        start_value = type(first_size)(0, unit=first_size.unit, prefix=first_size.prefix)
+        return sum(sizes, start_value)
+
+    @property
+    def size_total(self):
+        """Combined size of all files"""
+        return self._sum_size('size-total')
+
+    @property
+    def size_downloaded(self):
+        """Combined number of downloaded bytes of all files"""
+        return self._sum_size('size-downloaded')
+
+    @property
+    def percent_downloaded(self):
+        """Downloaded percentage of all files"""
+        size_total = float(self.size_total)
+        if size_total == 0:
+            return utils.Percent(0)
+        return utils.Percent(float(self.size_downloaded) / size_total * 100)
+
+    @property
+    def priority(self):
+        """Priority of all files or empty string if they have different priorities"""
+        priorities = set(f['priority'] for f in self.files)
+        if len(priorities) == 1:
+            return priorities.pop()
+        else:
+            return ''
+
+    @property
+    def is_wanted(self):
+        """Whether any file is wanted"""
+        return any(f['is-wanted'] for f in self.files)
+
     def __repr__(self):
         return '<%s path=%r: %r>' % (type(self).__name__, self._path, self._items)
 
@@ -12,6 +12,7 @@
 import itertools
 import operator
 import re
+import weakref
 from collections import abc
 
 from ...utils import cliparser
@@ -23,13 +24,19 @@ log = make_logger(__name__)
 BOOLEAN = 'boolean'
 COMPARATIVE = 'comparative'
 
+# Rough estimates of how expensive it is to evaluate a filter for one object
+COST_SCALAR = 1
+COST_ITERABLE = 10
+COST_REGEX = 20
+
 
 class BoolFilterSpec():
     """Boolean filter specification"""
 
     type = BOOLEAN
 
-    def __init__(self, func, *, needed_keys=(), aliases=(), description='No description'):
+    def __init__(self, func, *, needed_keys=(), aliases=(), description='No description',
+                 cost=COST_SCALAR):
         if not func:
             self.filter_function = None
             needed_keys = ()
@@ -38,6 +45,7 @@ class BoolFilterSpec():
         self.needed_keys = needed_keys
         self.aliases = aliases
         self.description = description
+        self.cost = cost
 
 
 class CmpFilterSpec():
@@ -47,7 +55,7 @@ class CmpFilterSpec():
 
     def __init__(self, *, value_type, value_getter=None, value_matcher=None,
                  value_convert=None, as_bool=None, needed_keys=(), aliases=(),
-                 description='No description'):
+                 description='No description', cost=COST_SCALAR):
         """
         value_type    : Subclass of `type` (i.e. something that returns an instance when
                         called and can be passed to `isinstance` as the second argument
@@ -62,20 +70,30 @@ class CmpFilterSpec():
         as_bool       : Callable that takes an item and returns True/False
         needed_keys   : Needed keys for this filter
         aliases       : Alternative names of this filter
+        cost          : Estimated cost of getting and matching the value (see
+                        COST_* constants)
         """
         self.value_type = value_type
         self.needed_keys = needed_keys
         self.aliases = aliases
         self.description = description
+        self.cost = cost
         self.value_convert = value_convert if value_convert is not None else value_type
 
+        # Key that is used to get the value from an item or None if
+        # `value_getter` is used
+        self.value_key = None
         if value_getter is not None:
             self.value_getter = value_getter
         elif len(self.needed_keys) == 1:
             self.value_getter = lambda dct, k=needed_keys[0]: dct[k]
+            self.value_key = needed_keys[0]
         else:
             raise TypeError('Missing argument with needed_keys=%r: value_getter', self.needed_keys)
 
+        # Whether `value_matcher` must be called to match items (compiled
+        # filters inline the default value matcher)
+        self.custom_value_matcher = value_matcher is not None
         if value_matcher is None:
             def value_matcher(item, op, user_value, vg=self.value_getter):
                 item_value = vg(item)
@@ -151,6 +169,14 @@ class Filter():
     BOOLEAN_FILTERS = {}
     COMPARATIVE_FILTERS = {}
 
+    # Names of filters that depend on something other than their needed keys
+    # (e.g. the current time) so their results must not be cached
+    UNCACHEABLE_FILTERS = ()
+
+    # Map filters to [<number of evaluated objects>, <number of matches>];
+    # equal filters share their counters
+    _counters = weakref.WeakKeyDictionary()
+
     @classmethod
     def _resolve_alias(cls, name):
         """
@@ -191,7 +217,7 @@ class Filter():
     @classmethod
     def _make_filter(cls, name, op, user_value, invert):
         """
-        Return filter function, needed keys and invert
+        Return filter function, needed keys, invert and validated user value
 
         Filter function takes a value and returns whether it matches
         `user_value`.
@@ -207,9 +233,9 @@ class Filter():
 
         fspec = cls._get_filter_spec(name)
         if fspec.type is BOOLEAN:
-            return (fspec.filter_function, fspec.needed_keys, invert)
+            return (fspec.filter_function, fspec.needed_keys, invert, user_value)
         elif fspec.type is COMPARATIVE:
-            return fspec.make_filter(cls.OPERATORS.get(op), user_value, invert)
+            return fspec.make_filter(cls.OPERATORS.get(op), user_value, invert) + (user_value,)
 
     @classmethod
     def _validate_user_value(cls, name, op, user_value):
@@ -333,7 +359,7 @@ class Filter():
         try:
             log.debug('  Getting filter spec: name=%r, op=%r, user_value=%r', name, op, user_value)
             # Get filter spec by `name`
-            filter_func, needed_keys, invert = self._make_filter(name, op, user_value, invert)
+            filter_func, needed_keys, invert, value = self._make_filter(name, op, user_value, invert)
         except ValueError:
             # Filter spec lookup failed
             if self.DEFAULT_FILTER and user_value is op is None:
@@ -343,7 +369,7 @@ class Filter():
                 name, op, user_value = self.DEFAULT_FILTER, self.DEFAULT_OPERATOR, name
                 log.debug('  Using name as value for default filter: name=%r, op=%r, user_value=%r',
                           name, op, user_value)
-                filter_func, needed_keys, invert = self._make_filter(name, op, user_value, invert)
+                filter_func, needed_keys, invert, value = self._make_filter(name, op, user_value, invert)
             else:
                 # No DEFAULT_FILTER is set, so we can't default to it
                 raise
@@ -351,6 +377,13 @@ class Filter():
         log.debug('  Final filter: name=%r, invert=%r, op=%r, user_value=%r',
                   name, invert, op, user_value)
         self._filter_func = filter_func
+        self._value = value
+        if filter_func is None:
+            self._cost = 0
+        else:
+            self._cost = self._get_filter_spec(name).cost
+            if op == '=~':
+                self._cost += COST_REGEX
         self._needed_keys = needed_keys
         self._name, self._invert, self._op, self._user_value = name, invert, op, user_value
         self._hash = hash((name, invert, op, user_value))
@@ -389,6 +422,46 @@ class Filter():
         else:
             return bool(is_wanted(obj)) ^ self._invert
 
+    def _source(self, obj, namespace):
+        """
+        Return Python source code that matches the object in variable `obj`
+
+        Return a list of statements that must be executed first and an
+        expression that is true if the object matches.  Any values that are
+        referenced by the source code are added to `namespace`.
+
+        If this filter matches everything or nothing, return `None` and `True`
+        or `False`.
+        """
+        def const(value):
+            name = '_c%d' % len(namespace)
+            namespace[name] = value
+            return name
+
+        if self._filter_func is None:
+            return None, not self._invert
+
+        statements = []
+        fspec = self._get_filter_spec(self._name)
+        if fspec.type is COMPARATIVE and self._value is not None:
+            op, value = const(self.OPERATORS[self._op]), const(self._value)
+            if fspec.custom_value_matcher:
+                expr = '%s(%s, %s, %s)' % (const(fspec.value_matcher), obj, op, value)
+            else:
+                # Inline the default value matcher
+                if fspec.value_key is not None:
+                    statements.append('_v = %s[%r]' % (obj, fspec.value_key))
+                else:
+                    statements.append('_v = %s(%s)' % (const(fspec.value_getter), obj))
+                expr = ('(any(%s(x, %s) for x in _v) if isinstance(_v, %s) else %s(_v, %s))'
+                        % (op, value, const(abc.Iterator), op, value))
+        else:
+            expr = '%s(%s)' % (const(self._filter_func), obj)
+
+        if self._invert:
+            expr = 'not ' + expr
+        return statements, expr
+
     def __str__(self):
         if self._name is None:
             return self.DEFAULT_FILTER or ''
@@ -414,10 +487,50 @@ class Filter():
     def needed_keys(self):
         return self._needed_keys
 
+    @property
+    def name(self):
+        """Name of the filter"""
+        return self._name
+
+    @property
+    def operator(self):
+        """Comparison operator as string or `None`"""
+        return self._op
+
+    @property
+    def value(self):
+        """User-given value converted to the filter's value type or `None`"""
+        return self._value
+
     @property
     def match_everything(self):
         return not self._filter_func
 
+    @property
+    def cost(self):
+        """Estimated cost of matching one object (see COST_* constants)"""
+        return self._cost
+
+    @property
+    def counters(self):
+        """List of the number of evaluated objects and the number of matches"""
+        counters = Filter._counters.get(self)
+        if counters is None:
+            counters = Filter._counters[self] = [0, 0]
+        return counters
+
+    @property
+    def selectivity(self):
+        """Fraction of evaluated objects that matched or `None` if unknown"""
+        evaluated, matched = self.counters
+        if evaluated > 0:
+            return matched / evaluated
+
+    @property
+    def cacheable(self):
+        """Whether the result for an object only changes if any of `needed_keys` change"""
+        return self._name not in self.UNCACHEABLE_FILTERS
+
     @property
     def inverted(self):
         return self._invert
@@ -469,6 +582,8 @@ class FilterChain(metaclass=_forward_attrs):
                              % (type(filters).__name__, filters))
 
         self._filterchains = ()
+        self._compiled = None
+        self._compiled_chains = ()
 
         # Split `filters` at boolean operators
         parts = cliparser.tokenize(filters, delims=('&', '|'))
@@ -506,33 +621,176 @@ class FilterChain(metaclass=_forward_attrs):
 
             fchain = [[]]
             for filter,op in itertools.zip_longest(filters, ops):
-                fchain[-1].append(filter)
+                # Filters that appear twice in the same AND chain are redundant
+                if filter not in fchain[-1]:
+                    fchain[-1].append(filter)
                 if op == '|':
                     fchain.append([])
             log.debug('Chained %r and %r to %r', filters, ops, fchain)
             self._filterchains = tuple(tuple(x) for x in fchain)
 
-    def apply(self, objects):
-        """Yield matching objects from iterable `objects`"""
-        chains = self._filterchains
-        if chains:
+    def apply(self, objects, cache=None):
+        """
+        Yield matching objects from iterable `objects`
+
+        cache: None or dictionary that is shared between multiple calls to
+               `apply` or `match` (see `match`)
+        """
+        if self._filterchains:
+            match = self.match
             for obj in objects:
-                if any(all(f.match(obj) for f in AND_chain)
-                       for AND_chain in chains):
+                if match(obj, cache):
                     yield obj
+            # New counters may have changed the optimal order of filters
+            if self._compiled is not None and self._optimized_chains() != self._compiled_chains:
+                log.debug('Reordering %r', self)
+                self._compiled = None
         else:
             yield from objects
 
-    def match(self, obj):
-        """Whether `obj` matches this filter chain"""
-        # All filters in an AND_chain must match for the AND_chain to
-        # match.  At least one AND_chain must match.
-        chains = self._filterchains
-        if not chains:
+    def match(self, obj, cache=None):
+        """
+        Whether `obj` matches this filter chain
+
+        cache: None or dictionary that maps `id(obj)` to a dictionary that maps
+               each individual filter to its result; this allows multiple
+               filter chains that share individual filters to evaluate each
+               filter only once per object
+
+        Because `id` is used to identify objects, `cache` must not outlive any
+        of the objects it was used with.
+
+        If `obj` has a `filter_cache` attribute, it is used instead of `cache`
+        and it must be a dictionary that `obj` removes filter results from when
+        any of the filter's `needed_keys` change.  Filters that are not
+        `cacheable` are not stored in `filter_cache`.
+        """
+        if not self._filterchains:
             return True
+
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self._compiled = self._compile()
+        match, match_cached = compiled
+
+        results = getattr(obj, 'filter_cache', None)
+        if results is not None:
+            return match_cached(obj, results, True)
+        elif cache is not None:
+            obj_id = id(obj)
+            results = cache.get(obj_id)
+            if results is None:
+                results = cache[obj_id] = {}
+            return match_cached(obj, results, False)
         else:
-            return any(all(f.match(obj) for f in AND_chain)
-                       for AND_chain in chains)
+            return match(obj)
+
+    # Number of evaluations a filter needs before its selectivity is trusted
+    _MIN_EVALUATIONS = 100
+
+    @classmethod
+    def _rank(cls, filter):
+        evaluated, matched = filter.counters
+        if evaluated < cls._MIN_EVALUATIONS:
+            selectivity = 0.5
+        else:
+            selectivity = matched / evaluated
+        # Cheap filters that reject many objects should be evaluated first
+        return filter.cost / max(1 - selectivity, 0.01)
+
+    def _optimized_chains(self):
+        """Return filter chains with each AND chain sorted by cost and selectivity"""
+        return tuple(tuple(sorted(AND_chain, key=self._rank))
+                     for AND_chain in self._filterchains)
+
+    def _compile(self):
+        """
+        Turn filter chains into Python functions
+
+        Return two functions: `match(obj)` and `match_cached(obj, results,
+        persistent)`, which gets and stores the result of each individual
+        filter in `results` (see `match`).
+
+        All filters in an AND chain must match for the AND chain to match.  At
+        least one AND chain must match.  Inverters, operators and user values
+        are referenced as constants by the generated code.
+
+        Filters in each AND chain are ordered by `_rank` and count how many
+        objects they evaluated and matched.
+        """
+        self._compiled_chains = chains = self._optimized_chains()
+        namespace = {}
+        match_lines = ['def match(obj):']
+        match_cached_lines = ['def match_cached(obj, results, persistent):',
+                              '    get = results.get']
+        for AND_chain in chains:
+            sources = []
+            for f in AND_chain:
+                statements, expr = f._source('obj', namespace)
+                if expr is True:
+                    # Filter matches everything
+                    continue
+                elif expr is False:
+                    # Filter matches nothing
+                    break
+                sources.append((f, statements, expr))
+            else:
+                indent = '    '
+                for f, statements, expr in sources:
+                    cname = '_n%d' % len(namespace)
+                    namespace[cname] = f.counters
+                    match_lines.extend(indent + stmt for stmt in statements)
+                    match_lines.append('%s%s[0] += 1' % (indent, cname))
+                    match_lines.append('%sif %s:' % (indent, expr))
+                    match_lines.append('%s    %s[1] += 1' % (indent, cname))
+
+                    fname = '_f%d' % len(namespace)
+                    namespace[fname] = f
+                    match_cached_lines.append('%sr = get(%s)' % (indent, fname))
+                    match_cached_lines.append('%sif r is None:' % (indent,))
+                    match_cached_lines.extend(indent + '    ' + stmt for stmt in statements)
+                    match_cached_lines.append('%s    r = True if %s else False' % (indent, expr))
+                    match_cached_lines.append('%s    %s[0] += 1' % (indent, cname))
+                    match_cached_lines.append('%s    %s[1] += r' % (indent, cname))
+                    if f.cacheable:
+                        match_cached_lines.append('%s    results[%s] = r' % (indent, fname))
+                    else:
+                        match_cached_lines.append('%s    if not persistent:' % (indent,))
+                        match_cached_lines.append('%s        results[%s] = r' % (indent, fname))
+                    match_cached_lines.append('%sif r:' % (indent,))
+                    indent += '    '
+                match_lines.append(indent + 'return True')
+                match_cached_lines.append(indent + 'return True')
+        match_lines.append('    return False')
+        match_cached_lines.append('    return False')
+
+        source = '\n'.join(match_lines + match_cached_lines)
+        log.debug('Compiled %r:\n%s', str(self), source)
+        exec(compile(source, '<%s %r>' % (type(self).__name__, str(self)), 'exec'), namespace)
+        return namespace['match'], namespace['match_cached']
+
+    def candidates(self, lookup):
+        """
+        Return set of IDs of objects that may match or `None`
+
+        lookup: Callable that takes a non-inverted filter and returns a set of
+                IDs of all objects that may match it or `None` if it doesn't
+                know
+
+        Return `None` if any AND chain has no filter that `lookup` knows.
+        """
+        ids = set()
+        for AND_chain in self._filterchains:
+            chain_ids = None
+            for f in AND_chain:
+                if not f.inverted and not f.match_everything:
+                    f_ids = lookup(f)
+                    if f_ids is not None:
+                        chain_ids = f_ids if chain_ids is None else chain_ids & f_ids
+            if chain_ids is None:
+                return None
+            ids.update(chain_ids)
+        return ids if self._filterchains else None
 
     @property
     def needed_keys(self):
@@ -543,6 +801,16 @@ class FilterChain(metaclass=_forward_attrs):
                 keys.update(filter.needed_keys)
         return tuple(keys)
 
+    @property
+    def filters(self):
+        """Set of all individual filters"""
+        return frozenset(f for chain in self._filterchains for f in chain)
+
+    @property
+    def cacheable(self):
+        """Whether all filters are `cacheable`"""
+        return all(f.cacheable for chain in self._filterchains for f in chain)
+
     def __eq__(self, other):
         if not isinstance(other, type(self)):
             return NotImplemented
@@ -13,7 +13,8 @@
 
 from ..base import TorrentBase
 from ..utils import Bandwidth, BoolOrBandwidth, Status, convert
-from .base import BoolFilterSpec, CmpFilterSpec, Filter, FilterChain, FilterSpecDict
+from .base import (COST_ITERABLE, BoolFilterSpec, CmpFilterSpec, Filter, FilterChain,
+                   FilterSpecDict)
 from .utils import cmp_timestamp_or_timdelta, limit_rate_filter, timestamp_or_timedelta
 
 
@@ -38,6 +39,9 @@ _STATUS_STOPPED   = Status.STOPPED
 class _SingleFilter(Filter):
     DEFAULT_FILTER = 'name'
 
+    # These filters may compare against a time relative to now
+    UNCACHEABLE_FILTERS = ('eta', 'created', 'added', 'started', 'activity', 'completed')
+
     BOOLEAN_FILTERS = FilterSpecDict({
         'all'         : BoolFilterSpec(None,
                                        aliases=('*',),
@@ -201,6 +205,7 @@ class _SingleFilter(Filter):
                                           value_type=str,
                                           needed_keys=('trackers',),
                                           aliases=('trk',),
+                                          cost=COST_ITERABLE,
                                           description=_desc('... domain of the announce URL of trackers')),
 
         'eta'             : CmpFilterSpec(value_getter=lambda t: t['timespan-eta'],
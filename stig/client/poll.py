@@ -49,10 +49,16 @@ class RequestPoller():
     interval: Delay between calls
 
     Any other positional or keyword arguments are passed to `request`.
+
+    If `request` returns the same object as in the previous call (e.g. because
+    the server sent an identical response), 'unchanged' callbacks are called
+    instead of 'response' callbacks.
     """
     def __init__(self, request, *args, interval=1, **kwargs):
         self._on_response = blinker.Signal()
+        self._on_unchanged = blinker.Signal()
         self._on_error = blinker.Signal()
+        self._prev_response = None
         self._prev_error = None
         self._interval = interval
         self._poll_task = None
@@ -125,7 +131,11 @@ class RequestPoller():
         if self._skip_ongoing_request:
             log.debug('Request was skipped - not running callbacks: %s', self)
             self._skip_ongoing_request = False
+        elif response is not None and response is self._prev_response:
+            log.debug('Response is unchanged: %s', self)
+            self._on_unchanged.send(response)
         else:
+            self._prev_response = response
             log.debug('Running callbacks: %s', self)
             self._on_response.send(response)
             # Ignore duplicate errors
@@ -194,6 +204,7 @@ class RequestPoller():
 
         self._debug_info['request'] = _func_call_str(request, *args, **kwargs)
         log.debug('Setting new request: %s', self)
+        self._prev_response = None
         if args or kwargs:
             self._request = functools.partial(request, *args, **kwargs)
         else:
@@ -224,6 +235,15 @@ class RequestPoller():
                   self._debug_info['update_cbs'][-1], self._debug_info['request'])
         self._on_response.connect(callback, weak=autoremove)
 
+    def on_unchanged(self, callback, autoremove=True):
+        """
+        Register `callback` to receive responses that are identical to the
+        previous response (see `on_response`)
+        """
+        log.debug('Registering %r to receive unchanged %s responses',
+                  _func_call_str(callback), self._debug_info['request'])
+        self._on_unchanged.connect(callback, weak=autoremove)
+
     def on_error(self, callback, autoremove=True):
         """Register `callback` to receive request exceptions (see `on_response`)"""
         self._debug_info['error_cbs'].append(_func_call_str(callback))
@@ -9,32 +9,159 @@
 # GNU General Public License for more details
 # http://www.gnu.org/licenses/gpl-3.0.txt
 
-from functools import partial
-
 from ...logging import make_logger  # isort:skip
 log = make_logger(__name__)
 
 
+# Values of types with these comparison methods can be compared as parts of
+# tuples; other types (e.g. Status or Timestamp) may be neither equal nor
+# less/greater than each other, which tuple comparison doesn't expect.
+_PLAIN_EQ = (int.__eq__, float.__eq__, str.__eq__)
+_PLAIN_LT = (int.__lt__, float.__lt__, str.__lt__)
+_PLAIN_NEG = (int.__neg__, float.__neg__)
+
+_NUMBER = 'number'
+_STRING = 'string'
+
+
+def _column_type(column):
+    """Return _NUMBER, _STRING or None if `column` can't be combined with other columns"""
+    coltype = None
+    for type_ in set(map(type, column)):
+        if type_.__eq__ not in _PLAIN_EQ or type_.__lt__ not in _PLAIN_LT:
+            return None
+        elif issubclass(type_, str):
+            this_coltype = _STRING
+        elif type_.__neg__ in _PLAIN_NEG:
+            this_coltype = _NUMBER
+        else:
+            return None
+        if coltype is None:
+            coltype = this_coltype
+        elif coltype != this_coltype:
+            return None
+    return coltype
+
+
+def _plain(column, coltype, negate):
+    """
+    Convert values in `column` to plain int, float or str
+
+    Subclasses of built-in types are compared much slower than the built-in
+    types themselves.
+    """
+    if not negate and set(map(type, column)).issubset((int, float, str)):
+        return column
+    elif coltype == _STRING:
+        return [str.__str__(value) for value in column]
+    elif negate:
+        return [float.__neg__(value) if isinstance(value, float) else int.__neg__(value)
+                for value in column]
+    else:
+        return [float.__pos__(value) if isinstance(value, float) else int.__pos__(value)
+                for value in column]
+
+
+def _sort(items, keyfuncs, inplace=False, item_getter=lambda item: item):
+    """
+    Sort `items` by multiple keys
+
+    keyfuncs: Sequence of (keyfunc, reverse) tuples from least to most
+              significant
+
+    Each key is computed once per item.  Consecutive keys are combined into
+    tuples so they can be sorted in one pass if their values compare
+    consistently.  Numeric keys are negated if their sort direction differs.
+    Everything else is sorted in its own (stable) pass, which gives the same
+    result as sorting `items` once per key.
+    """
+    if not items:
+        return items
+    elif len(keyfuncs) == 1:
+        keyfunc, reverse = keyfuncs[0]
+        sorted_items = sorted(items, key=lambda item: keyfunc(item_getter(item)), reverse=reverse)
+    else:
+        sorted_items = _sort_by_columns(items, keyfuncs, item_getter)
+
+    if inplace:
+        items[:] = sorted_items
+        return items
+    else:
+        return sorted_items
+
+
+def _sort_by_columns(items, keyfuncs, item_getter):
+    objs = [item_getter(item) for item in items]
+
+    # Group key columns that can be sorted in one pass
+    groups = []  # List of (reverse, [column, column, ...], combinable)
+    for keyfunc,reverse in keyfuncs:
+        column = [keyfunc(obj) for obj in objs]
+        coltype = _column_type(column)
+        group = groups[-1] if groups and groups[-1][2] else None
+        if coltype is None:
+            groups.append((reverse, [column], False))
+        elif group is None:
+            groups.append((reverse, [_plain(column, coltype, False)], True))
+        elif group[0] == reverse:
+            group[1].append(_plain(column, coltype, False))
+        elif coltype == _NUMBER:
+            group[1].append(_plain(column, coltype, True))
+        else:
+            groups.append((reverse, [_plain(column, coltype, False)], True))
+
+    order = list(range(len(objs)))
+    for reverse,columns,_ in groups:
+        if len(columns) == 1:
+            keys = columns[0]
+        else:
+            # Most significant key first
+            keys = list(zip(*reversed(columns)))
+        order.sort(key=keys.__getitem__, reverse=reverse)
+
+    return [items[i] for i in order]
+
+
+class _SortKey():
+    """Sort key of a single item that compares like the item is sorted"""
+
+    __slots__ = ('_values', '_reverses')
+
+    def __init__(self, values, reverses):
+        self._values = values      # Most significant first
+        self._reverses = reverses
+
+    def __eq__(self, other):
+        if not isinstance(other, _SortKey):
+            return NotImplemented
+        return self._values == other._values
+
+    def __lt__(self, other):
+        for value,other_value,reverse in zip(self._values, other._values, self._reverses):
+            if value < other_value:
+                return not reverse
+            elif other_value < value:
+                return reverse
+        return False
+
+    def __repr__(self):
+        return '<%s %r>' % (type(self).__name__, self._values)
+
+
 class SortSpec():
     def __init__(self, *keyfuncs, description, aliases=()):
         self._keyfuncs = keyfuncs
         self.description = description
         self.aliases = aliases
 
-    def __call__(self, items, reverse=False, inplace=False, item_getter=lambda item: item):
-        if not items:
-            return items
-
-        for keyfunc in self._keyfuncs:
-            def key_getter(item):
-                return keyfunc(item_getter(item))
+    @property
+    def keyfuncs(self):
+        """Key functions from least to most significant"""
+        return self._keyfuncs
 
-            if inplace:
-                items[:] = sorted(items, key=key_getter, reverse=reverse)
-            else:
-                items = sorted(items, key=key_getter, reverse=reverse)
-
-        return items
+    def __call__(self, items, reverse=False, inplace=False, item_getter=lambda item: item):
+        return _sort(items, tuple((keyfunc, reverse) for keyfunc in self._keyfuncs),
+                     inplace=inplace, item_getter=item_getter)
 
 
 class _SorterBaseMeta(type):
@@ -60,7 +187,7 @@ class SorterBase(metaclass=_SorterBaseMeta):
 
     def __init__(self, sortstrings=()):
         sortspecs = []
-        sortfuncs = []
+        reverses = []
         strings = []   # String representations of sortspecs
 
         # Go through items in reverse because we want to deduplicate sort orders
@@ -80,9 +207,8 @@ class SorterBase(metaclass=_SorterBaseMeta):
             else:
                 sortspec = self.SORTSPECS[sortspecname]
                 if sortspec not in sortspecs:
-                    sortfunc = partial(sortspec, reverse=reverse)
                     sortspecs.insert(0, sortspec)
-                    sortfuncs.insert(0, sortfunc)
+                    reverses.insert(0, reverse)
                     strings.insert(0, (self.INVERT_CHARS[0] if reverse else '') + sortspecname)
         self._strings = tuple(strings)
 
@@ -90,11 +216,15 @@ class SorterBase(metaclass=_SorterBaseMeta):
         if self.DEFAULT_SORT is not None:
             default_sortspec = self.SORTSPECS[self.DEFAULT_SORT]
             if default_sortspec not in sortspecs:
-                sortfuncs.insert(0, default_sortspec)
                 sortspecs.insert(0, default_sortspec)
+                reverses.insert(0, False)
 
         self._sortspecs = sortspecs
-        self._sortfuncs = sortfuncs
+        # Key functions and sort directions from least to most significant
+        self._keyfuncs = tuple((keyfunc, reverse)
+                               for sortspec,reverse in zip(sortspecs, reverses)
+                               for keyfunc in sortspec.keyfuncs)
+        self._reverses = tuple(reverse for _,reverse in reversed(self._keyfuncs))
 
     def apply(self, items, inplace=False, item_getter=lambda item: item):
         """
@@ -110,8 +240,7 @@ class SorterBase(metaclass=_SorterBaseMeta):
         import time
         start_time = time.monotonic()
 
-        for sorter in self._sortfuncs:
-            items = sorter(items, inplace=inplace, item_getter=item_getter)
+        items = _sort(items, self._keyfuncs, inplace=inplace, item_getter=item_getter)
 
         log.debug('-> Sorted %d items by %s in %.3fms',
                   len(items), self, (time.monotonic() - start_time) * 1e3)
@@ -119,6 +248,18 @@ class SorterBase(metaclass=_SorterBaseMeta):
         if not inplace:
             return items
 
+    def key(self, obj):
+        """
+        Return sort key for `obj`
+
+        Sort keys of different objects compare like the objects are sorted by
+        `apply`, which allows to find the position of an object in an already
+        sorted sequence, e.g. with the `bisect` module.  Objects with equal
+        sort keys keep their order in `apply`.
+        """
+        return _SortKey(tuple(keyfunc(obj) for keyfunc,_ in reversed(self._keyfuncs)),
+                        self._reverses)
+
     def __add__(self, other):
         cls = type(self)
         if not isinstance(other, cls):
@@ -36,6 +36,10 @@ class TorrentRequestPool(RequestPoller):
         self._keys = {}
         super().__init__(request=None, interval=interval)
         self.on_response(self._handle_torrent_list)
+        # Subscribers may display or filter for values that depend on the
+        # current time (e.g. "activity<10s"), so they are also updated if
+        # nothing changed
+        self.on_unchanged(self._handle_torrent_list)
 
     def register(self, sid, callback, keys=(), tfilter=None):
         """Add new request to request pool
@@ -72,7 +76,8 @@ class TorrentRequestPool(RequestPoller):
             log.debug('No subscribers - setting request to None')
             self.set_request(None)
         else:
-            kwargs = {}
+            # Only request torrents that changed recently after the initial request
+            kwargs = {'incremental': True}
 
             all_filters = tuple(self._tfilters.values())
             if not all_filters or None in all_filters:
@@ -93,6 +98,11 @@ class TorrentRequestPool(RequestPoller):
             log.debug('Combined keys: %s', kwargs['keys'])
             self.set_request(self._api.torrents, **kwargs)
 
+        # Torrents remember filter results; only keep those of our subscribers
+        self._api.forget_filter_results(keep={f for tfilter in self._tfilters.values()
+                                              if tfilter is not None
+                                              for f in tfilter.filters})
+
     def _handle_torrent_list(self, response):
         # If the request failed, response is None and tlist is empty.
         tlist = response.torrents if response is not None else ()
@@ -115,14 +125,17 @@ class TorrentRequestPool(RequestPoller):
             send(event, tlist)
         else:
             # More than 1 subscriber means we have to filter the torrents
-            # again for each one.
+            # again for each one.  Subscribers often use the same filters
+            # (e.g. "downloading" and "downloading&private"), so each
+            # individual filter's result is shared between all of them.
+            cache = {}
             for event,filter in self._tfilters.items():
                 if filter is None:
                     # Subscriber wants all torrents
                     this_tlist = tlist
                 else:
                     # Subscriber wants filtered torrents
-                    this_tlist = filter.apply(tlist)
+                    this_tlist = tuple(filter.apply(tlist, cache=cache))
                 send(event, this_tlist)
 
         # Remove dead subscribers
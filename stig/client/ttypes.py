@@ -126,21 +126,27 @@ class TorrentFile(abc.Mapping):
                 self._cache[key] = val
         return self._cache[key]
 
+    # Cached values that must be removed when a raw value changes
+    _DEPENDENT_KEYS = {
+        'tid'             : ('tid',),
+        'id'              : ('id',),
+        'name'            : ('name', 'path-absolute', 'path-relative'),
+        'path'            : ('path-absolute', 'path-relative'),
+        'location'        : ('location', 'path-absolute'),
+        'size-total'      : ('size-total', '%downloaded'),
+        'size-downloaded' : ('size-downloaded', '%downloaded'),
+        'is-wanted'       : ('is-wanted', 'priority'),
+        'priority'        : ('priority',),
+    }
+
     def update(self, raw):
-        self._raw.update(raw)
+        raw_old = self._raw
         cache = self._cache
         for key,new_value in raw.items():
-            cached_value = cache.get(key)
-            if cached_value is not None and cached_value != new_value:
-                del cache[key]
-
-        # %downloaded is never in raw because it is calculated from
-        # size-downloaded and size-total
-        if 'size-downloaded' in raw:
-            try:
-                del cache['%downloaded']
-            except KeyError:
-                pass
+            if raw_old.get(key) != new_value:
+                raw_old[key] = new_value
+                for k in self._DEPENDENT_KEYS.get(key, ()):
+                    cache.pop(k, None)
 
     def __repr__(self):
         return '<{} {!r}>'.format(type(self).__name__, self['name'])
@@ -622,7 +622,13 @@ class LazyDict(dict):
 
 
 class URL():
-    """Parse URL as lenient as possible (no validation)"""
+    """
+    Parse URL as lenient as possible (no validation)
+
+    URLs with the "unix" scheme don't have a host or port; everything after
+    the optional "user:password@" is the path of a unix domain socket, e.g.
+    "unix:///run/transmission.sock" or "unix://user:pw@/run/transmission.sock".
+    """
 
     # Pilfered from yurl: https://github.com/homm/yurl
     # This is not validating regexp.
@@ -663,6 +669,11 @@ class URL():
         dct['user'] = user or None
         dct['password'] = pw or None
 
+        if dct['scheme'] == 'unix':
+            dct['path'] = groups[2] + groups[3] or None
+            dct['host'] = dct['port'] = None
+            return dct
+
         # Split port from host only if it consists of digits.
         host = groups[2]
         port = None
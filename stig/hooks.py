@@ -58,6 +58,10 @@ def _set_bandwidth_unit(settings, name, value):
         column.set_unit(unit_short)
         column.clearcache()
     srvapi.torrent.clearcache()
+    if srvapi.created('settings'):
+        srvapi.settings.clearcache(run_callbacks=False)
+    if srvapi.created('status'):
+        srvapi.status.clearcache()
     srvapi.poll()
 localcfg.on_change(_set_bandwidth_unit, name='unit.bandwidth')
 _set_bandwidth_unit(localcfg, name='unit.bandwidth', value=localcfg['unit.bandwidth'])  # Init columns' units
@@ -67,6 +71,10 @@ def _set_bandwidth_prefix(settings, name, value):
     for column in _BANDWIDTH_COLUMNS:
         column.clearcache()
     srvapi.torrent.clearcache()
+    if srvapi.created('settings'):
+        srvapi.settings.clearcache(run_callbacks=False)
+    if srvapi.created('status'):
+        srvapi.status.clearcache()
     srvapi.poll()
 localcfg.on_change(_set_bandwidth_prefix, name='unitprefix.bandwidth')
 
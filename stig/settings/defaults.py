@@ -121,6 +121,18 @@ def init_defaults(localcfg):
                  setter=lambda v: setattr(objects.srvapi.rpc, 'timeout', v),
                  default=10,
                  description='Number of seconds before connecting to Transmission RPC interface fails')
+    localcfg.add('connect.max-concurrent-requests',
+                 Int.partial(min=1, prefix='none'),
+                 getter=lambda: objects.srvapi.rpc.max_concurrent_requests,
+                 setter=lambda v: setattr(objects.srvapi.rpc, 'max_concurrent_requests', v),
+                 default=4,
+                 description='Maximum number of simultaneous requests to the Transmission RPC interface')
+    localcfg.add('connect.compression',
+                 Bool.partial(),
+                 getter=lambda: objects.srvapi.rpc.compression,
+                 setter=lambda v: setattr(objects.srvapi.rpc, 'compression', v),
+                 default='on',
+                 description='Whether to accept compressed responses from the Transmission RPC interface')
     localcfg.add('connect.tls',
                  Bool.partial(),
                  getter=lambda: objects.srvapi.rpc.tls,
@@ -132,7 +144,8 @@ def init_defaults(localcfg):
                  getter=lambda: objects.srvapi.rpc.url_unsafe,
                  setter=lambda v: setattr(objects.srvapi.rpc, 'url', v),
                  default='http://localhost:9091/transmission/rpc',
-                 description='URL of the Transmission RPC interface')
+                 description=('URL of the Transmission RPC interface or "unix://" followed by '
+                              'the path of a unix domain socket'))
 
     localcfg.add('columns.torrents',
                  Tuple.partial(options=torrent.COLUMNS, aliases=torrent.ALIASES),
@@ -208,6 +221,11 @@ def init_defaults(localcfg):
                  default=10,
                  description=('If the log is hidden, show it for this many seconds '
                               'for new log entries before hiding it again'))
+    localcfg.add('tui.max-fps',
+                 Float.partial(min=1),
+                 default=25,
+                 description=('Maximum number of screen updates per second that are '
+                              'not caused by user input'))
     localcfg.add('tui.poll',
                  Float.partial(min=0.1),
                  default=5,
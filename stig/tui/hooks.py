@@ -66,6 +66,11 @@ def _set_poll_interval(settings, name, value):
 localcfg.on_change(_set_poll_interval, name='tui.poll')
 
 
+def _set_max_fps(settings, name, value):
+    tuiobjects.urwidloop.max_fps = value
+localcfg.on_change(_set_max_fps, name='tui.max-fps')
+
+
 def _set_cli_history_dir(settings, name, value):
     tuiobjects.cli.original_widget.history_file = os.path.join(value.full_path, 'commands')
 localcfg.on_change(_set_cli_history_dir, name='tui.cli.history-dir')
@@ -0,0 +1,125 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details
+# http://www.gnu.org/licenses/gpl-3.0.txt
+
+import time
+
+import urwid
+
+from ..logging import make_logger  # isort:skip
+log = make_logger(__name__)
+
+
+class MainLoop(urwid.MainLoop):
+    """
+    MainLoop that only redraws the screen when something has changed
+
+    urwid.MainLoop redraws the screen whenever the event loop is idle.  We
+    render the topmost widget at most `max_fps` times per second instead and
+    only draw its canvas if it is not the canvas we drew last time.  Widgets
+    return their cached canvas unless a displayed widget was invalidated, so
+    invalidated widgets that are not displayed (e.g. in unfocused tabs) don't
+    cause redraws.
+
+    Redraws that are caused by user input happen immediately.
+    """
+
+    def __init__(self, *args, max_fps=25, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_fps = max_fps
+        self._redraw_handle = None
+        self._redraw_time = 0    # Time of the scheduled redraw
+        self._last_redraw = 0    # Time of the previous redraw
+        self._canvas = None      # Canvas of the previous redraw
+        self._force_draw = False  # Whether to draw even if the canvas didn't change
+
+    @property
+    def max_fps(self):
+        """Maximum number of redraws per second that are not caused by user input"""
+        return self._max_fps
+
+    @max_fps.setter
+    def max_fps(self, max_fps):
+        max_fps = float(max_fps)
+        if max_fps <= 0:
+            raise ValueError('Invalid max_fps: %r' % (max_fps,))
+        self._max_fps = max_fps
+        self._frame_duration = 1 / max_fps
+
+    def start(self):
+        context = super().start()
+        self.schedule_redraw(immediately=True)
+        return context
+
+    def stop(self):
+        self._cancel_redraw()
+        self._canvas = None
+        super().stop()
+
+    def entering_idle(self):
+        # Don't redraw whenever the event loop is idle; all calls until the
+        # next frame are handled by the same redraw
+        if self.screen.started:
+            self.schedule_redraw()
+
+    def draw_screen(self):
+        self._draw(self._render())
+
+    def _render(self):
+        if not self.screen_size:
+            self.screen_size = self.screen.get_cols_rows()
+        return self._topmost_widget.render(self.screen_size, focus=True)
+
+    def _draw(self, canvas):
+        self._force_draw = False
+        # urwid.CanvasCache only keeps weak references, so we keep the canvas
+        # cached until it is invalidated
+        self._canvas = canvas
+        self.screen.draw_screen(self.screen_size, canvas)
+
+    def _update(self, keys, raw):
+        super()._update(keys, raw)
+        self._force_draw = True
+        self.schedule_redraw(immediately=True)
+
+    def schedule_redraw(self, immediately=False):
+        """
+        Redraw the screen as soon as allowed by `max_fps`
+
+        immediately: Whether to ignore `max_fps`
+        """
+        now = time.monotonic()
+        if immediately:
+            redraw_time = now
+        else:
+            redraw_time = max(now, self._last_redraw + self._frame_duration)
+
+        if self._redraw_handle is not None:
+            if self._redraw_time <= redraw_time:
+                return
+            self._cancel_redraw()
+
+        self._redraw_time = redraw_time
+        self._redraw_handle = self.event_loop.alarm(redraw_time - now, self._redraw)
+
+    def _cancel_redraw(self):
+        if self._redraw_handle is not None:
+            self.event_loop.remove_alarm(self._redraw_handle)
+            self._redraw_handle = None
+
+    def _redraw(self):
+        self._redraw_handle = None
+        if self.screen.started:
+            self._last_redraw = time.monotonic()
+            # Widgets return their cached canvas unless a displayed widget was
+            # invalidated
+            canvas = self._render()
+            if canvas is not self._canvas or self._force_draw:
+                self._draw(canvas)
@@ -179,6 +179,8 @@ class ConnectionStatusWidget(urwid.WidgetWrap):
 
     @staticmethod
     def _connection_string(rpc):
+        if rpc.socket_path is not None:
+            return rpc.socket_path
         string = '%s:%s' % (rpc.host, int(rpc.port))
         if rpc.tls:
             string = 'https://' + string
@@ -52,6 +52,10 @@ class Table():
             member.add(colname, cellwidget, options=cellcls.width, removable=True)
         self._members[member_id] = member
 
+    def unregister(self, member_id):
+        """Remove a row created by register() if it exists"""
+        self._members.pop(member_id, None)
+
     def get_row(self, member_id):
         """Return a row, i.e. a Group(cls=Columns) object created by register()"""
         return self._members[member_id]
@@ -23,6 +23,7 @@ from ..settings.defaults import DEFAULT_KEYMAP
 from .group import Group
 from .keymap import KeyMap
 from .logger import LogWidget
+from .mainloop import MainLoop
 from .miscwidgets import (AvailableDiskSpaceWidget, BandwidthStatusWidget,
                           ConnectionStatusWidget, KeyChainsWidget, MarkedItemsWidget,
                           QuickHelpWidget, TorrentCountersWidget)
@@ -122,8 +123,9 @@ def unhandled_input(key):
         log.debug('Unhandled key: %s', key)
 
 urwidscreen = urwid.raw_display.Screen()
-urwidloop = urwid.MainLoop(widgets,
-                           screen=urwidscreen,
-                           event_loop=urwid.AsyncioEventLoop(loop=asyncio.get_event_loop()),
-                           unhandled_input=unhandled_input,
-                           handle_mouse=False)
+urwidloop = MainLoop(widgets,
+                     screen=urwidscreen,
+                     event_loop=urwid.AsyncioEventLoop(loop=asyncio.get_event_loop()),
+                     unhandled_input=unhandled_input,
+                     handle_mouse=False,
+                     max_fps=objects.localcfg['tui.max-fps'])
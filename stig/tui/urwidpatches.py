@@ -202,7 +202,11 @@ class ListBox_patched(urwid.ListBox):
             flow_size = (maxcol,)
 
             body = self.body
-            if hasattr(body, 'positions'):
+            item_rows = getattr(body, 'item_rows', None)
+            if item_rows is not None:
+                # All items have the same height and positions are indexes
+                return focus_pos * item_rows - offset_rows
+            elif hasattr(body, 'positions'):
                 # For body[pos], pos can be anything, not just an int.  In that
                 # case, the positions() method returns an interable of valid
                 # positions.
@@ -221,7 +225,10 @@ class ListBox_patched(urwid.ListBox):
         if self._rows_max is None:
             flow_size = (size[0],)
             body = self.body
-            if hasattr(body, 'positions'):
+            item_rows = getattr(body, 'item_rows', None)
+            if item_rows is not None:
+                self._rows_max = len(body) * item_rows
+            elif hasattr(body, 'positions'):
                 self._rows_max = sum(body[pos].rows(flow_size) for pos in body.positions())
             else:
                 self._rows_max = sum(w.rows(flow_size) for w in self.body)
@@ -9,14 +9,21 @@
 # GNU General Public License for more details
 # http://www.gnu.org/licenses/gpl-3.0.txt
 
+import bisect
 import collections
+import itertools
+import time
 
 import urwid
 
+from ...utils.usertypes import Float, Int
 from ..scroll import ScrollBar
 from ..table import ColumnHeaderWidget, Table
 from ..tuiobjects import bottombar
 
+from ...logging import make_logger  # isort:skip
+log = make_logger(__name__)
+
 
 class Style():
     """Map standard attributes to those defined in a urwid palette
@@ -81,16 +88,40 @@ class CellWidgetBase(urwid.WidgetWrap):
     width = ('weight', 100)
     align = 'right'
 
+    # Whether the displayed text changes over time (e.g. timestamps that are
+    # formatted relative to the current time)
+    depends_on_time = False
+
+    # Maximum number of formatted numbers remembered per column
+    text_cache_size = 1000
+
     def __init__(self):
         self.value = None
         self.text = urwid.Text('', wrap=self.wrap, align=self.align)
         self.attrmap = urwid.AttrMap(self.text, self.style.attrs('unfocused'))
+        self._updated = (None, None)  # Data and its revision at the last update
         return super().__init__(self.attrmap)
 
+    def update_if_changed(self, data):
+        """
+        Call `update` unless `data` was passed before and none of its values in
+        `needed_keys` changed since then
+
+        `data` must provide `revision` and `changed_keys_since` (see
+        :class:`Torrent`) for this to work, otherwise `update` is always called.
+        """
+        prev_data, prev_revision = self._updated
+        if prev_data is data and prev_revision is not None and not self.depends_on_time:
+            changed_keys = data.changed_keys_since(prev_revision)
+            if changed_keys is not None and changed_keys.isdisjoint(self.needed_keys):
+                return
+        self.update(data)
+        self._updated = (data, getattr(data, 'revision', None))
+
     def update(self, data):
         self.data = data
         new_value = self.get_value()
-        new_text = str(new_value)
+        new_text = self.get_text(new_value)
         if self.text.text != new_text:
             self.value = new_value
             self.text.set_text(new_text)
@@ -100,6 +131,27 @@ class CellWidgetBase(urwid.WidgetWrap):
     def get_mode(self):
         return None
 
+    @classmethod
+    def get_text(cls, value):
+        """Return `value` as string, using a per-column cache for numbers"""
+        if not isinstance(value, (Float, Int)):
+            return str(value)
+
+        cache = cls.__dict__.get('_text_cache')
+        if cache is None:
+            cache = cls._text_cache = collections.OrderedDict()
+
+        # Numbers with different units or prefixes are equal but look different
+        key = (type(value), value, value.unit, value.prefix, value.hide_unit)
+        text = cache.get(key)
+        if text is None:
+            text = cache[key] = str(value)
+            if len(cache) > cls.text_cache_size:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return text
+
     @classmethod
     def set_header(cls, left=None, right=None):
         if left is not None:
@@ -109,7 +161,11 @@ class CellWidgetBase(urwid.WidgetWrap):
 
 
 class ItemWidgetBase(urwid.WidgetWrap):
-    """Base class for items in Torrent/File/Peer/... lists"""
+    """
+    Base class for items in Torrent/File/Peer/... lists
+
+    If `cells` is None, the item is not displayable until `attach` is called.
+    """
 
     # Derived classes must set these class attributes; lists with unfocusable
     # items (e.g. peer lists) don't have to set palette_focused and
@@ -118,9 +174,20 @@ class ItemWidgetBase(urwid.WidgetWrap):
     palette_unfocused = NotImplemented
     palette_focused   = NotImplemented
 
-    def __init__(self, data, cells):
+    # Displayed by items without cells
+    _NO_CELLS = urwid.Text('')
+
+    def __init__(self, data, cells=None):
         self._data = data    # Info of torrent/tracker/file/peer/... as mapping
-        self._cells = cells  # Group instance that combines widgets horizontally
+        self._cells = None   # Group instance that combines widgets horizontally
+        self._is_marked = False
+        urwid.WidgetWrap.__init__(self, self._NO_CELLS)
+        if cells is not None:
+            self.attach(cells)
+
+    def attach(self, cells):
+        """Display data in `cells`, a row created by :meth:`Table.register`"""
+        self._cells = cells
 
         # Create focusable or unfocusable item widget
         if self.columns_focus_map is not NotImplemented:
@@ -130,15 +197,26 @@ class ItemWidgetBase(urwid.WidgetWrap):
             )
         else:
             item_widget = urwid.AttrMap(cells, self.palette_unfocused)
-        urwid.WidgetWrap.__init__(self, item_widget)
+        self._w = item_widget
 
         # Initialize cell widgets
-        self.update(data)
+        self.update(self._data)
+        if cells.exists('marked'):
+            cells.marked.is_marked = self._is_marked
+
+    def detach(self):
+        """Stop displaying data and return the cells passed to `attach`"""
+        cells = self._cells
+        self._cells = None
+        self._w = self._NO_CELLS
+        return cells
 
     def update(self, data):
-        for widget in self._cells.widgets:
-            if hasattr(widget, 'update'):
-                widget.update(data)
+        cells = self._cells
+        if cells is not None:
+            for widget in cells.widgets:
+                if hasattr(widget, 'update_if_changed'):
+                    widget.update_if_changed(data)
         self._data = data
 
     @property
@@ -154,15 +232,89 @@ class ItemWidgetBase(urwid.WidgetWrap):
     @property
     def is_marked(self):
         """Whether this item has been marked by the user"""
-        if self._cells.exists('marked'):
-            return self._cells.marked.is_marked
+        cells = self._cells
+        if cells is None:
+            return self._is_marked
+        elif cells.exists('marked'):
+            return cells.marked.is_marked
         else:
             return False
 
     @is_marked.setter
     def is_marked(self, is_marked):
-        if self._cells.exists('marked'):
-            self._cells.marked.is_marked = bool(is_marked)
+        self._is_marked = bool(is_marked)
+        cells = self._cells
+        if cells is not None and cells.exists('marked'):
+            cells.marked.is_marked = self._is_marked
+
+
+class _VirtualListWalker(urwid.SimpleFocusListWalker):
+    """
+    List walker that only attaches cells to displayed items
+
+    Items that haven't been displayed recently are detached and their cells are
+    given to the next item that is displayed.
+
+    make_cells: Callable that returns new cells for an item
+    buffer: Number of items that keep their cells after they were scrolled out
+            of view
+    """
+
+    # Number of rows each item needs (see urwidpatches.ListBox_patched)
+    item_rows = 1
+
+    def __init__(self, make_cells, buffer=50):
+        super().__init__([])
+        self._make_cells = make_cells
+        self._buffer = buffer
+        self._spare_cells = []
+        self._attached = collections.OrderedDict()  # Least recently displayed first
+        self._displayed = set()  # Items displayed since the last call to `release`
+
+    def _display(self, item):
+        if item is not None:
+            attached = self._attached
+            if item in attached:
+                attached.move_to_end(item)
+            else:
+                spare_cells = self._spare_cells
+                item.attach(spare_cells.pop() if spare_cells else self._make_cells())
+                attached[item] = None
+            self._displayed.add(item)
+        return item
+
+    def get_focus(self):
+        item, position = super().get_focus()
+        return self._display(item), position
+
+    def get_next(self, position):
+        item, position = super().get_next(position)
+        return self._display(item), position
+
+    def get_prev(self, position):
+        item, position = super().get_prev(position)
+        return self._display(item), position
+
+    def release(self):
+        """Detach items that weren't displayed since the previous call"""
+        if not self._displayed:
+            # The ListBox was not rendered (e.g. its canvas was cached), so we
+            # don't know which items are visible
+            return
+        attached = self._attached
+        keep = len(self._displayed) + self._buffer
+        while len(attached) > keep:
+            item, _ = attached.popitem(last=False)
+            self._spare_cells.append(item.detach())
+        self._displayed.clear()
+
+    def forget_cells(self):
+        """Detach all items and don't reuse any existing cells"""
+        for item in self._attached:
+            item.detach()
+        self._attached.clear()
+        self._displayed.clear()
+        self._spare_cells.clear()
 
 
 class ListWidgetBase(urwid.WidgetWrap):
@@ -175,6 +327,10 @@ class ListWidgetBase(urwid.WidgetWrap):
     palette_name    = NotImplemented
     focusable_items = False
 
+    # Whether list items only get cell widgets while they are displayed; items
+    # must be exactly one row high
+    virtual_items   = False
+
     def __init__(self, srvapi, keymap, columns=None, sort=None, title=None):
         self._srvapi = srvapi
         self._keymap = keymap
@@ -188,18 +344,26 @@ class ListWidgetBase(urwid.WidgetWrap):
         self._marked = set()
 
         self._existing_widgets = set()
-        self._hidden_widgets = set()
+        self._visible_widgets = set()  # Widgets in the list walker
+        self._hidden_widgets = set()   # Widgets removed by _limit_items()
 
         self._sort = sort
         self._sort_orig = sort
+        self._sorted_by = None            # Sorter that produced the current order
+        self._sort_keys = {}              # Maps item widgets to their sort keys
+        self._unsorted_widgets = set()    # Widgets that may be in the wrong place
 
         self._title_name = title
         self.title_updater = None
+        self._title_args = None    # Last arguments passed to title_updater
 
         self._table = Table(**self.tuicolumns)
         self._table.columns = columns or ()
+        self._cells_ids = itertools.count()
 
-        if self.focusable_items:
+        if self.virtual_items:
+            walker = _VirtualListWalker(make_cells=self._make_cells)
+        elif self.focusable_items:
             walker = urwid.SimpleFocusListWalker([])
         else:
             walker = urwid.SimpleListWalker([])
@@ -219,10 +383,18 @@ class ListWidgetBase(urwid.WidgetWrap):
         return '<%s %s, #%s>' % (type(self).__name__, self.title, id(self))
 
     def _invalidate(self):
+        self._update_title()
+        super()._invalidate()
+
+    def _update_title(self):
         if self.title_updater is not None:
             # First argument can be cropped if too long, second argument is fixed
-            self.title_updater(self.title, ' [%d]' % self.count)
-        super()._invalidate()
+            title_args = (self.title_updater, self.title, ' [%d]' % self.count)
+            # Setting the title invalidates the tab bar, which would cause a
+            # redraw even if this list is not displayed
+            if title_args != self._title_args:
+                self._title_args = title_args
+                self.title_updater(*title_args[1:])
 
     def render(self, size, focus=False):
         # Remember focused item widget in case items get added or removed
@@ -249,12 +421,24 @@ class ListWidgetBase(urwid.WidgetWrap):
 
         # focus=True because we always want to highlight the focused item, for
         # example when the CLI is open
-        return super().render(size, focus=True)
+        canvas = super().render(size, focus=True)
+
+        # Free cells of items that are no longer displayed
+        if self.virtual_items:
+            self._listbox.body.release()
+        return canvas
+
+    def _make_cells(self):
+        row_id = next(self._cells_ids)
+        self._table.register(row_id)
+        return self._table.get_row(row_id)
 
     def _update_existing_widgets(self, data_dict):
         existing_widgets = self._existing_widgets
         dead_widgets = []
 
+        unsorted_widgets = self._unsorted_widgets
+
         for w in existing_widgets:  # w = *ItemWidget instance
             id = w.id
             try:
@@ -264,59 +448,197 @@ class ListWidgetBase(urwid.WidgetWrap):
             except KeyError:
                 # Item no longer exists in data_dict anymore
                 dead_widgets.append(w)
+            else:
+                # Sort key may have changed
+                unsorted_widgets.add(w)
 
         # Remove dead *ItemWidget instances
-        walker = self._listbox.body
-        marked = self._marked
-        for w in dead_widgets:
-            if w in walker:
-                walker.remove(w)
-            existing_widgets.remove(w)
-            marked.discard(w)  # self._marked may have a reference too
+        if dead_widgets:
+            dead_widgets = set(dead_widgets)
+            self._remove_from_walker(dead_widgets)
+            existing_widgets.difference_update(dead_widgets)
+            self._hidden_widgets.difference_update(dead_widgets)
+            self._marked.difference_update(dead_widgets)  # self._marked may have a reference too
+            unsorted_widgets.difference_update(dead_widgets)
+            sort_keys = self._sort_keys
+            for w in dead_widgets:
+                sort_keys.pop(w, None)
 
         # Any items that haven't been used to update an existing *ItemWidget instance are new
         if data_dict:
-            table = self._table
             ListItemClass = self._ListItemClass
-            for data_id,data in data_dict.items():
-                table.register(data_id)
-                row = table.get_row(data_id)
-                existing_widgets.add(ListItemClass(data, row))
+            if self.virtual_items:
+                # Cells are attached by the list walker when needed
+                for data in data_dict.values():
+                    existing_widgets.add(ListItemClass(data))
+            else:
+                table = self._table
+                for data_id,data in data_dict.items():
+                    table.register(data_id)
+                    row = table.get_row(data_id)
+                    existing_widgets.add(ListItemClass(data, row))
+
+    # Re-sort the whole list if more than this fraction of items have moved
+    _MAX_MOVED_RATIO = 0.1
 
     def _sort_widgets(self):
+        sorter = self._sort
+        if sorter is None:
+            self._sorted_by = None
+            self._unsorted_widgets.clear()
+            return
+
+        try:
+            if self._sorted_by is not sorter:
+                self._sort_all_widgets(sorter)
+            elif self._unsorted_widgets:
+                self._sort_unsorted_widgets(sorter)
+        except KeyError:
+            # This happens when adding a new sort order that needs
+            # previously unneeded keys (e.g. "started" needs "time-started",
+            # which is normally not used).  The new request is correctly
+            # registered in client.trequestpool, but when the async RPC
+            # request is made, the asyncio loop yields control to the TUI,
+            # which redraws (i.e. sorts) the list with the old widget.data.
+            # (I couldn't figure out why this redraw happens.)  Ignoring the
+            # KeyError fixes this because as soon as the RPC response gets
+            # through, a new redraw is issued and the new sort exists.  Until
+            # then we don't know if the current order is correct.
+            self._sorted_by = None
+        else:
+            self._sorted_by = sorter
+            self._unsorted_widgets.clear()
+
+    def _sort_all_widgets(self, sorter):
         walker = self._listbox.body
-        if self._sort is not None:
-            try:
-                self._sort.apply(walker,
-                                 item_getter=lambda w: w.data,
-                                 inplace=True)
-            except KeyError:
-                # This happens when adding a new sort order that needs
-                # previously unneeded keys (e.g. "started" needs "time-started",
-                # which is normally not used).  The new request is correctly
-                # registered in client.trequestpool, but when the async RPC
-                # request is made, the asyncio loop yields control to the TUI,
-                # which redraws (i.e. sorts) the list with the old widget.data.
-                # (I couldn't figure out why this redraw happens.)  Ignoring the
-                # KeyError fixes this because as soon as the RPC response gets
-                # through, a new redraw is issued and the new sort exists.
-                pass
+        sorter.apply(walker, item_getter=lambda w: w.data, inplace=True)
+        # Remember sort keys so we can find out which widgets have moved later
+        sort_keys = self._sort_keys = {}
+        for w in walker:
+            revision = getattr(w.data, 'revision', None)
+            if revision is None:
+                # Object doesn't tell us when it changes
+                return
+            sort_keys[w] = (revision, sorter.key(w.data))
+
+    def _sort_unsorted_widgets(self, sorter):
+        # Find widgets with new sort keys.  If the displayed object provides a
+        # `revision`, we can skip it if it hasn't changed since it was sorted
+        # or if none of the keys we sort by have changed.
+        sort_keys = self._sort_keys
+        needed_keys = getattr(sorter, 'needed_keys', None)
+        changed = set()
+        for w in self._unsorted_widgets:
+            data = w.data
+            revision = getattr(data, 'revision', None)
+            if revision is None:
+                self._sort_all_widgets(sorter)
+                return
+            cached = sort_keys.get(w)
+            if cached is None:
+                sort_keys[w] = (revision, sorter.key(data))
+                changed.add(w)
+            elif cached[0] != revision:
+                changed_keys = None
+                if needed_keys is not None:
+                    changed_keys = data.changed_keys_since(cached[0])
+                if changed_keys is not None and changed_keys.isdisjoint(needed_keys):
+                    sort_keys[w] = (revision, cached[1])
+                else:
+                    key = sorter.key(data)
+                    sort_keys[w] = (revision, key)
+                    if key != cached[1]:
+                        changed.add(w)
+        if not changed:
+            return
+
+        # Unchanged widgets are still in order.  Widgets with new sort keys
+        # have moved if they don't fit between the previous widget that stays
+        # in place and the next unchanged widget.  Hidden widgets are not in
+        # the walker.
+        walker = self._listbox.body
+        keys = [self._get_sort_key(w, sorter) for w in walker]
+        next_keys = []
+        next_key = None
+        for w,key in zip(reversed(walker), reversed(keys)):
+            next_keys.append(next_key)
+            if w not in changed:
+                next_key = key
+        next_keys.reverse()
+
+        moved = set()
+        prev_key = None
+        for w,key,next_key in zip(walker, keys, next_keys):
+            if w in changed and ((prev_key is not None and key < prev_key) or
+                                 (next_key is not None and next_key < key)):
+                moved.add(w)
+            else:
+                prev_key = key
+        if not moved:
+            return
+
+        if len(moved) > len(walker) * self._MAX_MOVED_RATIO:
+            self._sort_all_widgets(sorter)
+            log.debug('Re-sorted %d items in %r', len(walker), self)
+            return
+
+        # Insert moved widgets into the remaining, still ordered widgets
+        ordered = []
+        ordered_keys = []
+        moved_widgets = []
+        for w,key in zip(walker, keys):
+            if w in moved:
+                moved_widgets.append((w, key))
+            else:
+                ordered.append(w)
+                ordered_keys.append(key)
+        for w,key in moved_widgets:
+            i = bisect.bisect_right(ordered_keys, key)
+            ordered.insert(i, w)
+            ordered_keys.insert(i, key)
+        walker[:] = ordered
+        log.debug('Moved %d of %d items in %r', len(moved), len(walker), self)
+
+    def _get_sort_key(self, widget, sorter):
+        revision, key = self._sort_keys.get(widget, (None, None))
+        if key is None:
+            key = sorter.key(widget.data)
+            self._sort_keys[widget] = (revision, key)
+        return key
 
     def _hide_or_unhide_widgets(self):
-        walker = self._listbox.body
+        start_time = time.monotonic()
         existing_widgets = self._existing_widgets
-        hidden_ids = tuple(w.id for w in self._limit_items(existing_widgets))
-        for w in existing_widgets:
-            widget_is_visible = w in walker
-            hide_widget = w.id in hidden_ids
-            if hide_widget and widget_is_visible:
-                walker.remove(w)
-                self._hidden_widgets.add(w)
-            elif not hide_widget and not widget_is_visible:
-                walker.append(w)
-
-        if self.title_updater is not None:
-            self.title_updater(self.title, ' [%d]' % self.count)
+        visible_widgets = self._visible_widgets
+        hidden_widgets = set(self._limit_items(existing_widgets))
+        hide = visible_widgets & hidden_widgets
+        unhide = existing_widgets - visible_widgets - hidden_widgets
+
+        if hide:
+            self._remove_from_walker(hide)
+        if unhide:
+            self._listbox.body.extend(unhide)
+            visible_widgets.update(unhide)
+            self._unsorted_widgets.update(unhide)
+            sort_keys = self._sort_keys
+            for w in unhide:
+                sort_keys.pop(w, None)
+        self._hidden_widgets = hidden_widgets
+
+        if hide or unhide:
+            log.debug('Hid %d and unhid %d of %d items in %r in %.3fms',
+                      len(hide), len(unhide), len(existing_widgets), self,
+                      (time.monotonic() - start_time) * 1e3)
+
+        self._update_title()
+
+    def _remove_from_walker(self, widgets):
+        """Remove `widgets` (a set) from the list walker in one go"""
+        visible_widgets = self._visible_widgets
+        if not visible_widgets.isdisjoint(widgets):
+            walker = self._listbox.body
+            walker[:] = [w for w in walker if w not in widgets]
+            visible_widgets.difference_update(widgets)
 
     def _limit_items(self, existing_widgets):
         """Iterate over filtered widgets"""
@@ -325,8 +647,12 @@ class ListWidgetBase(urwid.WidgetWrap):
     def clear(self):
         """Remove all list items"""
         self._table.clear()
+        if self.virtual_items:
+            self._listbox.body.forget_cells()
         self._listbox.body[:] = ()
         self._listbox._invalidate()
+        self._visible_widgets.clear()
+        self._sort_keys.clear()
         self._marked.clear()
 
     def refresh(self):
@@ -10,11 +10,14 @@
 # http://www.gnu.org/licenses/gpl-3.0.txt
 
 import builtins
+import itertools
+import weakref
 from collections import abc
+from operator import attrgetter
 
 import urwid
 import urwidtrees
-from natsort import humansorted
+from natsort import natsort_keygen, ns
 from urwidtrees.decoration import ArrowTree
 
 from ...client import FileFilter
@@ -27,132 +30,347 @@ from ...logging import make_logger  # isort:skip
 log = make_logger(__name__)
 
 
-class FileTreeDecorator(ArrowTree):
-    """urwidtrees decorator for TorrentFiles and TorrentFileTrees"""
+# humansorted() sorts with this key
+_sortkey = natsort_keygen(alg=ns.LOCALE)
 
-    def __init__(self, torrents, keymap, table, ffilter):
-        self._filewidgetcls = keymap.wrap(FileItemWidget, context='file')
-        self._table = table
+
+class _FileNode():
+    """
+    File or directory in a FileTree
+
+    Nodes don't store any file information, they look it up in the torrent's
+    TorrentFileTree, which is replaced regularly.  Children of a directory
+    are created when they are needed.
+    """
+
+    __slots__ = ('_filetree', '_children', '_filtered_count', 'tid', 'path',
+                 'nodetype', 'id', 'sortkey', 'is_marked', 'is_expanded')
+
+    def __init__(self, filetree, tid, path, content):
+        self._filetree = filetree
+        self._children = None
+        self._filtered_count = None
+        self.tid = tid
+        self.path = path    # Names from the torrent's file tree root to this node
+        self.nodetype = content.nodetype
+        self.id = content['id'] if content.nodetype == 'leaf' else None
+        self.sortkey = _sortkey(path[-1])
+        self.is_marked = False
+        self.is_expanded = False
+
+    @property
+    def torrent_id(self):
+        return self.tid
+
+    @property
+    def content(self):
+        """TorrentFile or TorrentFileTree instance"""
+        content = self._filetree.torrent_files(self.tid)
+        for name in self.path:
+            content = content[name]
+        return content
+
+    @property
+    def data(self):
+        """TorrentFile or TorrentFileDirectory instance"""
+        if self.nodetype == 'leaf':
+            return self.content
+        else:
+            return TorrentFileDirectory(self.path[-1], tree=self.content,
+                                        filtered_count=self.filtered_count)
+
+    @property
+    def filtered_count(self):
+        """Number of files in this directory (not recursively) that are filtered"""
+        if self._filtered_count is None:
+            is_filtered = self._filetree.is_filtered
+            self._filtered_count = sum(1 for entry in self.content.values()
+                                       if entry.nodetype == 'leaf' and is_filtered(entry))
+        return self._filtered_count
+
+    @property
+    def children(self):
+        """Sorted list of unfiltered child nodes or empty list for files"""
+        if self._children is None:
+            if self.nodetype == 'leaf':
+                self._children = []
+            else:
+                filetree = self._filetree
+                is_filtered = filetree.is_filtered
+                tid, path = self.tid, self.path
+                children = []
+                for name,entry in self.content.items():
+                    if entry.nodetype == 'parent' or not is_filtered(entry):
+                        children.append(_FileNode(filetree, tid, path + (name,), entry))
+                children.sort(key=attrgetter('sortkey'))
+                self._children = children
+        return self._children
+
+    def __repr__(self):
+        return '<%s #%s %s>' % (type(self).__name__, self.tid, '/'.join(self.path))
+
+
+class FileTree(urwidtrees.Tree):
+    """
+    Tree of _FileNodes that only creates nodes that are needed
+
+    Directories are collapsed unless their (torrent ID, path) is in `expanded`.
+
+    Positions are tuples of indexes like in urwidtrees.SimpleTree.
+    """
+
+    def __init__(self, torrents, ffilter, expanded=()):
         self._ffilter = ffilter
-        self._widgets = {}
-        self._filtered_counts = {}
-        forest = self._create_file_forest(torrents)
-        super().__init__(forest, indent=2)
+        self._torrent_files = {}
+        self._layouts = {}
+        self._filecount = None
+        self.update(torrents)
+
+        roots = []
+        for t in torrents:
+            filetree = t['files']
+            if len(filetree) > 0:
+                rootname = next(iter(filetree.keys()))
+                content = filetree[rootname]
+                if content.nodetype == 'parent' or not self.is_filtered(content):
+                    roots.append(_FileNode(self, t['id'], (rootname,), content))
+        roots.sort(key=attrgetter('sortkey'))
+        self._roots = roots
+        self.root = (0,) if roots else None
+
+        # Restore expanded directories
+        if expanded:
+            def expand(nodes):
+                for node in nodes:
+                    if (node.tid, node.path) in expanded:
+                        node.is_expanded = True
+                        expand(node.children)
+            expand(roots)
 
-    def _file_is_filtered(self, tfile):
-        if self._ffilter is None:
+    def update(self, torrents):
+        """
+        Look up file information in the TorrentFileTrees of `torrents`
+
+        Return False if any known torrent's files were renamed or moved, in
+        which case nodes can't find their files anymore and the tree must be
+        created again.
+        """
+        filetrees = tuple((t['id'], t['files']) for t in torrents)
+        layouts = self._layouts
+        for tid,filetree in filetrees:
+            layout = layouts.get(tid)
+            if layout is not None and layout is not filetree.layout:
+                return False
+        self._torrent_files.update(filetrees)
+        layouts.update((tid, filetree.layout) for tid,filetree in filetrees)
+        return True
+
+    def torrent_files(self, tid):
+        """TorrentFileTree of torrent with ID `tid`"""
+        return self._torrent_files[tid]
+
+    def is_filtered(self, tfile):
+        """Whether TorrentFile `tfile` is excluded by the file filter"""
+        ffilter = self._ffilter
+        if ffilter is None:
             return False  # No filter specified
-        elif isinstance(self._ffilter, (abc.Sequence, abc.Set)):
+        elif isinstance(ffilter, (abc.Sequence, abc.Set)):
             # ffilter is a collection of file IDs
-            return not tfile['id'] in self._ffilter
+            return not tfile['id'] in ffilter
         else:
             # ffilter is a FileFilter instance
-            return not self._ffilter.match(tfile)
-
-    def _create_file_forest(self, torrents):
-        # Create a list of nested trees in SimpleTree format.  But the leaves
-        # are mappings instead of widgets.  Each mapping contains the
-        # information that the `decorate` method needs to create a widget.
-
-        def create_tree(node, content):
-            if content.nodetype == 'leaf':
-                # Process single file
-                if not self._file_is_filtered(content):
-                    return (content, None)
-                else:
-                    return None
-
-            elif content.nodetype == 'parent':
-                # Recurse into directory entries (files and subdirectories)
-                tree = []
-                filtered_count = 0
-                content_sorted = humansorted(content.items())
-                for k,v in content_sorted:
-                    if v.nodetype == 'leaf':
-                        if not self._file_is_filtered(v):
-                            tree.append((v, None))
-                            nonlocal fcount
-                            fcount += 1
-                        else:
-                            filtered_count += 1
-                    elif v.nodetype == 'parent':
-                        dirnode = TorrentFileDirectory(name=k, tree=v)
-                        tree.append(create_tree(dirnode, v))
-
-                self._filtered_counts[node['id']] = filtered_count
-                node['name'] = TorrentFileDirectory.create_directory_name(node['name'], filtered_count)
-                return (node, tree or None)
-
-        fcount = 0
-        forest = []  # Multiple trees as siblings
-        for t in humansorted(torrents, key=lambda t: t['name']):
-            filetree = t['files']
-            filecount = len(tuple(filetree.files))
-            if filecount > 0:
-                nodetree = None
-                rootnodename = next(iter(filetree.keys()))
-                if len(tuple(filetree.directories)) == 0:
-                    # Single-file torrent
-                    if not self._file_is_filtered(filetree[rootnodename]):
-                        nodetree = (filetree[rootnodename], None)
-                else:
-                    # Torrent with directory structure
-                    # If we don't ignore the topmost node, the torrent itself is
-                    # displayed as a directory.
-                    content = filetree[rootnodename]
-                    rootnode = TorrentFileDirectory(rootnodename, tree=content)
-                    nodetree = create_tree(rootnode, content)
+            return not ffilter.match(tfile)
+
+    @property
+    def filecount(self):
+        """Number of unfiltered files"""
+        if self._filecount is None:
+            is_filtered = self.is_filtered
+            self._filecount = sum(1 for node in self._roots
+                                  for tfile in self._files(node.content)
+                                  if not is_filtered(tfile))
+        return self._filecount
+
+    @staticmethod
+    def _files(content):
+        if content.nodetype == 'leaf':
+            return (content,)
+        else:
+            return content.files
+
+    @property
+    def roots(self):
+        """Top-level nodes"""
+        return tuple(self._roots)
+
+    @property
+    def expanded(self):
+        """Set of (torrent ID, path) tuples of all expanded directories"""
+        expanded = set()
+
+        def collect(nodes):
+            for node in nodes:
+                if node.is_expanded:
+                    expanded.add((node.tid, node.path))
+                    collect(node.children)
+        collect(self._roots)
+        return expanded
+
+    def node(self, pos):
+        """Return _FileNode at position `pos`"""
+        node = self._roots[pos[0]]
+        for i in pos[1:]:
+            node = node.children[i]
+        return node
+
+    def _siblings(self, pos):
+        return self._roots if len(pos) == 1 else self.node(pos[:-1]).children
+
+    # urwidtrees.Tree API
+
+    def __getitem__(self, pos):
+        return self.node(pos)
+
+    @staticmethod
+    def parent_position(pos):
+        return pos[:-1] if len(pos) > 1 else None
 
-                if nodetree is not None:
-                    forest.append(nodetree)
+    def first_child_position(self, pos):
+        node = self.node(pos)
+        if node.is_expanded and node.children:
+            return pos + (0,)
 
-        self.filecount = fcount
-        return forest
+    def last_child_position(self, pos):
+        node = self.node(pos)
+        if node.is_expanded and node.children:
+            return pos + (len(node.children) - 1,)
 
-    def decorate(self, pos, data, is_first=True):
-        # We can use the tree position as table ID
-        self._table.register(pos)
-        row = self._table.get_row(pos)
+    def next_sibling_position(self, pos):
+        if pos[-1] + 1 < len(self._siblings(pos)):
+            return pos[:-1] + (pos[-1] + 1,)
+
+    @staticmethod
+    def prev_sibling_position(pos):
+        if pos[-1] > 0:
+            return pos[:-1] + (pos[-1] - 1,)
+
+    @staticmethod
+    def depth(pos):
+        return len(pos) - 1
+
+    def is_leaf(self, pos):
+        return self.node(pos).nodetype == 'leaf'
+
+
+class _DecoratedCell(urwid.WidgetWrap):
+    """Tree decoration around `cell` that passes updates on to `cell`"""
+
+    def __init__(self, decoration, cell):
+        self._cell = cell
+        super().__init__(decoration)
+
+    def update(self, data):
+        self._cell.update(data)
+
+    def update_if_changed(self, data):
+        self._cell.update_if_changed(data)
+
+
+class FileTreeDecorator(ArrowTree):
+    """
+    urwidtrees decorator for TorrentFiles and TorrentFileTrees
+
+    Directories are collapsed initially and their contents are only read when
+    they are expanded.  Widgets are created by the list walker for displayed
+    positions and forgotten when the walker doesn't need them anymore.
+    """
+
+    def __init__(self, torrents, keymap, table, ffilter, expanded=()):
+        self._filewidgetcls = keymap.wrap(FileItemWidget, context='file')
+        self._table = table
+        self._row_ids = itertools.count()
+        self._widgets = weakref.WeakValueDictionary()  # Map _FileNodes to FileItemWidgets
+        self._filetree = FileTree(torrents, ffilter, expanded=expanded)
+        super().__init__(self._filetree, indent=2)
+
+    def decorate(self, pos, node, is_first=True):
+        row_id = next(self._row_ids)
+        self._table.register(row_id)
+        row = self._table.get_row(row_id)
 
         # We use parent's decorate() method to give the name column a tree
-        # structure.  But we also need the original update() method so we can
-        # apply new data to the widget.  This is dirty but it works.
+        # structure.  The decorated widget passes new data on to the original
+        # name cell.
         if row.exists('name'):
-            update_method = row.name.update
-            decowidget = super().decorate(pos, row.name, is_first=is_first)
-            decowidget.update = update_method
-            row.replace('name', decowidget)
+            namecell = row.name
+            decowidget = super().decorate(pos, namecell, is_first=is_first)
+            row.replace('name', _DecoratedCell(decowidget, namecell))
 
         # Wrap the whole row in a FileItemWidget with keymapping.  This also
         # applies all the other values besides the name (size, progress, etc).
-        file_widget = self._filewidgetcls(data, row)
-        self._widgets[data['id']] = file_widget
+        file_widget = self._filewidgetcls(node.data, row)
+        file_widget.is_marked = node.is_marked
+        self._widgets[node] = file_widget
+        weakref.finalize(file_widget, self._table.unregister, row_id)
         return file_widget
 
     def update(self, torrents):
-        widgets = self._widgets
-        for t in torrents:
-            # Update file nodes
-            for f in t['files'].files:
-                node_id = f['id']
-                # File might be filtered
-                if node_id in widgets:
-                    widgets[node_id].update(f)
-
-            # Update directory nodes
-            for name,content in t['files'].directories:
-                node_id = content.id
-                if node_id in widgets:
-                    filtered_count = self._filtered_counts[node_id]
-                    data = TorrentFileDirectory(name, tree=content,
-                                                filtered_count=filtered_count)
-                    widgets[node_id].update(data)
+        """Update existing widgets or return False if the tree must be created again"""
+        if not self._filetree.update(torrents):
+            return False
+        for node,widget in tuple(self._widgets.items()):
+            widget.update(node.data)
+        return True
+
+    @property
+    def filecount(self):
+        return self._filetree.filecount
+
+    @property
+    def roots(self):
+        return self._filetree.roots
 
     @property
-    def widgets(self):
-        """Yield all file and directory widgets in this tree"""
-        yield from self._widgets.values()
+    def expanded(self):
+        return self._filetree.expanded
+
+    def node(self, pos):
+        return self._filetree.node(pos)
+
+    def is_leaf(self, pos):
+        return self._filetree.is_leaf(pos)
+
+    def is_expanded(self, pos):
+        return self._filetree.node(pos).is_expanded
 
+    def set_expanded(self, pos, expanded):
+        """Show or hide the contents of the directory at `pos`"""
+        node = self._filetree.node(pos)
+        if node.nodetype == 'parent':
+            node.is_expanded = bool(expanded)
+
+    def set_marked(self, node, mark):
+        """
+        Mark or unmark `node` and all nodes below it
+
+        Return the affected files as _FileNodes.
+        """
+        leaves = []
+
+        def set_marked(node):
+            node.is_marked = mark
+            if node.nodetype == 'leaf':
+                leaves.append(node)
+            else:
+                for child in node.children:
+                    set_marked(child)
+        set_marked(node)
+        return leaves
+
+    @property
+    def widget_items(self):
+        """Yield (_FileNode, FileItemWidget) tuples of all existing widgets"""
+        yield from tuple(self._widgets.items())
 
 
 class FileItemWidget(ItemWidgetBase):
@@ -223,13 +441,20 @@ class FileListWidget(ListWidgetBase):
         elif sffilter is not None:
             ffilter = ffilter & sffilter
 
-        self._filetree = FileTreeDecorator(self._torrents, self._keymap, self._table, ffilter)
+        # Keep directories expanded, e.g. when filters change
+        expanded = self._filetree.expanded if hasattr(self, '_filetree') else ()
+        self._filetree = FileTreeDecorator(self._torrents, self._keymap, self._table, ffilter,
+                                           expanded=expanded)
         self._listbox.body = urwidtrees.widgets.TreeListWalker(self._filetree)
 
     def _update_listitems(self, torrents=()):
         if torrents:
-            self._filetree.update(torrents)
             self._torrents = torrents
+            if not self._filetree.update(torrents):
+                # Files were renamed or moved.  Marked nodes belong to the old
+                # tree and can't find their files anymore.
+                self._marked.clear()
+                self._create_filetree()
 
     @property
     def secondary_filter(self):
@@ -311,59 +536,57 @@ class FileListWidget(ListWidgetBase):
             return focused_widget.torrent_id
 
 
-    def all_children(self, pos):
-        """Yield (position, widget) tuples of all sub-nodes (leaves and parents)"""
-        ft = self._filetree
-        lb = self._listbox
-
-        def recurse(subpos):
-            widget = lb.body[subpos]
-            if ft.is_leaf(subpos):
-                yield (subpos, widget)
-            else:
-                # Yield sub-parent nodes, but not the starting node that was
-                # passed to us
-                if subpos != pos:
-                    yield (subpos, widget)
-
-                new_subpos = ft.first_child_position(subpos)
-                while new_subpos is not None:
-                    yield from recurse(new_subpos)
-                    new_subpos = ft.next_sibling_position(new_subpos)
-
-        yield from recurse(pos)
+    def keypress(self, size, key):
+        key = super().keypress(size, key)
+        if key in ('right', 'left') and hasattr(self, '_filetree'):
+            # Expand/collapse focused directory or move focus to parent
+            ft = self._filetree
+            pos = self._listbox.focus_position
+            if pos is None:
+                return key
+            elif key == 'right':
+                if not ft.is_leaf(pos):
+                    if not ft.is_expanded(pos):
+                        self._set_expanded(pos, True)
+                    else:
+                        self._listbox.focus_position = ft.first_child_position(pos) or pos
+            elif key == 'left':
+                if not ft.is_leaf(pos) and ft.is_expanded(pos):
+                    self._set_expanded(pos, False)
+                else:
+                    parpos = ft.parent_position(pos)
+                    if parpos is not None:
+                        self._listbox.focus_position = parpos
+            return None
+        return key
+
+    def _set_expanded(self, pos, expanded):
+        self._filetree.set_expanded(pos, expanded)
+        # Arrows of the directory's children depend on its siblings, so we
+        # don't have to update existing widgets
+        self._listbox.body._modified()
 
     def _set_mark(self, mark, toggle=False, all=False):
+        if not hasattr(self, '_filetree'):
+            return
+
         if toggle:
             focused = self.focused_widget
             if focused is not None:
                 mark = not focused.is_marked
 
-        def get_widget(pos):
-            return self._listbox.body[pos]
-
-        def mark_leaves(pos, mark):
-            get_widget(pos).is_marked = mark
-
-            for subpos,widget in self.all_children(pos):
-                if widget.nodetype == 'leaf':
-                    widget.is_marked = mark
-                    if mark:
-                        self._marked.add(widget)
-                    else:
-                        self._marked.discard(widget)
-
-                elif widget.nodetype == 'parent':
-                    if pos != subpos:  # Avoid infinite recursion
-                        mark_leaves(subpos, mark)
-
+        ft = self._filetree
         if all:
-            # Top ancestor node positions are (0,), (1,), (3,) etc
-            for pos in self._filetree.positions():
-                if len(pos) == 1:
-                    mark_leaves(pos, mark)
+            nodes = ft.roots
         else:
-            mark_leaves(self._listbox.focus_position, mark)
+            nodes = (ft.node(self._listbox.focus_position),)
+
+        for node in nodes:
+            for leaf in ft.set_marked(node, mark):
+                if mark:
+                    self._marked.add(leaf)
+                else:
+                    self._marked.discard(leaf)
         assert builtins.all(m.nodetype == 'leaf' for m in self._marked)
 
         # A parent node is marked only if all its children are marked.  To check
@@ -371,21 +594,17 @@ class FileListWidget(ListWidgetBase):
         # children.  There is no need to check the children of other parent
         # nodes (uncles, great uncles, etc) because they should already be
         # marked properly from previous runs.
+        if not all:
+            parpos = ft.parent_position(self._listbox.focus_position)
+            while parpos is not None:
+                parnode = ft.node(parpos)
+                parnode.is_marked = builtins.all(child.is_marked for child in parnode.children)
+                parpos = ft.parent_position(parpos)
 
-        def all_children_marked(pos):
-            marked = True
-            childpos = self._filetree.first_child_position(pos)
-            while childpos is not None:
-                marked = marked and get_widget(childpos).is_marked
-                childpos = self._filetree.next_sibling_position(childpos)
-            return marked
-
-        parpos = self._filetree.parent_position(self._listbox.focus_position)
-        while parpos is not None:
-            parwidget = get_widget(parpos)
-            parwidget.is_marked = all_children_marked(parpos)
-            parpos = self._filetree.parent_position(parpos)
+        self.refresh_marks()
 
     def refresh_marks(self):
-        for widget in self._filetree.widgets:
-            widget.is_marked = widget.is_marked
+        if hasattr(self, '_filetree'):
+            ft = self._filetree
+            for node,widget in ft.widget_items:
+                widget.is_marked = node.is_marked
@@ -33,6 +33,7 @@ class PeerListWidget(ListWidgetBase):
     keymap_context  = 'peer'
     palette_name    = 'peerlist'
     focusable_items = False
+    virtual_items   = True
 
     def __init__(self, srvapi, keymap, tfilter=None, pfilter=None, columns=None, sort=None, title=None):
         super().__init__(srvapi, keymap, columns=columns, sort=sort, title=title)
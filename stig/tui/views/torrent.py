@@ -175,6 +175,7 @@ class Downloaded(_COLUMNS['downloaded'], CellWidgetBase):
                   extras=('header',), modes=('highlighted',))
     header = urwid.AttrMap(ColumnHeaderWidget(**_COLUMNS['downloaded'].header),
                            style.attrs('header'))
+    needed_keys = _COLUMNS['downloaded'].needed_keys + ('%downloaded',)
 
     def get_mode(self):
         t = self.data
@@ -340,6 +341,7 @@ class Created(_COLUMNS['created'], CellWidgetBase):
     style = Style(prefix='torrentlist.created', focusable=True, extras=('header',))
     header = urwid.AttrMap(ColumnHeaderWidget(**_COLUMNS['created'].header),
                            style.attrs('header'))
+    depends_on_time = True
 
 TUICOLUMNS['created'] = Created
 
@@ -347,6 +349,7 @@ class Added(_COLUMNS['added'], CellWidgetBase):
     style = Style(prefix='torrentlist.added', focusable=True, extras=('header',))
     header = urwid.AttrMap(ColumnHeaderWidget(**_COLUMNS['added'].header),
                            style.attrs('header'))
+    depends_on_time = True
 
 TUICOLUMNS['added'] = Added
 
@@ -354,6 +357,7 @@ class Started(_COLUMNS['started'], CellWidgetBase):
     style = Style(prefix='torrentlist.started', focusable=True, extras=('header',))
     header = urwid.AttrMap(ColumnHeaderWidget(**_COLUMNS['started'].header),
                            style.attrs('header'))
+    depends_on_time = True
 
 TUICOLUMNS['started'] = Started
 
@@ -361,6 +365,7 @@ class Active(_COLUMNS['activity'], CellWidgetBase):
     style = Style(prefix='torrentlist.activity', focusable=True, extras=('header',))
     header = urwid.AttrMap(ColumnHeaderWidget(**_COLUMNS['activity'].header),
                            style.attrs('header'))
+    depends_on_time = True
 
 TUICOLUMNS['activity'] = Active
 
@@ -369,6 +374,7 @@ class Completed(_COLUMNS['completed'], CellWidgetBase):
                   extras=('header',), modes=('highlighted',))
     header = urwid.AttrMap(ColumnHeaderWidget(**_COLUMNS['completed'].header),
                            style.attrs('header'))
+    depends_on_time = True
 
     def get_mode(self):
         return 'highlighted' if self.value.in_future else ''
@@ -40,6 +40,7 @@ class TorrentListWidget(ListWidgetBase):
     keymap_context  = 'torrent'
     palette_name    = 'torrentlist'
     focusable_items = True
+    virtual_items   = True
 
     def __init__(self, srvapi, keymap, tfilter=None, sort=None, columns=None, title=None):
         super().__init__(srvapi, keymap, columns=columns, sort=sort, title=title)
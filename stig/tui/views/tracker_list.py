@@ -40,6 +40,7 @@ class TrackerListWidget(ListWidgetBase):
     keymap_context  = 'tracker'
     palette_name    = 'trackerlist'
     focusable_items = True
+    virtual_items   = True
 
     def __init__(self, srvapi, keymap, torfilter, trkfilter, columns=None, sort=None, title=None):
         super().__init__(srvapi, keymap, columns=columns, sort=sort, title=title)
@@ -94,6 +94,24 @@ class TestSettingsAPI(asynctest.TestCase):
         with self.assertRaises(ValueError):
             await self.api.set('foo', 'bar')
 
+    async def test_unchanged_response_after_clearcache(self):
+        cb = rsrc.FakeCallback('handle_settings')
+        self.api.on_update(cb)
+        self.addCleanup(setattr, convert.bandwidth, 'unit', 'byte')
+        convert.bandwidth.unit = 'byte'
+        self.rpc.fake_settings['speed-limit-down'] = 100
+        self.rpc.fake_settings['speed-limit-down-enabled'] = True
+        await self.api._do_poll()
+        self.assertEqual(str(self.api['limit.rate.down']), '100kB')
+        await self.api._do_poll()
+        self.assertEqual(cb.calls, 1)
+
+        convert.bandwidth.unit = 'bit'
+        self.api.clearcache(run_callbacks=False)
+        await self.api._do_poll()
+        self.assertEqual(cb.calls, 2)
+        self.assertEqual(str(self.api['limit.rate.down']), '800kb')
+
 
     async def test_get_autostart(self):
         self.assertIs(self.api['autostart'], const.DISCONNECTED)
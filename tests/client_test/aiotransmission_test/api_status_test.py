@@ -24,12 +24,18 @@ class FakeRequestPoller():
     def on_response(self, callback, autoremove=True):
         self.cb_response = callback
 
+    def on_unchanged(self, callback, autoremove=True):
+        self.cb_unchanged = callback
+
     def on_error(self, callback, autoremove=True):
         self.cb_error = callback
 
     async def fake_response(self):
         self.cb_response(await self.request())
 
+    async def fake_unchanged_response(self):
+        self.cb_unchanged(await self.request())
+
     async def start(self):
         pass
 
@@ -133,3 +139,39 @@ class TestStatusAPI(asynctest.TestCase):
         self.assertEqual(status.count.uploading, const.DISCONNECTED)
         self.assertEqual(status.count.downloading, const.DISCONNECTED)
         self.assertEqual(status.count.isolated, const.DISCONNECTED)
+
+    async def test_on_update_callback_with_unchanged_responses(self):
+        cb = rsrc.FakeCallback('handle_info')
+        self.api.on_update(cb)
+        await self.api._poller_stats.fake_response()
+        await self.api._poller_tcount.fake_response()
+        self.assertEqual(cb.calls, 1)
+
+        await self.api._poller_stats.fake_unchanged_response()
+        await self.api._poller_tcount.fake_unchanged_response()
+        self.assertEqual(cb.calls, 1)
+
+        await self.api._poller_stats.fake_response()
+        await self.api._poller_tcount.fake_unchanged_response()
+        self.assertEqual(cb.calls, 2)
+
+        await self.api._poller_stats.fake_unchanged_response()
+        await self.api._poller_tcount.fake_response()
+        self.assertEqual(cb.calls, 3)
+
+    async def test_on_update_callback_with_unchanged_responses_after_clearcache(self):
+        cb = rsrc.FakeCallback('handle_info')
+        self.api.on_update(cb)
+        await self.api._poller_stats.fake_response()
+        await self.api._poller_tcount.fake_response()
+        self.assertEqual(cb.calls, 1)
+
+        self.api.clearcache()
+        self.assertEqual(cb.calls, 1)
+        await self.api._poller_stats.fake_unchanged_response()
+        await self.api._poller_tcount.fake_unchanged_response()
+        self.assertEqual(cb.calls, 2)
+
+        await self.api._poller_stats.fake_unchanged_response()
+        await self.api._poller_tcount.fake_unchanged_response()
+        self.assertEqual(cb.calls, 2)
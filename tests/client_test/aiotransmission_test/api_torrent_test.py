@@ -1,10 +1,14 @@
 import os.path
+import time
+import unittest
 
 import asynctest
+from aiohttp import web
 
 import resources_aiotransmission as rsrc
 from stig.client import MAX_TORRENT_FILE_SIZE
-from stig.client.aiotransmission.api_torrent import TorrentAPI
+from stig.client.aiotransmission import api_torrent
+from stig.client.aiotransmission.api_torrent import TorrentAPI, _TorrentCache
 from stig.client.aiotransmission.rpc import TransmissionRPC
 from stig.client.aiotransmission.torrent import Torrent
 from stig.client.filters.torrent import TorrentFilter
@@ -160,6 +164,226 @@ class TestGettingTorrents(TorrentAPITestCase):
         self.assertEqual(response.msgs, ())
         self.assertEqual(response.errors, ('No matching torrents: =Nope',))
 
+    async def test_get_torrents_by_id_or_hash_filter(self):
+        def torrent_get(request):
+            args = request['arguments']
+            torrents = [{'id': 1, 'name': 'Foo', 'hashString': 'aa01'},
+                        {'id': 2, 'name': 'Bar', 'hashString': 'bb02'},
+                        {'id': 3, 'name': 'Baz', 'hashString': 'cc03'}]
+            if 'ids' in args:
+                torrents = [t for t in torrents if t['id'] in args['ids'] or t['hashString'] in args['ids']]
+            return web.json_response({'result': 'success', 'arguments': {
+                'torrents': [{field: t[field] for field in args['fields'] if field in t}
+                             for t in torrents]}})
+
+        async def handler(request):
+            request_json = await request.json()
+            if request_json['method'] == 'session-get':
+                return web.json_response(rsrc.SESSION_GET_RESPONSE)
+            return torrent_get(request_json)
+        self.daemon.response = handler
+
+        response = await self.api.torrents(torrents=TorrentFilter('id=3|id=1'), keys=('name',))
+        self.assertEqual(tuple(t['name'] for t in response.torrents), ('Foo', 'Baz'))
+        self.assertEqual(response.msgs, ('Found 2 id=3|id=1 torrents',))
+        torrent_gets = [r for r in self.daemon.requests if r['method'] == 'torrent-get']
+        self.assertEqual(len(torrent_gets), 2)  # Second request is for static fields
+        self.assertEqual(torrent_gets[0]['arguments']['ids'], [1, 3])
+
+        self.daemon.requests.clear()
+        response = await self.api.torrents(torrents=TorrentFilter('hash=bb02&name~a'), keys=('name',))
+        self.assertEqual(tuple(t['name'] for t in response.torrents), ('Bar',))
+        torrent_gets = [r for r in self.daemon.requests if r['method'] == 'torrent-get']
+        self.assertEqual(torrent_gets[0]['arguments']['ids'], ['bb02'])
+
+        self.daemon.requests.clear()
+        response = await self.api.torrents(torrents=TorrentFilter('id=2&name~foo'), keys=('name',))
+        self.assertEqual(response.success, False)
+        self.assertEqual(response.errors, ('No matching torrents: id=2&~foo',))
+        torrent_gets = [r for r in self.daemon.requests if r['method'] == 'torrent-get']
+        self.assertEqual(torrent_gets[0]['arguments']['ids'], [2])
+
+        self.daemon.requests.clear()
+        response = await self.api.torrents(torrents=TorrentFilter('id=2|name~foo'), keys=('name',))
+        self.assertEqual(tuple(t['name'] for t in response.torrents), ('Foo', 'Bar'))
+        torrent_gets = [r for r in self.daemon.requests if r['method'] == 'torrent-get']
+        self.assertNotIn('ids', torrent_gets[0]['arguments'])
+
+    async def test_get_torrents_incrementally(self):
+        self.daemon.response = rsrc.response_torrents(
+            {'id': 1, 'name': 'Foo', 'rateDownload': 0},
+            {'id': 2, 'name': 'Bar', 'rateDownload': 0},
+            {'id': 3, 'name': 'Baz', 'rateDownload': 0},
+        )
+        response = await self.api.torrents(keys=('rate-down',), incremental=True)
+        self.assertEqual(tuple(t['rate-down'] for t in response.torrents), (0, 0, 0))
+        self.assertNotIn('ids', self.daemon.requests[-1]['arguments'])
+
+        self.daemon.response = rsrc.response_success({
+            'torrents': [{'id': 2, 'name': 'Bar', 'rateDownload': 100}],
+            'removed': [3],
+        })
+        response = await self.api.torrents(keys=('rate-down',), incremental=True)
+        self.assertEqual(self.daemon.requests[-1]['arguments']['ids'], 'recently-active')
+        self.assertEqual(response.torrents,
+                         (Torrent({'id': 1, 'name': 'Foo'}),
+                          Torrent({'id': 2, 'name': 'Bar'})))
+        self.assertEqual(tuple(t['rate-down'] for t in response.torrents), (0, 100))
+
+        # Fields that weren't requested before need a full request
+        self.daemon.response = rsrc.response_torrents(
+            {'id': 1, 'name': 'Foo', 'rateUpload': 0},
+            {'id': 2, 'name': 'Bar', 'rateUpload': 0},
+        )
+        await self.api.torrents(keys=('rate-up',), incremental=True)
+        self.assertNotIn('ids', self.daemon.requests[-1]['arguments'])
+
+    async def test_get_filtered_torrents_incrementally(self):
+        torrents = {1: {'id': 1, 'name': 'Foo', 'rateDownload': 50, 'rateUpload': 10,
+                        'metadataPercentComplete': 1},
+                    2: {'id': 2, 'name': 'Bar', 'rateDownload': 0, 'rateUpload': 20,
+                        'metadataPercentComplete': 1}}
+
+        def response(request):
+            args = self.daemon.requests[-1]['arguments']
+            ids = args.get('ids', tuple(torrents))
+            result = {}
+            if ids == 'recently-active':
+                ids = (1,)
+                result['removed'] = []
+            result['torrents'] = [{k:v for k,v in torrents[tid].items() if k in args['fields']}
+                                  for tid in ids]
+            return web.json_response(rsrc.response_success(result))
+        self.daemon.response = response
+
+        def requests():
+            # Ignore requests for static fields
+            return [({'rateDownload', 'rateUpload'}.intersection(req['arguments']['fields']),
+                     req['arguments'].get('ids'))
+                    for req in self.daemon.requests[prev_requests:]
+                    if 'rateDownload' in req['arguments']['fields']
+                    or 'rateUpload' in req['arguments']['fields']]
+
+        # Full sync requests filter keys of all torrents and wanted keys of
+        # matching torrents
+        prev_requests = len(self.daemon.requests)
+        response = await self.api.torrents('rate-down>0', keys=('rate-up',), incremental=True)
+        self.assertEqual(tuple((t['id'], t['rate-up']) for t in response.torrents), ((1, 10),))
+        self.assertEqual(requests(), [({'rateDownload'}, None),
+                                      ({'rateUpload'}, [1])])
+
+        # Recently active torrents are requested with filter keys and wanted keys
+        torrents[1]['rateUpload'] = 15
+        prev_requests = len(self.daemon.requests)
+        response = await self.api.torrents('rate-down>0', keys=('rate-up',), incremental=True)
+        self.assertEqual(tuple((t['id'], t['rate-up']) for t in response.torrents), ((1, 15),))
+        self.assertEqual(requests(), [({'rateDownload', 'rateUpload'}, 'recently-active')])
+
+        # Torrents that match without being recently active get their wanted keys
+        torrents[2]['rateDownload'] = 1
+        self.api._tcache.update(({'id': 2, 'rateDownload': 1},))
+        prev_requests = len(self.daemon.requests)
+        response = await self.api.torrents('rate-down>0', keys=('rate-up',), incremental=True)
+        self.assertEqual(tuple((t['id'], t['rate-up']) for t in response.torrents),
+                         ((1, 15), (2, 20)))
+        self.assertEqual(requests(), [({'rateDownload', 'rateUpload'}, 'recently-active'),
+                                      ({'rateUpload'}, [2])])
+
+        # Wanted keys of non-matching torrents are not synced
+        prev_requests = len(self.daemon.requests)
+        await self.api.torrents(keys=('rate-up',), incremental=True)
+        self.assertEqual(requests(), [({'rateUpload'}, None)])
+
+        # Full sync is done periodically
+        monotonic = time.monotonic() + api_torrent.FULL_SYNC_INTERVAL
+        prev_requests = len(self.daemon.requests)
+        with asynctest.patch('time.monotonic', return_value=monotonic):
+            await self.api.torrents('rate-down>0', keys=('rate-up',), incremental=True)
+        self.assertEqual(requests(), [({'rateDownload'}, None),
+                                      ({'rateUpload'}, [1, 2])])
+
+    async def test_static_fields_are_requested_once(self):
+        torrents = {1: {'id': 1, 'name': 'Foo', 'totalSize': 10, 'rateDownload': 50,
+                        'metadataPercentComplete': 1},
+                    2: {'id': 2, 'name': 'Bar', 'totalSize': 0, 'rateDownload': 0,
+                        'metadataPercentComplete': 0.5}}
+
+        def response(request):
+            args = self.daemon.requests[-1]['arguments']
+            ids = args.get('ids', tuple(torrents))
+            return web.json_response(rsrc.response_success({'torrents': [
+                {k:v for k,v in torrents[tid].items() if k in args['fields']}
+                for tid in ids
+            ]}))
+        self.daemon.response = response
+
+        def requested_fields():
+            return [(set(req['arguments']['fields']), req['arguments'].get('ids'))
+                    for req in self.daemon.requests[prev_requests:]]
+
+        prev_requests = len(self.daemon.requests)
+        response = await self.api.torrents(keys=('name', 'size-total', 'rate-down'))
+        self.assertEqual(tuple((t['name'], t['size-total']) for t in response.torrents),
+                         (('Foo', 10), ('Bar', 0)))
+        self.assertEqual(requested_fields(), [
+            ({'id', 'rateDownload', 'metadataPercentComplete'}, None),
+            ({'id', 'name', 'totalSize', 'metadataPercentComplete'}, [1, 2]),
+        ])
+
+        # Metadata of torrent 2 is still incomplete
+        torrents[2].update(metadataPercentComplete=1, totalSize=20)
+        prev_requests = len(self.daemon.requests)
+        response = await self.api.torrents(keys=('name', 'size-total', 'rate-down'))
+        self.assertEqual(tuple((t['name'], t['size-total']) for t in response.torrents),
+                         (('Foo', 10), ('Bar', 20)))
+        self.assertEqual(requested_fields(), [
+            ({'id', 'rateDownload', 'metadataPercentComplete'}, None),
+            ({'id', 'name', 'totalSize', 'metadataPercentComplete'}, [2]),
+        ])
+
+        # All static fields are known
+        prev_requests = len(self.daemon.requests)
+        await self.api.torrents(keys=('name', 'size-total', 'rate-down'))
+        self.assertEqual(requested_fields(), [
+            ({'id', 'rateDownload', 'metadataPercentComplete'}, None),
+        ])
+
+    async def test_unchanged_torrents_return_previous_response(self):
+        self.daemon.response = rsrc.response_torrents({'id': 1, 'rateDownload': 0})
+        response1 = await self.api.torrents(keys=('rate-down',))
+        revision = self.api._tcache.revision
+        response2 = await self.api.torrents(keys=('rate-down',))
+        self.assertIs(response2, response1)
+        self.assertEqual(self.api._tcache.revision, revision)
+        self.assertEqual(self.rpc.stats['unchanged'], 1)
+
+        # Another request changes the cached torrent
+        self.daemon.response = rsrc.response_torrents({'id': 1, 'rateDownload': 100})
+        response3 = await self.api.torrents((1,), keys=('rate-down',))
+        self.assertEqual(tuple(t['rate-down'] for t in response3.torrents), (100,))
+
+        # The response is unchanged, but the cache is not
+        self.daemon.response = rsrc.response_torrents({'id': 1, 'rateDownload': 0})
+        response4 = await self.api.torrents(keys=('rate-down',))
+        self.assertEqual(self.rpc.stats['unchanged'], 2)
+        self.assertIsNot(response4, response1)
+        self.assertEqual(tuple(t['rate-down'] for t in response4.torrents), (0,))
+
+    async def test_time_dependent_filters_never_return_previous_response(self):
+        now = 1000000
+        self.daemon.response = rsrc.response_torrents(
+            {'id': 1, 'name': 'a', 'activityDate': now - 5},
+            {'id': 2, 'name': 'b', 'activityDate': now - 5},
+        )
+        with asynctest.patch('time.time', return_value=now):
+            response1 = await self.api.torrents('activity<10s|name=b', keys=('name',))
+        self.assertEqual(tuple(t['id'] for t in response1.torrents), (1, 2))
+
+        with asynctest.patch('time.time', return_value=now + 60):
+            response2 = await self.api.torrents('activity<10s|name=b', keys=('name',))
+        self.assertIsNot(response2, response1)
+        self.assertEqual(tuple(t['id'] for t in response2.torrents), (2,))
+
 
 class TestManipulatingTorrents(TorrentAPITestCase):
     async def setUp(self):
@@ -348,3 +572,142 @@ class TestTorrentBandwidthLimit(TorrentAPITestCase):
         )
         await self.api.adjust_limit_rate_up(TorrentFilter('id=1|id=2'), -50e3)
         self.daemon.requests == ()  # Assert no requests were sent
+
+
+def _raw_torrent(tid, hash, path, status=4, announce=('http://tracker.example.org/announce',)):
+    return {'id': tid, 'name': 'Torrent %d' % tid, 'hashString': hash, 'downloadDir': path,
+            'status': status, 'percentDone': 0.5, 'metadataPercentComplete': 1,
+            'rateDownload': 0, 'rateUpload': 0, 'peersConnected': 0, 'isPrivate': False,
+            'trackerStats': [{'id': i, 'tier': 0, 'announce': url, 'scrape': url,
+                              'announceState': 1, 'scrapeState': 1, 'downloadCount': 0,
+                              'leecherCount': 0, 'seederCount': 0}
+                             for i,url in enumerate(announce)]}
+
+
+class TestTorrentCacheIndexes(unittest.TestCase):
+    def setUp(self):
+        self.tcache = _TorrentCache()
+        self.tcache.update((
+            _raw_torrent(1, 'aa01', '/mnt/disk1/foo'),
+            _raw_torrent(2, 'BB02', '/mnt/disk2', status=0),
+            _raw_torrent(3, 'cc03', '/mnt/Disk1',
+                         announce=('http://other.org/announce',
+                                   'http://tracker.example.org/announce')),
+            _raw_torrent(4, 'dd04', '/home/user', announce=('http://other.org/announce',)),
+        ))
+
+    def lookup(self, filter_str):
+        return TorrentFilter(filter_str).candidates(self.tcache.lookup)
+
+    def test_id(self):
+        self.assertEqual(self.lookup('id=3'), {3})
+        self.assertEqual(self.lookup('id=5'), set())
+        self.assertEqual(self.lookup('id=3|id=1|id=5'), {1, 3})
+        self.assertEqual(self.lookup('id>3'), None)
+
+    def test_hash(self):
+        self.assertEqual(self.lookup('hash=bb02'), {2})
+        self.assertEqual(self.lookup('hash=cc03|hash=aa01'), {1, 3})
+        self.assertEqual(self.lookup('hash~cc'), None)
+
+    def test_status(self):
+        self.assertEqual(self.lookup('stopped'), {2})
+        self.assertEqual(self.lookup('idle'), {1, 2, 3, 4})
+        self.assertEqual(self.lookup('!stopped'), None)
+        self.tcache.update((_raw_torrent(2, 'BB02', '/mnt/disk2', status=4),
+                            _raw_torrent(4, 'dd04', '/home/user', status=0)))
+        self.assertEqual(self.lookup('stopped'), {4})
+
+    def test_tracker(self):
+        self.assertEqual(self.lookup('tracker=example.org'), {1, 2, 3})
+        self.assertEqual(self.lookup('tracker=other.org'), {3, 4})
+        self.assertEqual(self.lookup('tracker=other.org&stopped'), set())
+        self.assertEqual(self.lookup('tracker=other.org&id=4|id=1'), {1, 4})
+        self.assertEqual(self.lookup('tracker=other.org&id=4|name~foo'), None)
+
+    def test_path(self):
+        self.assertEqual(self.lookup('path=/mnt/disk1'), {3})
+        self.assertEqual(self.lookup('path=~^/mnt/disk1'), {1, 3})
+        self.assertEqual(self.lookup('path=~^/mnt/disk'), {1, 2, 3})
+        self.assertEqual(self.lookup('path=~^/mnt/disk.'), {1, 2, 3})
+        self.assertEqual(self.lookup('path=~^/mnt/disk1?'), {1, 2, 3})
+        self.assertEqual(self.lookup('path=~^/home'), {4})
+        self.assertEqual(self.lookup('path=~/mnt'), None)
+        self.assertEqual(self.lookup('path~/mnt'), None)
+        self.tcache.update((_raw_torrent(4, 'dd04', '/mnt/disk3'),))
+        self.assertEqual(self.lookup('path=~^/home'), set())
+        self.assertEqual(self.lookup('path=~^/mnt/disk3'), {4})
+
+    def test_candidates_include_all_matches(self):
+        for filter_str in ('path=/mnt/disk1', 'path=~^/mnt/Disk', 'tracker=example.org&!stopped',
+                           'hash=bb02|path=~^/home', 'idle'):
+            tfilter = TorrentFilter(filter_str)
+            exp = set(t['id'] for t in tfilter.apply(self.tcache.get()))
+            self.assertTrue(exp.issubset(self.lookup(filter_str)), filter_str)
+
+    def test_removed_torrents_are_removed_from_indexes(self):
+        self.tcache.remove((3,))
+        self.assertEqual(self.lookup('tracker=other.org'), {4})
+        self.tcache.purge(existing_tids=(1, 2))
+        self.assertEqual(self.lookup('tracker=other.org'), set())
+        self.assertEqual(self.lookup('path=~^/'), {1, 2})
+
+    def test_get_with_ids(self):
+        self.assertEqual(tuple(t['id'] for t in self.tcache.get(3, 1, 5, 3)), (3, 1))
+
+
+class TestTorrentCacheSync(unittest.TestCase):
+    def setUp(self):
+        self.tcache = _TorrentCache()
+        self.now = time.monotonic()
+
+    def is_synced(self, fields, age, scope=None):
+        with asynctest.patch('time.monotonic', return_value=self.now + age):
+            return self.tcache.is_synced(fields, scope=scope)
+
+    def test_full_sync_interval_is_shorter_than_recently_active_period(self):
+        self.assertLess(api_torrent.FULL_SYNC_INTERVAL, api_torrent.RECENTLY_ACTIVE_SECONDS)
+
+    def test_fields_are_synced_until_full_sync_interval_passed(self):
+        self.assertFalse(self.is_synced(('id', 'name'), age=0))
+        with asynctest.patch('time.monotonic', return_value=self.now):
+            self.tcache.mark_synced(('id', 'name'))
+        self.assertTrue(self.is_synced(('id', 'name'), age=api_torrent.FULL_SYNC_INTERVAL - 1))
+        self.assertFalse(self.is_synced(('id', 'name'), age=api_torrent.FULL_SYNC_INTERVAL))
+        self.assertFalse(self.is_synced(('id', 'name', 'status'), age=0))
+
+    def test_scoped_fields(self):
+        with asynctest.patch('time.monotonic', return_value=self.now):
+            self.tcache.mark_synced(('id', 'name'), scope='foo')
+        self.assertTrue(self.is_synced(('id', 'name'), age=0, scope='foo'))
+        self.assertFalse(self.is_synced(('id', 'name'), age=0, scope='bar'))
+        self.assertFalse(self.is_synced(('id', 'name'), age=0))
+        self.assertFalse(self.is_synced(('id', 'name'), age=api_torrent.FULL_SYNC_INTERVAL,
+                                        scope='foo'))
+
+        with asynctest.patch('time.monotonic', return_value=self.now):
+            self.tcache.mark_synced(('id', 'name'))
+        self.assertTrue(self.is_synced(('id', 'name'), age=0, scope='bar'))
+
+
+class TestTorrentCacheFilterResults(unittest.TestCase):
+    def setUp(self):
+        self.tcache = _TorrentCache()
+        self.tcache.update((_raw_torrent(1, 'aa01', '/mnt/disk1'),
+                            _raw_torrent(2, 'bb02', '/mnt/disk2', status=0)))
+
+    def filter_results(self):
+        return {t['id']: sorted(str(f) for f in t.filter_cache) for t in self.tcache.get()}
+
+    def test_forget_filter_results(self):
+        tuple(TorrentFilter('stopped|path=/mnt/disk1').apply(self.tcache.get()))
+        tuple(TorrentFilter('private').apply(self.tcache.get()))
+        self.assertEqual(self.filter_results(), {1: ['path=/mnt/disk1', 'private', 'stopped'],
+                                                 2: ['private', 'stopped']})
+
+        self.tcache.forget_filter_results(keep=TorrentFilter('stopped|path=/mnt/disk1').filters)
+        self.assertEqual(self.filter_results(), {1: ['path=/mnt/disk1', 'stopped'],
+                                                 2: ['stopped']})
+
+        self.tcache.forget_filter_results()
+        self.assertEqual(self.filter_results(), {1: [], 2: []})
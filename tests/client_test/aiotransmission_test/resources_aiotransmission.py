@@ -110,9 +110,10 @@ def response_torrents(*torrents):
 
 
 class FakeTransmissionDaemon:
-    def __init__(self):
+    def __init__(self, socket_path=None):
         self.host = 'localhost'
         self.port = unused_port()
+        self.socket_path = socket_path
         self.app = web.Application()
         self.app.router.add_route(method='POST',
                                   path='/{path:.*}',
@@ -179,7 +180,10 @@ class FakeTransmissionDaemon:
     async def start(self):
         self.runner = web.AppRunner(self.app)
         await self.runner.setup()
-        site = web.TCPSite(self.runner, self.host, self.port)
+        if self.socket_path is not None:
+            site = web.UnixSite(self.runner, self.socket_path)
+        else:
+            site = web.TCPSite(self.runner, self.host, self.port)
         await site.start()
 
     async def stop(self):
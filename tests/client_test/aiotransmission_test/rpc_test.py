@@ -1,11 +1,16 @@
 import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
 
 import asynctest
 from aiohttp import web
 
 import resources_aiotransmission as rsrc
 from stig.client import AuthError, ConnectionError, RPCError, TimeoutError
-from stig.client.aiotransmission.rpc import TransmissionRPC
+from stig.client.aiotransmission.rpc import JSONCodec, TransmissionRPC
 
 
 class TestTransmissionRPC(asynctest.ClockedTestCase):
@@ -122,6 +127,29 @@ class TestTransmissionRPC(asynctest.ClockedTestCase):
         self.assertEqual(self.client.user, '')
         self.assertEqual(self.client.password, '')
 
+    def test_setting_unix_socket_url(self):
+        self.client.url = 'unix:///run/transmission.sock'
+        self.assertEqual(self.client.url, 'unix:///run/transmission.sock')
+        self.assertEqual(self.client.socket_path, '/run/transmission.sock')
+        self.assertEqual(self.client.path, '/transmission/rpc')
+        self.assertEqual(self.client.tls, False)
+        self.client.url = 'unix://foo:bar@/run/transmission.sock'
+        self.assertEqual(self.client.url, 'unix:///run/transmission.sock')
+        self.assertEqual(self.client.url_unsafe, 'unix://foo:bar@/run/transmission.sock')
+        self.assertEqual((self.client.user, self.client.password), ('foo', 'bar'))
+        with self.assertRaises(ValueError):
+            self.client.url = 'unix://'
+        with self.assertRaises(ValueError):
+            self.client.url = 'unix:/run/transmission.sock'
+        self.assertEqual(self.client.url, 'unix:///run/transmission.sock')
+        self.client.host = 'some.host'
+        self.assertEqual(self.client.socket_path, None)
+        self.assertEqual(self.client.url, 'http://some.host:9091/transmission/rpc')
+        self.client.url = 'unix://transmission.sock'
+        self.client.url = 'localhost:123'
+        self.assertEqual(self.client.socket_path, None)
+        self.assertEqual(self.client.url, 'http://localhost:123/transmission/rpc')
+
     def test_url_unsafe_property(self):
         self.client.url = 'some.host'
         self.assertEqual(self.client.url_unsafe, self.client.url)
@@ -401,3 +429,260 @@ class TestTransmissionRPC(asynctest.ClockedTestCase):
         self.assert_cb_error_called(calls=1,
                                     args=[(self.client,)],
                                     kwargs=[{'error': cm.exception}])
+
+    async def test_concurrent_requests_are_limited(self):
+        self.client.max_concurrent_requests = 3
+        await self.client.connect()
+
+        pending = 0
+        max_pending = 0
+        limit_reached = asyncio.Event()
+        release = asyncio.Event()
+
+        async def delayed_response(request):
+            nonlocal pending, max_pending
+            pending += 1
+            max_pending = max(max_pending, pending)
+            if pending >= 3:
+                limit_reached.set()
+            await release.wait()
+            pending -= 1
+            return web.json_response(rsrc.response_success({}))
+        self.daemon.response = delayed_response
+
+        # Identical requests would be coalesced
+        requests = asyncio.gather(*(self.client.torrent_get(ids=(i,)) for i in range(10)))
+        await limit_reached.wait()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        self.assertEqual(pending, 3)
+        release.set()
+        await requests
+        self.assertEqual(max_pending, 3)
+        self.assert_cb_error_called(calls=0)
+
+    async def test_concurrent_requests_autoconnect_only_once(self):
+        self.assert_not_connected_to(self.daemon.host, self.daemon.port)
+
+        async def response(request):
+            if (await request.json())['method'] == 'session-get':
+                return web.json_response(rsrc.SESSION_GET_RESPONSE)
+            else:
+                return web.json_response(rsrc.response_success({}))
+        self.daemon.response = response
+
+        await asyncio.gather(*(self.client.session_stats() for _ in range(5)))
+        self.assert_connected_to(self.daemon.host, self.daemon.port)
+        self.assert_cb_connected_called(calls=1, args=[(self.client,)])
+        self.assert_cb_disconnected_called(calls=0)
+        self.assert_cb_error_called(calls=0)
+
+    def test_invalid_max_concurrent_requests(self):
+        with self.assertRaises(ValueError):
+            self.client.max_concurrent_requests = 0
+
+    async def test_identical_pending_requests_are_coalesced(self):
+        await self.client.connect()
+        self.daemon.requests.clear()
+
+        release = asyncio.Event()
+
+        async def delayed_response(request):
+            await release.wait()
+            return web.json_response(rsrc.response_success({'foo': 'bar'}))
+        self.daemon.response = delayed_response
+
+        requests = asyncio.gather(*(self.client.session_stats() for _ in range(5)))
+        await asyncio.sleep(0)
+        release.set()
+        responses = await requests
+        self.assertEqual(responses, [{'foo': 'bar'}] * 5)
+        self.assertEqual(len(self.daemon.requests), 1)
+        self.assertEqual(self.client.stats['coalesced'], 4)
+
+        # Finished requests are not reused
+        await self.client.session_stats()
+        self.assertEqual(len(self.daemon.requests), 2)
+        self.assert_cb_error_called(calls=0)
+
+    async def test_requests_with_different_arguments_are_not_coalesced(self):
+        await self.client.connect()
+        self.daemon.requests.clear()
+        self.daemon.response = rsrc.response_torrents({'id': 1})
+        await asyncio.gather(self.client.torrent_get(fields=('id', 'name')),
+                             self.client.torrent_get(fields=('id', 'name'), ids=(1,)),
+                             self.client.torrent_get(fields=('id', 'name')))
+        self.assertEqual(len(self.daemon.requests), 2)
+        self.assertEqual(self.client.stats['coalesced'], 1)
+
+    async def test_modifying_requests_are_not_coalesced(self):
+        await self.client.connect()
+        self.daemon.requests.clear()
+        self.daemon.response = rsrc.response_success({})
+        await asyncio.gather(*(self.client.torrent_start(ids=(1,)) for _ in range(3)))
+        self.assertEqual(len(self.daemon.requests), 3)
+        self.assertEqual(self.client.stats['coalesced'], 0)
+
+    async def test_cancelling_coalesced_request(self):
+        await self.client.connect()
+
+        release = asyncio.Event()
+
+        async def delayed_response(request):
+            await release.wait()
+            return web.json_response(rsrc.response_success({'foo': 'bar'}))
+        self.daemon.response = delayed_response
+
+        first = asyncio.ensure_future(self.client.session_stats())
+        second = asyncio.ensure_future(self.client.session_stats())
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        self.assertEqual(await second, {'foo': 'bar'})
+
+    async def test_custom_codec(self):
+        client = TransmissionRPC(self.daemon.host, self.daemon.port, codec=JSONCodec(json))
+        self.assertEqual(client.codec.name, 'json')
+        await client.connect()
+        self.daemon.response = rsrc.response_success({'foo': 'bar'})
+        self.assertEqual(await client.session_stats(), {'foo': 'bar'})
+        await client.disconnect()
+
+    async def test_compressed_responses(self):
+        await self.client.connect()
+        accept_encodings = []
+
+        async def compressed_response(request):
+            accept_encodings.append(request.headers.get('Accept-Encoding'))
+            response = web.json_response(rsrc.response_success({'foo': 'bar' * 1000}))
+            response.enable_compression()
+            return response
+        self.daemon.response = compressed_response
+
+        self.assertEqual(self.client.compression, True)
+        self.assertEqual(await self.client.session_stats(), {'foo': 'bar' * 1000})
+        self.assertIn('gzip', accept_encodings[-1])
+
+        self.client.compression = False
+        self.assertEqual(self.client.compression, False)
+        self.assertEqual(await self.client.session_stats(), {'foo': 'bar' * 1000})
+        self.assertEqual(accept_encodings[-1], 'identity')
+        self.assert_cb_error_called(calls=0)
+
+    async def test_unchanged_responses_are_not_decoded_again(self):
+        await self.client.connect()
+        self.daemon.requests.clear()
+        self.daemon.response = rsrc.response_torrents({'id': 1, 'name': 'foo'})
+        with patch.object(self.client.codec, 'decode', wraps=self.client.codec.decode) as decode:
+            response1 = await self.client.torrent_get(fields=('id', 'name'))
+            response2 = await self.client.torrent_get(fields=('id', 'name'))
+            self.assertIs(response1, response2)
+            self.assertEqual(decode.call_count, 1)
+            self.assertEqual(self.client.stats['unchanged'], 1)
+
+            # Different arguments
+            response3 = await self.client.torrent_get(fields=('id', 'name'), ids=(1,))
+            self.assertIsNot(response3, response1)
+            self.assertEqual(response3, response1)
+            self.assertEqual(decode.call_count, 2)
+
+            # Different response
+            self.daemon.response = rsrc.response_torrents({'id': 1, 'name': 'bar'})
+            response4 = await self.client.torrent_get(fields=('id', 'name'))
+            self.assertEqual(response4, [{'id': 1, 'name': 'bar'}])
+            self.assertEqual(decode.call_count, 3)
+        self.assertEqual(len(self.daemon.requests), 4)
+        self.assertEqual(self.client.stats['unchanged'], 1)
+
+    async def test_unchanged_responses_are_forgotten_when_disconnecting(self):
+        await self.client.connect()
+        self.daemon.response = rsrc.response_success({'foo': 'bar'})
+        response1 = await self.client.session_stats()
+        self.daemon.response = rsrc.SESSION_GET_RESPONSE
+        await self.client.disconnect()
+        await self.client.connect()
+        self.daemon.response = rsrc.response_success({'foo': 'bar'})
+        response2 = await self.client.session_stats()
+        self.assertIsNot(response1, response2)
+        self.assertEqual(response1, response2)
+        self.assertEqual(self.client.stats['unchanged'], 0)
+
+    async def test_responses_to_modifying_requests_are_always_decoded(self):
+        await self.client.connect()
+        self.daemon.response = rsrc.response_success({'foo': 'bar'})
+        response1 = await self.client.torrent_start(ids=(1,))
+        response2 = await self.client.torrent_start(ids=(1,))
+        self.assertIsNot(response1, response2)
+        self.assertEqual(self.client.stats['unchanged'], 0)
+
+
+class TestTransmissionRPCUnixSocket(asynctest.TestCase):
+    async def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmpdir.name, 'rpc.sock')
+        self.daemon = rsrc.FakeTransmissionDaemon(socket_path=self.socket_path)
+        self.daemon.response = rsrc.SESSION_GET_RESPONSE
+        await self.daemon.start()
+        self.client = TransmissionRPC()
+        self.client.url = 'unix://' + self.socket_path
+
+    async def tearDown(self):
+        await self.client.disconnect()
+        await self.daemon.stop()
+        self.tmpdir.cleanup()
+
+    async def test_connect(self):
+        await self.client.connect()
+        self.assertEqual(self.client.connected, True)
+        self.assertEqual(self.client.version, rsrc.SESSION_GET_RESPONSE['arguments']['version'])
+        self.daemon.response = rsrc.response_success({'foo': 'bar'})
+        self.assertEqual(await self.client.session_stats(), {'foo': 'bar'})
+        # First request is rejected until the CSRF header is sent
+        self.assertEqual([r['method'] for r in self.daemon.requests],
+                         ['session-get', 'session-get', 'session-stats'])
+
+    async def test_authentication(self):
+        self.daemon.auth = {'user': 'foo', 'password': 'bar'}
+        self.client.url = 'unix://foo:bar@' + self.socket_path
+        await self.client.connect()
+        self.assertEqual(self.client.connected, True)
+
+        self.client.url = 'unix://foo:baz@' + self.socket_path
+        with self.assertRaises(AuthError):
+            await self.client.connect()
+        self.assertEqual(self.client.connected, False)
+
+    async def test_nonexisting_socket(self):
+        self.client.url = 'unix://' + self.socket_path + '.nope'
+        with self.assertRaises(ConnectionError):
+            await self.client.connect()
+        self.assertEqual(self.client.connected, False)
+
+
+class TestJSONCodec(unittest.TestCase):
+    def _test_codec(self, codec):
+        data = {'method': 'torrent-get', 'arguments': {'ids': [1, 2], 'fields': ['name']}}
+        self.assertEqual(json.loads(codec.encode(data)), data)
+        self.assertEqual(codec.decode(json.dumps(data).encode()), data)
+        self.assertEqual(codec.decode(json.dumps(data)), data)
+        with self.assertRaises(ValueError):
+            codec.decode(b'<html><body>Fake Web Interface</body></html>')
+
+    def test_stdlib(self):
+        self._test_codec(JSONCodec(json))
+
+    def test_default(self):
+        self._test_codec(JSONCodec())
+
+    def test_orjson(self):
+        try:
+            import orjson
+        except ImportError:
+            self.skipTest('orjson is not installed')
+        codec = JSONCodec(orjson)
+        self._test_codec(codec)
+
+        # Subclasses of built-in numbers are encoded
+        from stig.utils.usertypes import Float, Int
+        self.assertEqual(json.loads(codec.encode({'a': Float(1.5), 'b': Int(10)})),
+                         {'a': 1.5, 'b': 10})
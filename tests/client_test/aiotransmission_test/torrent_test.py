@@ -73,6 +73,81 @@ class TestTorrent(unittest.TestCase):
         self.assertEqual(set(t), {'id', 'name', 'rate-down', 'hash',
                                   'time-created', '%verified'})
 
+    def test_changed_keys(self):
+        t = torrent.Torrent({'id': 123, 'name': 'Fake torrent', 'rateDownload': 10000})
+        self.assertEqual(t.changed_keys, {'id', 'name', 'rate-down'})
+        t.update({'id': 123, 'name': 'Fake torrent', 'rateDownload': 20000})
+        self.assertEqual(t.changed_keys, {'rate-down', 'status'})
+        t.update({'id': 123, 'name': 'Real torrent', 'rateDownload': 20000})
+        self.assertEqual(t.changed_keys, {'name', 'trackers', 'peers'})
+        t.update({'id': 123, 'name': 'Real torrent', 'rateDownload': 20000})
+        self.assertEqual(t.changed_keys, set())
+
+    def test_no_instance_dict(self):
+        t = torrent.Torrent({'id': 123, 'name': 'Fake torrent'})
+        self.assertFalse(hasattr(t, '__dict__'))
+
+    def test_unknown_rpc_fields(self):
+        t = torrent.Torrent({'id': 123, 'name': 'Fake torrent', 'queuePosition': 1})
+        t.update({'id': 123, 'queuePosition': 2})
+        self.assertEqual(t.changed_keys, set())
+        self.assertEqual(set(t), {'id', 'name'})
+
+    def test_revision(self):
+        t = torrent.Torrent({'id': 123, 'name': 'Fake torrent', 'rateDownload': 10000})
+        self.assertEqual(t.revision, 0)
+        t.update({'id': 123, 'name': 'Fake torrent', 'rateDownload': 20000})
+        self.assertEqual(t.revision, 1)
+        t.update({'id': 123, 'name': 'Fake torrent', 'rateDownload': 20000})
+        self.assertEqual(t.revision, 1)
+        t.update({'id': 123, 'name': 'Real torrent'})
+        self.assertEqual(t.revision, 2)
+
+    def test_changed_keys_since(self):
+        t = torrent.Torrent({'id': 123, 'name': 'Fake torrent', 'rateDownload': 10000})
+        t.update({'id': 123, 'name': 'Fake torrent', 'rateDownload': 20000})
+        self.assertEqual(t.changed_keys_since(1), set())
+        self.assertEqual(t.changed_keys_since(0), {'rate-down', 'status'})
+        t.update({'id': 123, 'name': 'Fake torrent', 'rateDownload': 20000})
+        self.assertEqual(t.changed_keys_since(0), {'rate-down', 'status'})
+        t.update({'id': 123, 'name': 'Real torrent'})
+        self.assertEqual(t.changed_keys_since(2), set())
+        self.assertEqual(t.changed_keys_since(1), {'name', 'trackers', 'peers'})
+        self.assertEqual(t.changed_keys_since(0), None)
+
+    def test_filter_results_are_cached_until_needed_keys_change(self):
+        from stig.client.filters.torrent import TorrentFilter
+        t = torrent.Torrent({'id': 123, 'name': 'Fake torrent', 'rateDownload': 10000,
+                             'addedDate': 0})
+        f = TorrentFilter('downloading&name~fake&added!>0')
+        self.assertEqual(f.match(t), True)
+        self.assertEqual(set(str(sf) for sf in t.filter_cache), {'downloading', '~fake'})
+
+        t.update({'id': 123, 'name': 'Fake torrent', 'rateDownload': 0})
+        self.assertEqual(set(str(sf) for sf in t.filter_cache), {'~fake'})
+        self.assertEqual(f.match(t), False)
+        self.assertEqual(t.filter_cache[TorrentFilter('downloading')._filterchains[0][0]], False)
+
+        t.update({'id': 123, 'name': 'Real torrent', 'rateDownload': 0})
+        self.assertEqual(set(str(sf) for sf in t.filter_cache), {'downloading'})
+
+    def test_file_tree_is_updated_with_only_fileStats(self):
+        t = torrent.Torrent({'id': 1, 'name': 'Fake torrent', 'downloadDir': '/a/path',
+                             'fileStats': [{'bytesCompleted': 0, 'priority': 0, 'wanted': True}],
+                             'files': [{'bytesCompleted': 0, 'length': 1000, 'name': 'Fake torrent/file1'}]})
+        ft = t['files']
+        t.update({'id': 1, 'fileStats': [{'bytesCompleted': 100, 'priority': 0, 'wanted': True}]})
+        self.assertIs(t['files'], ft)
+        self.assertEqual(ft['Fake torrent']['file1']['size-downloaded'], 100)
+
+        # Renamed files are requested again
+        t.update({'id': 1, 'name': 'Real torrent',
+                  'fileStats': [{'bytesCompleted': 200, 'priority': 0, 'wanted': True}],
+                  'files': [{'bytesCompleted': 200, 'length': 1000, 'name': 'Real torrent/file1'}]})
+        self.assertEqual(tuple(t['files']), ('Real torrent',))
+        self.assertEqual(t['files']['Real torrent']['file1']['size-downloaded'], 200)
+
+
 class TestTorrentFileTree(unittest.TestCase):
     def test_update(self):
         raw = {'id': 1, 'name': 'Fake torrent', 'downloadDir': '/a/path',
@@ -100,3 +175,67 @@ class TestTorrentFileTree(unittest.TestCase):
         self.assertEqual(ft['Fake torrent']['file1']['size-downloaded'], 500)
         self.assertEqual(ft['Fake torrent']['subdir']['file2']['%downloaded'], 10)
         self.assertEqual(ft['Fake torrent']['subdir']['file2']['size-downloaded'], 200)
+
+    def test_directory_aggregates_are_updated(self):
+        raw = {'id': 1, 'name': 'Fake torrent', 'downloadDir': '/a/path',
+               'fileStats': [{'bytesCompleted': 0, 'priority': 0, 'wanted': True},
+                             {'bytesCompleted': 0, 'priority': 0, 'wanted': True},
+                             {'bytesCompleted': 0, 'priority': 0, 'wanted': True}],
+               'files': [{'bytesCompleted': 0, 'length': 1000, 'name': 'Fake torrent/file1'},
+                         {'bytesCompleted': 0, 'length': 2000, 'name': 'Fake torrent/subdir/file2'},
+                         {'bytesCompleted': 0, 'length': 3000, 'name': 'Fake torrent/subdir/file3'}]}
+        ft = torrent.TorrentFileTree.create(raw)
+        root, subdir = ft['Fake torrent'], ft['Fake torrent']['subdir']
+        self.assertEqual((root.size_total, root.size_downloaded), (6000, 0))
+        self.assertEqual((subdir.size_total, subdir.size_downloaded), (5000, 0))
+        self.assertEqual((root.priority, subdir.priority), ('normal', 'normal'))
+        self.assertEqual((root.is_wanted, subdir.is_wanted), (True, True))
+
+        raw['fileStats'][1] = {'bytesCompleted': 1000, 'priority': 1, 'wanted': True}
+        ft.update(raw)
+        self.assertEqual((root.size_downloaded, root.percent_downloaded), (1000, 1000 / 6000 * 100))
+        self.assertEqual((subdir.size_downloaded, subdir.percent_downloaded), (1000, 20))
+        self.assertEqual((root.priority, subdir.priority), ('', ''))
+        self.assertEqual(subdir['file2']['priority'], 'high')
+
+        raw['fileStats'][1] = {'bytesCompleted': 1000, 'priority': 1, 'wanted': False}
+        raw['fileStats'][2] = {'bytesCompleted': 0, 'priority': 0, 'wanted': False}
+        ft.update(raw)
+        self.assertEqual((root.priority, subdir.priority), ('', 'off'))
+        self.assertEqual((root.is_wanted, subdir.is_wanted), (True, False))
+        self.assertEqual(subdir['file2']['priority'], 'off')
+
+    def test_update_with_renamed_files(self):
+        raw = {'id': 1, 'name': 'Fake torrent', 'downloadDir': '/a/path',
+               'fileStats': [{'bytesCompleted': 10, 'priority': 0, 'wanted': True}],
+               'files': [{'bytesCompleted': 10, 'length': 1000, 'name': 'Fake torrent/file1'}]}
+        ft = torrent.TorrentFileTree.create(raw)
+        layout = ft.layout
+        raw['fileStats'] = [{'bytesCompleted': 20, 'priority': 0, 'wanted': True}]
+        ft.update(raw)
+        self.assertIs(ft.layout, layout)
+        raw['files'] = [{'bytesCompleted': 10, 'length': 1000, 'name': 'Real torrent/file1'}]
+        raw['fileStats'] = [{'bytesCompleted': 10, 'priority': 0, 'wanted': True}]
+        ft.update(raw)
+        self.assertIsNot(ft.layout, layout)
+        self.assertIs(ft['Real torrent'].layout, ft.layout)
+        self.assertEqual(tuple(ft), ('Real torrent',))
+        self.assertEqual(ft['Real torrent'].size_downloaded, 10)
+        self.assertEqual(ft['Real torrent']['file1']['path-absolute'], '/a/path/Real torrent/file1')
+
+    def test_update_when_metadata_arrives(self):
+        raw = {'id': 1, 'name': 'Fake torrent', 'downloadDir': '/a/path',
+               'fileStats': [], 'files': []}
+        ft = torrent.TorrentFileTree.create(raw)
+        self.assertEqual(tuple(ft), ('Fake torrent',))
+        self.assertEqual(ft['Fake torrent']['id'], (-1, -1))
+
+        raw['fileStats'] = [{'bytesCompleted': 0, 'priority': 0, 'wanted': True},
+                            {'bytesCompleted': 0, 'priority': 0, 'wanted': True}]
+        raw['files'] = [{'bytesCompleted': 0, 'length': 1000, 'name': 'Fake torrent/file1'},
+                        {'bytesCompleted': 0, 'length': 2000, 'name': 'Fake torrent/subdir/file2'}]
+        ft.update(raw)
+        self.assertEqual(ft['Fake torrent']['file1']['id'], (1, 0))
+        self.assertEqual(ft['Fake torrent']['subdir']['file2']['id'], (1, 1))
+        self.assertEqual(ft['Fake torrent']['subdir']['file2']['path-relative'], 'Fake torrent/subdir/file2')
+        self.assertEqual(ft.id, ((1, 0), (1, 1)))
@@ -1,6 +1,7 @@
 import unittest
 
-from stig.client.filters.base import BoolFilterSpec, CmpFilterSpec, Filter, FilterChain
+from stig.client.filters.base import (COST_ITERABLE, BoolFilterSpec, CmpFilterSpec,
+                                      Filter, FilterChain)
 
 
 class TestFilterParser(unittest.TestCase):
@@ -416,6 +417,10 @@ class TestFilterChain_parser(unittest.TestCase):
     def test_filter_with_boolean_operators(self):
         self.assertEqual(str(self.f('b1 | b2 & c~x | ci < 5')), 'b1|b2&~x|ci<5')
 
+    def test_duplicate_filters_in_AND_chain(self):
+        self.assertEqual(str(self.f('b1&b2&b1|b1&ci<5&b1')), 'b1&b2|b1&ci<5')
+        self.assertEqual(str(self.f('b1&!b1&b1')), 'b1&!b1')
+
     def test_filter_starts_with_boolean_operator(self):
         for op in ('&', '|'):
             with self.assertRaises(ValueError) as cm:
@@ -574,3 +579,80 @@ class TestFilterChain_apply(unittest.TestCase):
             self.assertEqual(self.f('!mod3').match(item), item['v'] % 3 != 0)
             self.assertEqual(self.f('n_abs>0').match(item), abs(item['v']) > 0)
             self.assertEqual(self.f('n_abs!>0').match(item), abs(item['v']) <= 0)
+
+    def test_apply_with_shared_cache(self):
+        calls = []
+
+        class FooFilter(Filter):
+            BOOLEAN_FILTERS = {'mod2': BoolFilterSpec(lambda i: calls.append(('mod2', i['v'])) or i['v'] % 2 == 0),
+                               'mod3': BoolFilterSpec(lambda i: calls.append(('mod3', i['v'])) or i['v'] % 3 == 0)}
+
+        class FooFilterChain(FilterChain):
+            filterclass = FooFilter
+
+        items = tuple({'v': i} for i in range(-6, 7))
+        cache = {}
+        self.assertEqual(tuple(item['v'] for item in FooFilterChain('mod2').apply(items, cache=cache)),
+                         (-6, -4, -2, 0, 2, 4, 6))
+        self.assertEqual(tuple(item['v'] for item in FooFilterChain('mod2&mod3').apply(items, cache=cache)),
+                         (-6, 0, 6))
+        self.assertEqual(tuple(item['v'] for item in FooFilterChain('mod3|mod2').apply(items, cache=cache)),
+                         (-6, -4, -3, -2, 0, 2, 3, 4, 6))
+        self.assertEqual(FooFilterChain('!mod2').match(items[1], cache=cache), True)
+        # Each filter was evaluated exactly once per item
+        self.assertEqual(sorted(calls), sorted([('mod2', item['v']) for item in items] +
+                                               [('mod3', item['v']) for item in items] +
+                                               [('mod2', items[1]['v'])]))
+
+
+class TestFilterChain_compile(unittest.TestCase):
+    def setUp(self):
+        class FooFilter(Filter):
+            BOOLEAN_FILTERS = {'even': BoolFilterSpec(lambda i: i['v'] % 2 == 0, needed_keys=('v',)),
+                               'all': BoolFilterSpec(None)}
+            COMPARATIVE_FILTERS = {'v': CmpFilterSpec(value_type=int, needed_keys=('v',)),
+                                   'tags': CmpFilterSpec(value_type=str,
+                                                         value_getter=lambda i: iter(i['tags']),
+                                                         needed_keys=('tags',),
+                                                         cost=COST_ITERABLE),
+                                   'name': CmpFilterSpec(value_type=str,
+                                                         value_getter=lambda i: i['name'],
+                                                         value_matcher=lambda i, op, v: op(i['name'].lower(), v),
+                                                         needed_keys=('name',))}
+            DEFAULT_FILTER = 'name'
+
+        class FooFilterChain(FilterChain):
+            filterclass = FooFilter
+
+        self.f = FooFilterChain
+        self.items = tuple({'v': i, 'name': 'Item%d' % i, 'tags': ('t%d' % (i % 3), 'x%d' % (i % 4))}
+                           for i in range(-20, 21))
+
+    def assert_same_as_interpreted(self, filter_str):
+        fc = self.f(filter_str)
+        for item in self.items:
+            exp = any(all(f.match(item) for f in AND_chain)
+                      for AND_chain in fc._filterchains)
+            self.assertIs(fc.match(item), exp, '%r: %r' % (filter_str, item))
+            self.assertIs(fc.match(item, cache={}), exp, '%r: %r' % (filter_str, item))
+
+    def test_compiled_filters_match_like_interpreted_filters(self):
+        for filter_str in ('even', '!even', 'v>3', 'v!>3', 'v', '!v', 'v=', 'tags=t1', 'tags!=t1',
+                           'tags~x', 'tags=~^x[12]$', 'tags', 'item1', '!item1', 'name=item7',
+                           'name=~^item-?1', 'even&v<0|tags=t2&!item', 'v>5&v<10|v<-15|tags=x3&even',
+                           'all', '!all', 'all&even'):
+            self.assert_same_as_interpreted(filter_str)
+
+    def test_AND_chains_are_sorted_by_cost(self):
+        fc = self.f('tags~x&name=~item|name~item&tags~x&v>0')
+        tuple(fc.apply(self.items))
+        self.assertEqual(tuple(tuple(str(f) for f in AND_chain) for AND_chain in fc._compiled_chains),
+                         (('tags~x', '=~item'), ('~item', 'v>0', 'tags~x')))
+
+    def test_AND_chains_are_sorted_by_selectivity(self):
+        fc = self.f('even&v>15')
+        tuple(fc.apply(self.items))
+        self.assertEqual(tuple(str(f) for f in fc._compiled_chains[0]), ('even', 'v>15'))
+        for _ in range(5):
+            self.assertEqual(tuple(item['v'] for item in fc.apply(self.items)), (16, 18, 20))
+        self.assertEqual(tuple(str(f) for f in fc._compiled_chains[0]), ('v>15', 'even'))
@@ -217,3 +217,40 @@ class TestRequestPoller(asynctest.ClockedTestCase):
         await self.advance(0)
         self.assertEqual(self.mock_request_calls, 3)
         await rp.stop()
+
+    async def test_unchanged_response(self):
+        responses = [['foo'], ['foo'], ['bar']]
+        responses.insert(1, responses[0])
+        responses.insert(2, responses[0])
+
+        async def mock_request():
+            return responses.pop(0) if len(responses) > 1 else responses[0]
+
+        rp = self.make_poller(mock_request)
+        changed = []
+        unchanged = []
+        rp.on_response(changed.append, autoremove=False)
+        rp.on_unchanged(unchanged.append, autoremove=False)
+        await rp.start()
+        await self.advance(rp.interval * 4)
+        self.assertEqual(changed, [['foo'], ['foo'], ['bar']])
+        self.assertEqual(unchanged, [['foo'], ['foo']])
+        self.assertIs(unchanged[0], changed[0])
+        await rp.stop()
+
+    async def test_changing_request_resets_unchanged_response(self):
+        response = ['foo']
+
+        async def mock_request():
+            return response
+
+        rp = self.make_poller(mock_request)
+        changed = []
+        rp.on_response(changed.append, autoremove=False)
+        await rp.start()
+        await self.advance(rp.interval)
+        self.assertEqual(changed, [['foo']])
+        rp.set_request(mock_request)
+        await self.advance(rp.interval)
+        self.assertEqual(changed, [['foo'], ['foo']])
+        await rp.stop()
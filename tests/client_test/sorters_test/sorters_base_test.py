@@ -174,3 +174,71 @@ class TestSorterBase(unittest.TestCase):
 
         srted = self.sortercls(('!bar',)).apply(items, item_getter=item_getter)
         self.assertEqual(tuple(obj.id for obj in srted), (1, 2, 3))
+
+
+class TestSortingByMultipleKeys(unittest.TestCase):
+    def setUp(self):
+        class Weird(int):
+            # Values are never equal but always sorted by their first digit
+            def __eq__(self, other):
+                return False
+
+            def __lt__(self, other):
+                return str(self)[0] < str(other)[0]
+
+            def __hash__(self):
+                return super().__hash__()
+
+        class TestSorter(SorterBase):
+            SORTSPECS = {'num'   : SortSpec(lambda item: item['num'], description=''),
+                         'float' : SortSpec(lambda item: item['num'] / 3, description=''),
+                         'str'   : SortSpec(lambda item: item['str'], description=''),
+                         'weird' : SortSpec(lambda item: Weird(item['num']), description=''),
+                         'multi' : SortSpec(lambda item: item['str'], lambda item: item['num'] % 3,
+                                            description='')}
+        self.sortercls = TestSorter
+        random.seed(0)
+        self.items = [{'id': i, 'num': random.randint(0, 30), 'str': random.choice('abcde')}
+                      for i in range(300)]
+
+    def sort_sequentially(self, sortstrings):
+        # One stable sort per key function like we used to do
+        items = list(self.items)
+        for sortstring in sortstrings:
+            reverse = sortstring.startswith('!')
+            sortspec = self.sortercls.SORTSPECS[sortstring.lstrip('!')]
+            for keyfunc in sortspec.keyfuncs:
+                items.sort(key=keyfunc, reverse=reverse)
+        return [item['id'] for item in items]
+
+    def test_same_order_as_sequential_sorting(self):
+        for sortstrings in (('num',), ('!num',), ('str', 'num'), ('str', '!num'), ('!str', 'num'),
+                            ('num', '!str'), ('!float', 'str', '!num'), ('num', 'weird'),
+                            ('!weird', 'str'), ('str', '!weird', 'float'), ('multi',), ('!multi',),
+                            ('num', '!multi'), ('!multi', 'weird', '!float')):
+            items = self.sortercls(sortstrings).apply(self.items)
+            self.assertEqual([item['id'] for item in items], self.sort_sequentially(sortstrings),
+                             sortstrings)
+
+    def test_inplace(self):
+        items = list(self.items)
+        self.assertEqual(self.sortercls(('!str', 'num')).apply(items, inplace=True), None)
+        self.assertEqual([item['id'] for item in items], self.sort_sequentially(('!str', 'num')))
+
+    def test_item_getter(self):
+        items = [(item,) for item in self.items]
+        items = self.sortercls(('str', '!num')).apply(items, item_getter=lambda item: item[0])
+        self.assertEqual([item[0]['id'] for item in items], self.sort_sequentially(('str', '!num')))
+
+    def test_key(self):
+        for sortstrings in (('num',), ('!num',), ('str', '!num'), ('!float', 'str', '!num'),
+                            ('!weird', 'str'), ('num', '!multi')):
+            sorter = self.sortercls(sortstrings)
+            items = sorted(self.items, key=sorter.key)
+            self.assertEqual([item['id'] for item in items], self.sort_sequentially(sortstrings),
+                             sortstrings)
+
+        sorter = self.sortercls(('str', '!num'))
+        item = self.items[0]
+        self.assertEqual(sorter.key(item), sorter.key(dict(item)))
+        self.assertNotEqual(sorter.key(item), sorter.key(dict(item, num=item['num'] + 1)))
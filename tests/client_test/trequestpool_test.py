@@ -20,21 +20,30 @@ class FakeTorrentAPI():
         self.calls = 0
         self.arg_torrents = None
         self.arg_keys = None
+        self.arg_incremental = None
         self.exc = None
         self.tlist = FAKE_TORRENTS
+        self.response = None
         self.delay = 0
+        self.kept_filters = None
 
-    async def torrents(self, torrents=None, keys='ALL'):
+    async def torrents(self, torrents=None, keys='ALL', incremental=False):
         if self.delay:
             await asyncio.sleep(self.delay)
         self.calls += 1
         self.arg_torrents = torrents
         self.arg_keys = keys
-        if self.exc is None:
+        self.arg_incremental = incremental
+        if self.response is not None:
+            return self.response
+        elif self.exc is None:
             return Response(success=False, torrents=self.tlist)
         else:
             raise self.exc
 
+    def forget_filter_results(self, keep=()):
+        self.kept_filters = {str(f) for f in keep}
+
 
 class FakeCallback():
     def __init__(self):
@@ -82,6 +91,23 @@ class TestTorrentRequestPool(asynctest.ClockedTestCase):
         if keys is not None:
             self.assertEqual(set(self.api.arg_keys), set(keys))
 
+    async def test_filter_results_of_subscribers_are_kept(self):
+        foo = Subscriber('uploading&private', 'name')
+        self.rp.register('foo', foo.callback, keys=foo.keys, tfilter=foo.tfilter)
+        self.assertEqual(self.api.kept_filters, {'uploading', 'private'})
+
+        bar = Subscriber('private|downloading', 'name')
+        self.rp.register('bar', bar.callback, keys=bar.keys, tfilter=bar.tfilter)
+        everything = Subscriber(None, 'name')
+        self.rp.register('everything', everything.callback, keys=everything.keys)
+        self.assertEqual(self.api.kept_filters, {'uploading', 'private', 'downloading'})
+
+        self.rp.remove('foo')
+        self.assertEqual(self.api.kept_filters, {'private', 'downloading'})
+        self.rp.remove('bar')
+        self.rp.remove('everything')
+        self.assertEqual(self.api.kept_filters, set())
+
     async def test_combining_requests(self):
         await self.rp.start()
         self.assertEqual(self.rp.running, True)
@@ -94,6 +120,7 @@ class TestTorrentRequestPool(asynctest.ClockedTestCase):
         self.assert_api_request(calls=1,
                                 tfilter=foo.tfilter,
                                 keys=foo.keys_needed)
+        self.assertEqual(self.api.arg_incremental, True)
 
         bar = Subscriber('name~bar', 'name', 'rate-up')
         self.rp.register('bar', bar.callback, keys=bar.keys, tfilter=bar.tfilter)
@@ -177,6 +204,26 @@ class TestTorrentRequestPool(asynctest.ClockedTestCase):
 
         await self.rp.stop()
 
+    async def test_callbacks_get_unchanged_response(self):
+        self.api.response = Response(success=True, torrents=FAKE_TORRENTS)
+        await self.rp.start()
+
+        foo = Subscriber('name~foo', 'name')
+        bar = Subscriber('name~bar', 'name')
+        self.rp.register('foo', foo.callback, keys=foo.keys, tfilter=foo.tfilter)
+        self.rp.register('bar', bar.callback, keys=bar.keys, tfilter=bar.tfilter)
+        await self.advance(0)
+        await self.advance(self.rp.interval)
+
+        # Filters and cells may depend on the current time
+        self.assertEqual(self.api.calls, 2)
+        self.assertEqual(foo.callback.calls, 2)
+        self.assertEqual(bar.callback.calls, 2)
+        self.assertEqual(tuple(foo.callback.args), (FAKE_TORRENTS[0],))
+        self.assertEqual(tuple(bar.callback.args), (FAKE_TORRENTS[1],))
+
+        await self.rp.stop()
+
     async def test_raising_fatal_exception(self):
         self.api.exc = RuntimeError('Something is wrong!')
         await self.rp.start()
@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+
+from stig.client.aiotransmission.torrent import Torrent
+from stig.tui.keymap import KeyMap
+
+from . import _handle_urwidpatches
+
+
+def setUpModule():
+    # Views import tuiobjects, which needs an event loop
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    _handle_urwidpatches.setUpModule()
+
+
+def tearDownModule():
+    _handle_urwidpatches.tearDownModule(None)
+
+
+class FakePoller():
+    def on_response(self, callback):
+        self.callback = callback
+
+    def poll(self):
+        pass
+
+
+class FakeSrvAPI():
+    class torrent():
+        torrents = None
+
+    def create_poller(self, *args, **kwargs):
+        self.poller = FakePoller()
+        return self.poller
+
+
+class FakeResponse():
+    def __init__(self, *torrents):
+        self.torrents = torrents
+
+
+def make_raw_torrent(*paths):
+    return {'id': 1, 'name': paths[0].split('/')[0], 'downloadDir': '/downloads',
+            'fileStats': [{'bytesCompleted': 0, 'priority': 0, 'wanted': True} for _ in paths],
+            'files': [{'bytesCompleted': 0, 'length': 100, 'name': path} for path in paths]}
+
+
+class TestFileListWidget(unittest.TestCase):
+    def setUp(self):
+        # Views need urwid patches
+        from stig.tui.views.file_list import FileListWidget
+        self.srvapi = FakeSrvAPI()
+        self.flist = FileListWidget(self.srvapi, KeyMap(), 'all', None, columns=('name',))
+        self.torrent = Torrent(make_raw_torrent('T/a', 'T/b'))
+        self.poll()
+        self.flist._set_expanded((0,), True)
+        self.assert_names('T', 'a', 'b')
+
+    def poll(self):
+        self.srvapi.poller.callback(FakeResponse(self.torrent))
+
+    def assert_names(self, *names):
+        canv = self.flist.render((20, 5))
+        lines = [line.decode('utf-8').strip(' ├└➤') for line in canv.text[1:]]
+        self.assertEqual([line for line in lines if line], list(names))
+
+    def test_updating_files(self):
+        raw = make_raw_torrent('T/a', 'T/b')
+        raw['fileStats'][0]['bytesCompleted'] = 50
+        self.torrent.update(raw)
+        self.poll()
+        self.assertEqual(self.flist._filetree.node((0, 0)).data['size-downloaded'], 50)
+        self.assert_names('T', 'a', 'b')
+
+    def test_renaming_file(self):
+        self.torrent.update(make_raw_torrent('T/x', 'T/b'))
+        self.poll()
+        self.assert_names('T', 'b', 'x')
+        self.poll()
+        self.assert_names('T', 'b', 'x')
+
+    def test_renaming_torrent(self):
+        self.torrent.update(make_raw_torrent('U/a', 'U/b'))
+        self.poll()
+        self.assert_names('U')
+        self.flist._set_expanded((0,), True)
+        self.assert_names('U', 'a', 'b')
+
+    def test_renaming_file_unmarks_files(self):
+        self.flist.focus_position = 1
+        self.flist.mark()
+        self.assertEqual(self.flist.marked_count, 1)
+        self.torrent.update(make_raw_torrent('T/x', 'T/b'))
+        self.poll()
+        self.assertEqual(self.flist.marked_count, 0)
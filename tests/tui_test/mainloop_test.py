@@ -0,0 +1,187 @@
+import unittest
+from unittest.mock import patch
+
+import urwid
+
+from stig.tui.mainloop import MainLoop
+
+
+class FakeEventLoop():
+    def __init__(self):
+        self.alarms = []
+        self.idle_callbacks = {}
+
+    def alarm(self, seconds, callback):
+        handle = (seconds, callback)
+        self.alarms.append(handle)
+        return handle
+
+    def remove_alarm(self, handle):
+        self.alarms.remove(handle)
+        return True
+
+    def enter_idle(self, callback):
+        handle = object()
+        self.idle_callbacks[handle] = callback
+        return handle
+
+    def remove_enter_idle(self, handle):
+        del self.idle_callbacks[handle]
+        return True
+
+    def watch_file(self, fd, callback):
+        return fd
+
+    def remove_watch_file(self, handle):
+        return True
+
+    def idle(self):
+        for callback in tuple(self.idle_callbacks.values()):
+            callback()
+
+    def run_alarms(self):
+        alarms, self.alarms = self.alarms, []
+        for seconds, callback in alarms:
+            callback()
+
+
+class FakeScreen(urwid.display_common.BaseScreen):
+    def __init__(self):
+        super().__init__()
+        self.canvases = []
+
+    def get_cols_rows(self):
+        return (20, 3)
+
+    def draw_screen(self, size, canvas):
+        self.canvases.append(canvas)
+
+    def hook_event_loop(self, event_loop, callback):
+        pass
+
+    def unhook_event_loop(self, event_loop):
+        pass
+
+    def get_input_descriptors(self):
+        return []
+
+
+class TestMainLoop(unittest.TestCase):
+    def setUp(self):
+        self.text = urwid.Text('foo')
+        self.hidden_text = urwid.Text('bar')
+        widget = urwid.Filler(self.text, valign='top')
+        self.screen = FakeScreen()
+        self.event_loop = FakeEventLoop()
+        self.now = 1000
+        patcher = patch('time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.loop = MainLoop(widget, screen=self.screen, event_loop=self.event_loop,
+                             handle_mouse=False, max_fps=10)
+        self.loop.start()
+        self.addCleanup(lambda: self.screen.started and self.loop.stop())
+        self.assertEqual(self.event_loop.alarms, [(0, self.loop._redraw)])
+        self.event_loop.run_alarms()
+        self.assertEqual(len(self.screen.canvases), 1)
+
+    def test_invalid_max_fps(self):
+        for max_fps in (0, -1):
+            with self.assertRaises(ValueError):
+                self.loop.max_fps = max_fps
+
+    def test_no_redraw_without_changes(self):
+        self.now += 10
+        self.event_loop.idle()
+        self.event_loop.run_alarms()
+        self.assertEqual(len(self.screen.canvases), 1)
+
+    def test_invalidating_displayed_widget(self):
+        self.now += 10
+        self.text.set_text('baz')
+        self.event_loop.idle()
+        self.assertEqual(self.event_loop.alarms, [(0, self.loop._redraw)])
+        self.event_loop.run_alarms()
+        self.assertEqual(len(self.screen.canvases), 2)
+        self.assertEqual(self.screen.canvases[-1].text[0].rstrip(), b'baz')
+
+    def test_invalidating_hidden_widget(self):
+        self.now += 10
+        self.hidden_text.set_text('baz')
+        self.event_loop.idle()
+        self.event_loop.run_alarms()
+        self.assertEqual(len(self.screen.canvases), 1)
+
+    def test_idle_event_loop_renders_at_max_fps(self):
+        with patch.object(self.loop, '_render', wraps=self.loop._render) as render:
+            for _ in range(5):
+                self.now += 0.01
+                self.event_loop.idle()
+            self.assertEqual(len(self.event_loop.alarms), 1)
+            # Scheduled by the first idle call, 0.1s after the previous redraw
+            self.assertAlmostEqual(self.event_loop.alarms[0][0], 0.09)
+            self.event_loop.run_alarms()
+            self.assertEqual(render.call_count, 1)
+
+    def test_invalidations_are_coalesced(self):
+        self.now += 10
+        for i in range(5):
+            self.text.set_text(str(i))
+            self.event_loop.idle()
+        self.assertEqual(len(self.event_loop.alarms), 1)
+        self.event_loop.run_alarms()
+        self.assertEqual(len(self.screen.canvases), 2)
+        self.assertEqual(self.screen.canvases[-1].text[0].rstrip(), b'4')
+
+    def test_max_fps(self):
+        self.now += 0.04
+        self.text.set_text('baz')
+        self.event_loop.idle()
+        self.assertEqual(len(self.event_loop.alarms), 1)
+        self.assertAlmostEqual(self.event_loop.alarms[0][0], 0.06)
+
+        self.loop.max_fps = 5
+        self.text.set_text('qux')
+        self.event_loop.idle()
+        # The earlier redraw is still scheduled
+        self.assertEqual(len(self.event_loop.alarms), 1)
+        self.assertAlmostEqual(self.event_loop.alarms[0][0], 0.06)
+
+    def test_input_redraws_immediately(self):
+        self.now += 0.04
+        self.text.set_text('baz')
+        self.event_loop.idle()
+        self.assertAlmostEqual(self.event_loop.alarms[0][0], 0.06)
+
+        self.loop._update(['x'], [ord('x')])
+        self.assertEqual(self.event_loop.alarms, [(0, self.loop._redraw)])
+
+    def test_input_draws_unchanged_canvas(self):
+        self.loop._update(['x'], [ord('x')])
+        self.event_loop.run_alarms()
+        self.assertEqual(len(self.screen.canvases), 2)
+        self.assertIs(self.screen.canvases[0], self.screen.canvases[1])
+
+    def test_no_redraw_while_screen_is_stopped(self):
+        self.screen.stop()
+        self.now += 10
+        self.text.set_text('baz')
+        self.event_loop.idle()
+        self.assertEqual(self.event_loop.alarms, [])
+
+    def test_canvas_cache_is_not_patched(self):
+        invalidate = urwid.CanvasCache.invalidate
+        loop = MainLoop(urwid.SolidFill(), screen=FakeScreen(), event_loop=FakeEventLoop(),
+                        handle_mouse=False)
+        loop.start()
+        self.assertEqual(urwid.CanvasCache.invalidate, invalidate)
+        loop.stop()
+        self.assertEqual(urwid.CanvasCache.invalidate, invalidate)
+
+    def test_stop_cancels_redraw(self):
+        self.text.set_text('baz')
+        self.event_loop.idle()
+        self.assertEqual(len(self.event_loop.alarms), 1)
+        self.loop.stop()
+        self.assertEqual(self.event_loop.alarms, [])
+        self.assertEqual(self.event_loop.idle_callbacks, {})
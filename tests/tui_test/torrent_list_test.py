@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from stig.client.aiotransmission.torrent import Torrent
+from stig.client.sorters.torrent import TorrentSorter
+from stig.tui.keymap import KeyMap
+
+from . import _handle_urwidpatches
+
+
+def setUpModule():
+    # Views import tuiobjects, which needs an event loop
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    _handle_urwidpatches.setUpModule()
+
+
+def tearDownModule():
+    _handle_urwidpatches.tearDownModule(None)
+
+
+class FakeRequestPool():
+    def requested_keys(self, sid):
+        return set()
+
+    def register(self, sid, callback, keys, tfilter):
+        self.callback = callback
+
+    def remove(self, sid):
+        pass
+
+    def poll(self):
+        pass
+
+
+class FakeSrvAPI():
+    def __init__(self):
+        self.treqpool = FakeRequestPool()
+
+
+def make_raw_torrent(id, rate_down, rate_up=0):
+    return {'id': id, 'name': 'Torrent %02d' % id,
+            'rateDownload': rate_down, 'rateUpload': rate_up}
+
+
+class TestTorrentListSorting(unittest.TestCase):
+    def setUp(self):
+        # Views need urwid patches
+        from stig.tui.views.torrent_list import TorrentListWidget
+        self.srvapi = FakeSrvAPI()
+        self.tlist = TorrentListWidget(self.srvapi, KeyMap(), title='Torrents',
+                                       sort=TorrentSorter(('rate-down',)),
+                                       columns=('rate-down',))
+        self.torrents = {id: Torrent(make_raw_torrent(id, rate_down=id * 10))
+                         for id in range(1, 21)}
+        self.poll()
+        self.assertEqual(self.ids, list(range(1, 21)))
+
+    def poll(self, rates={}):
+        for id,rate_down in rates.items():
+            self.torrents[id].update(make_raw_torrent(id, rate_down))
+        self.srvapi.treqpool.callback(tuple(self.torrents.values()))
+        self.tlist.render((40, 10))
+
+    @property
+    def ids(self):
+        return [w.id for w in self.tlist._listbox.body]
+
+    def test_few_moved_items_are_sorted_incrementally(self):
+        with patch.object(self.tlist, '_sort_all_widgets', wraps=self.tlist._sort_all_widgets) as sort_all:
+            self.poll({5: 1000})
+            self.assertEqual(self.ids, [1, 2, 3, 4] + list(range(6, 21)) + [5])
+            self.poll({5: 15})
+            self.assertEqual(self.ids, [1, 5] + list(range(2, 5)) + list(range(6, 21)))
+            sort_all.assert_not_called()
+
+    def test_changed_items_that_stay_in_order_are_not_moved(self):
+        with patch.object(self.tlist, '_sort_all_widgets', wraps=self.tlist._sort_all_widgets) as sort_all:
+            self.poll({id: id * 10 + 1 for id in range(1, 21)})
+            self.assertEqual(self.ids, list(range(1, 21)))
+            sort_all.assert_not_called()
+
+    def test_changes_of_unsorted_keys_are_ignored(self):
+        for id,t in self.torrents.items():
+            t.update(make_raw_torrent(id, rate_down=id * 10, rate_up=1000 - id))
+        with patch.object(self.tlist._sort, 'key', wraps=self.tlist._sort.key) as key:
+            self.poll()
+            self.assertEqual(self.ids, list(range(1, 21)))
+            key.assert_not_called()
+
+    def test_many_moved_items_are_sorted_again(self):
+        with patch.object(self.tlist, '_sort_all_widgets', wraps=self.tlist._sort_all_widgets) as sort_all:
+            self.poll({id: 1000 - id for id in range(1, 21)})
+            self.assertEqual(self.ids, list(range(20, 0, -1)))
+            sort_all.assert_called_once_with(self.tlist._sort)